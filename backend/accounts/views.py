@@ -4,6 +4,7 @@ from rest_framework.decorators import api_view, permission_classes, authenticati
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from utils.http_responses import success_response, error_response
 from utils.permissions import IsAdmin
+from utils import metrics
 from .serializers import RegisterSerializer, LoginSerializer, UserSerializer
 from .services.user_service import authenticate_user, approve_user, toggle_user_status
 from .models import User
@@ -200,7 +201,13 @@ def request_password_reset(request):
             [email]
         )
         msg.attach_alternative(html_content, "text/html")
-        msg.send()
+        try:
+            with metrics.timer('otp_send_seconds'):
+                msg.send()
+        except Exception:
+            metrics.inc('otp_sends_total', {'result': 'failed'})
+            raise
+        metrics.inc('otp_sends_total', {'result': 'sent'})
         
         return success_response(None, "If an account exists with this email, you will receive a 6-digit OTP.")
     
@@ -231,8 +238,10 @@ def verify_otp(request):
             break
     
     if not valid_otp:
+        metrics.inc('otp_verifications_total', {'result': 'invalid'})
         return error_response("Invalid or expired OTP")
         
+    metrics.inc('otp_verifications_total', {'result': 'valid'})
     return success_response(None, "OTP verified successfully")
 
 @api_view(['POST'])
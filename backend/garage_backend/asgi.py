@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'garage_backend.settings')
 
 application = get_asgi_application()
+
+# Open the pool's minimum connections now, not on the first requests
+from utils.db_pool.base import warm_up_pools  # noqa: E402
+warm_up_pools()
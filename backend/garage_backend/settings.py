@@ -45,11 +45,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'utils.metrics.middleware.MetricsMiddleware',  # Outermost: times the whole stack
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     # 'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'utils.db_router.ReplicaRoutingMiddleware',
+    'utils.profiling.RequestProfilerMiddleware',  # Admin-only ?_profile=1
 
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -80,7 +83,8 @@ WSGI_APPLICATION = 'garage_backend.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'mysql.connector.django',
+        # mysql.connector.django with a per-process connection pool (utils/db_pool)
+        'ENGINE': 'utils.db_pool',
         'NAME': 'garage_db',
         'USER': 'root',
         'PASSWORD': '',  # Default XAMPP MySQL password is empty
@@ -89,6 +93,15 @@ DATABASES = {
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
         },
+        # Keep CONN_MAX_AGE at 0 so each request hands its connection back to the pool
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MIN_SIZE': 2,            # Opened at worker start
+            'MAX_SIZE': 10,           # Requests wait beyond this
+            'TIMEOUT': 5,             # Seconds to wait for a free connection
+            'HEALTH_CHECK_AFTER': 30, # Ping connections idle longer than this
+            'MAX_LIFETIME': 1800,     # Recycle connections after 30 minutes
+        },
     }
 }
 
@@ -129,6 +142,12 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Rendered invoice PDFs (cache, safe to delete - files are re-rendered on demand)
+INVOICE_PDF_CACHE_DIR = BASE_DIR / 'var' / 'invoice_pdfs'
+
+# Monthly statements (python manage.py generate_statements), one folder per month
+STATEMENT_OUTPUT_DIR = BASE_DIR / 'var' / 'statements'
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -145,7 +164,7 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
-CORS_EXPOSE_HEADERS = ['Content-Type', 'X-CSRFToken']
+CORS_EXPOSE_HEADERS = ['Content-Type', 'X-CSRFToken', 'ETag', 'X-Profile-Id']
 CORS_ALLOW_HEADERS = [
     'accept',
     'accept-encoding',
@@ -156,9 +175,85 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',
+    'if-match',
+    'x-profile',
 ]
 
 
+# Idempotency-Key responses for POST /payments/, /services/, /invoices/
+# are kept this long (purge with: python manage.py purge_idempotency_keys)
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+
+
+# Live change feed outbox retention (purge with: python manage.py purge_change_events)
+CHANGE_EVENT_RETENTION_HOURS = 24
+# Outbox ids can commit out of order: streams wait this long for an id
+# gap to fill before treating it as a rolled-back transaction. Must exceed
+# the longest time between an outbox INSERT and its COMMIT (bulk jobs write
+# their events last for this reason), or those events are skipped
+CHANGE_FEED_COMMIT_WINDOW_SECONDS = 5
+
+
+# Opt-in request profiler (utils/profiling.py): admins add ?_profile=1
+PROFILER_SAMPLE_INTERVAL_MS = 5
+PROFILER_MAX_SAMPLES = 2000     # ~10 s of sampling, then the sampler stops
+PROFILER_MAX_RETAINED = 200     # Older profiles are deleted
+
+
+# Response cache for customer/vehicle/technician GETs (service_history/response_cache.py)
+# Entries are invalidated by per-model generation counters bumped on every write.
+# By default each worker keeps its own LRU; the timeout bounds how stale another
+# worker's copy can get. Set RESPONSE_CACHE_ALIAS to a CACHES alias (e.g. a
+# FileBasedCache under var/) to share generations and entries between workers.
+RESPONSE_CACHE_MAX_ENTRIES = 1000
+RESPONSE_CACHE_TIMEOUT = 30     # seconds
+RESPONSE_CACHE_ALIAS = None
+
+
+# POST /api/batch/ (utils/batch.py): read-only GETs run inside one request
+BATCH_MAX_REQUESTS = 10
+BATCH_TIME_LIMIT_SECONDS = 5    # Sub-requests not started by then get a 503 entry
+
+
+# GET /api/reports/cash-flow/ is computed at most once a day per cache
+FORECAST_CACHE_SECONDS = 24 * 60 * 60
+
+
+# Bay scheduling (service_history/services/schedule_service.py)
+SCHEDULE_OPEN_HOUR = 8          # Availability is offered between these local hours
+SCHEDULE_CLOSE_HOUR = 18
+SCHEDULE_SLOT_MINUTES = 30      # Grid for offered start times
+SCHEDULE_DEFAULT_HOURS = 1      # Booking length for services without an estimate
+SCHEDULE_INDEX_REBUILD_SECONDS = 3600  # Full rebuild of the in-memory interval index
+
+
+# Maintenance reminders (run nightly: python manage.py queue_maintenance_reminders)
+# Service type -> interval since the last completed service of that type;
+# a reminder is due when either limit is reached (km needs the odometer
+# reading stored on the service). Types not listed never get reminders.
+MAINTENANCE_INTERVALS = {
+    'Oil Change': {'months': 6, 'km': 5000},
+    'General Service': {'months': 12, 'km': 10000},
+    'Full Service': {'months': 24, 'km': 20000},
+    'Inspection': {'months': 12},
+}
+MAINTENANCE_REMINDER_LEAD_DAYS = 14   # Queue this long before the due date
+MAINTENANCE_REMINDER_LEAD_KM = 500    # ... or this many km before the due reading
+
+
+# Prometheus metrics (GET /metrics). Each worker process writes its numbers
+# to METRICS_DIR every METRICS_FLUSH_SECONDS; a scrape sums all files.
+# METRICS_TOKEN (from .env, below) protects the endpoint when set.
+METRICS_DIR = BASE_DIR / 'var' / 'metrics'
+METRICS_FLUSH_SECONDS = 5
+
+
+# Completed, fully paid jobs older than this move to the archive tables
+# (run: python manage.py archive_records)
+ARCHIVE_AFTER_DAYS = 730
+
+
 # CSRF Trusted Origins
 CSRF_TRUSTED_ORIGINS = [
     "http://localhost:5173",
@@ -202,3 +297,25 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', EMAIL_HOST_USER)
 
+# Scrapes of /metrics must send 'Authorization: Bearer <token>' when set
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+
+# Read Replica (optional)
+# Set DB_REPLICA_HOST to send GET-request reads to a MySQL replica.
+# Reads stick to the primary for REPLICA_STICKY_SECONDS after a browser
+# writes, and fall back to it while the replica lags too far behind.
+DB_REPLICA_HOST = os.getenv('DB_REPLICA_HOST')
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': DB_REPLICA_HOST,
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'USER': os.getenv('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.getenv('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+    }
+
+DATABASE_ROUTERS = ['utils.db_router.PrimaryReplicaRouter']
+REPLICA_STICKY_SECONDS = 5
+REPLICA_MAX_LAG_SECONDS = 2
+REPLICA_HEALTH_CHECK_INTERVAL = 5
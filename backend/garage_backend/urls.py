@@ -16,9 +16,15 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from utils.db_pool.views import pool_metrics
+from utils.metrics.views import metrics_view
+from utils.batch import batch_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/system/db-pool/', pool_metrics),
+    path('api/batch/', batch_view),  # Several read-only GETs in one request
+    path('metrics', metrics_view),  # Prometheus scrape target
     path('api/', include('service_history.urls')),
     path('api/accounts/', include('accounts.urls')),
 ]
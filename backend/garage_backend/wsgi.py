@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'garage_backend.settings')
 
 application = get_wsgi_application()
+
+# Open the pool's minimum connections now, not on the first requests
+from utils.db_pool.base import warm_up_pools  # noqa: E402
+warm_up_pools()
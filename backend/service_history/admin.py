@@ -1,16 +1,34 @@
 from django.contrib import admin
-from .models import Customer, Vehicle, Technician, Service, Invoice, Payment, BillingSetting
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+from utils.admin_paginator import EstimatedCountPaginator
+from .models import Customer, Vehicle, Technician, Service, Invoice, Payment, BillingSetting, RequestProfile, Bay, TechnicianShift, Appointment, Part, MaintenanceReminder
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    # Changelist settings for tables that grow to millions of rows:
+    # - estimated COUNT(*) for unfiltered lists (see utils/admin_paginator.py)
+    # - no second "of N total" COUNT(*) on filtered/searched lists
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
 
 @admin.register(Customer)
-class CustomerAdmin(admin.ModelAdmin):
+class CustomerAdmin(LargeTableAdmin):
     list_display = ('id', 'name', 'phone', 'email', 'nic', 'created_at')
-    search_fields = ('id', 'name', 'phone', 'email', 'nic')
+    # Prefix searches ('^') become LIKE 'term%' and can use the indexes
+    search_fields = ('=id', '^name', '^phone', '^email', '^nic')
     readonly_fields = ('created_at',)
 
 @admin.register(Vehicle)
-class VehicleAdmin(admin.ModelAdmin):
+class VehicleAdmin(LargeTableAdmin):
     list_display = ('id', 'number', 'brand', 'model', 'customer', 'year')
-    search_fields = ('id', 'number', 'brand', 'model', 'customer__name')
+    list_select_related = ('customer',)  # customer column without a query per row
+    search_fields = ('=id', '^number', '^customer__name')
+    autocomplete_fields = ('customer',)
     list_filter = ('brand', 'year')
     readonly_fields = ('created_at',)
 
@@ -21,10 +39,12 @@ class TechnicianAdmin(admin.ModelAdmin):
     search_fields = ('id', 'name', 'specialization', 'phone')
 
 @admin.register(Service)
-class ServiceAdmin(admin.ModelAdmin):
+class ServiceAdmin(LargeTableAdmin):
     list_display = ('id', 'vehicle', 'type', 'status', 'cost_display', 'advance_payment_display', 'remaining_balance_display', 'date')
-    list_filter = ('status', 'type', 'date')
-    search_fields = ('id', 'vehicle__number', 'type')
+    list_select_related = ('vehicle',)  # Service/Vehicle __str__ read vehicle fields
+    list_filter = ('status', 'date')
+    search_fields = ('=id', '^vehicle__number')
+    autocomplete_fields = ('vehicle', 'technician')
     readonly_fields = ('created_at',)
     
     def cost_display(self, obj):
@@ -40,10 +60,12 @@ class ServiceAdmin(admin.ModelAdmin):
     remaining_balance_display.short_description = 'Remaining Balance'
 
 @admin.register(Invoice)
-class InvoiceAdmin(admin.ModelAdmin):
+class InvoiceAdmin(LargeTableAdmin):
     list_display = ('id', 'invoice_number', 'customer', 'total_display', 'paid_amount_display', 'balance_due_display', 'status', 'due_date')
+    list_select_related = ('customer',)
     list_filter = ('status', 'date_created')
-    search_fields = ('id', 'invoice_number', 'customer__name', 'vehicle__number')
+    search_fields = ('=id', '^invoice_number', '^customer__name', '^vehicle__number')
+    autocomplete_fields = ('service', 'customer', 'vehicle')
     readonly_fields = ('date_created',)
     
     def total_display(self, obj):
@@ -59,10 +81,12 @@ class InvoiceAdmin(admin.ModelAdmin):
     balance_due_display.short_description = 'Balance Due'
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(LargeTableAdmin):
     list_display = ('id', 'invoice_link', 'amount_display', 'method', 'date', 'reference')
+    list_select_related = ('invoice',)  # invoice_link reads invoice.invoice_number
     list_filter = ('method', 'date')
-    search_fields = ('id', 'invoice__invoice_number', 'reference')
+    search_fields = ('=id', '^invoice__invoice_number', '^reference')
+    autocomplete_fields = ('invoice',)
     readonly_fields = ('date',)
     
     def amount_display(self, obj):
@@ -76,3 +100,96 @@ class PaymentAdmin(admin.ModelAdmin):
 @admin.register(BillingSetting)
 class BillingSettingAdmin(admin.ModelAdmin):
     list_display = ('id', 'company_name', 'tax_rate', 'invoice_prefix', 'service_prefix')
+
+@admin.register(Bay)
+class BayAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'is_active')
+
+@admin.register(TechnicianShift)
+class TechnicianShiftAdmin(admin.ModelAdmin):
+    list_display = ('technician', 'weekday', 'start_time', 'end_time')
+    list_filter = ('weekday',)
+    list_select_related = ('technician',)
+
+@admin.register(Appointment)
+class AppointmentAdmin(LargeTableAdmin):
+    # Book through the API so conflicts are checked - view and cancel here
+    list_display = ('id', 'service_id', 'bay', 'technician', 'start', 'end', 'status')
+    list_filter = ('status', 'bay')
+    list_select_related = ('bay', 'technician')
+    readonly_fields = ('service', 'bay', 'technician', 'start', 'end', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(Part)
+class PartAdmin(admin.ModelAdmin):
+    # Stock counters are changed by inventory_service only
+    list_display = ('sku', 'name', 'unit_price', 'on_hand', 'reserved', 'reorder_level', 'is_active')
+    search_fields = ('^sku', 'name')
+    list_filter = ('is_active',)
+    # Both counters read-only: a full-row save would write back values read
+    # before concurrent reservations (stock arrives via receive_stock())
+    readonly_fields = ('on_hand', 'reserved')
+
+@admin.register(MaintenanceReminder)
+class MaintenanceReminderAdmin(LargeTableAdmin):
+    # Queued by the nightly queue_maintenance_reminders job
+    list_display = ('id', 'vehicle', 'service_type', 'due_date', 'due_mileage', 'reasons', 'status', 'created_at')
+    list_filter = ('status', 'service_type')
+    list_select_related = ('vehicle',)
+    readonly_fields = ('vehicle', 'service_type', 'last_service', 'due_date', 'due_mileage', 'reasons', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    # Profiles are written by utils/profiling.py - view, download or delete only
+    list_display = ('id', 'method', 'path', 'status_code', 'duration_ms', 'query_count', 'sample_count', 'user', 'created_at', 'download_link')
+    list_filter = ('method', 'status_code')
+    list_select_related = ('user',)
+    search_fields = ('^path',)
+    exclude = ('folded_stacks',)
+    readonly_fields = ('method', 'path', 'query_string', 'status_code', 'duration_ms', 'query_count',
+                       'sample_count', 'sample_interval_ms', 'user', 'created_at', 'download_link', 'hot_functions')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/', self.admin_site.admin_view(self.download_view),
+                 name='service_history_requestprofile_download'),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk):
+        # Folded stacks: open in speedscope.app or run through flamegraph.pl
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(profile.folded_stacks, content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile.id}.folded"'
+        return response
+
+    def download_link(self, obj):
+        url = reverse('admin:service_history_requestprofile_download', args=[obj.pk])
+        return format_html('<a href="{}">Download (.folded)</a>', url)
+    download_link.short_description = 'Flamegraph'
+
+    def hot_functions(self, obj):
+        # Functions most often on top of the stack (where time was spent)
+        rows = obj.top_functions()
+        if not rows:
+            return 'No samples (request finished within one sample interval)'
+        return format_html(
+            '<table><tr><th>Function</th><th>Self %</th><th>Total %</th></tr>{}</table>',
+            format_html_join('', '<tr><td>{}</td><td>{}</td><td>{}</td></tr>', (
+                (frame, f"{own * 100 / obj.sample_count:.1f}", f"{total * 100 / obj.sample_count:.1f}")
+                for frame, own, total in rows
+            ))
+        )
+    hot_functions.short_description = 'Hot functions'
+
@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class ServiceHistoryConfig(AppConfig):
     name = 'service_history'
+
+    def ready(self):
+        # Register model signal handlers
+        from . import signals  # noqa: F401
+        # Open jobs gauge for GET /metrics
+        from utils.metrics import register_collector
+        from .metrics import open_jobs_by_status
+        register_collector(open_jobs_by_status)
@@ -0,0 +1,164 @@
+"""
+==============================================================
+CHANGE FEED (SERVER-SENT EVENTS)
+==============================================================
+Pushes "what changed" to connected browsers so they can update one
+record instead of refetching every table after each mutation.
+
+1. Signals write a ChangeEvent row (the outbox) in the same transaction
+   as the change itself - see record_change()/record_changes(). Feed
+   models save inside atomic() (models.OutboxModel), and bulk writes
+   call record_changes() inside the transaction of the write, so this
+   holds in autocommit too
+2. After commit, the in-process broker wakes every open stream
+3. Each stream reads new outbox rows (id > last sent id) and sends:
+       id: 42
+       event: change
+       data: {"model": "service", "id": 7, "action": "updated"}
+4. EventSource reconnects with Last-Event-ID, so nothing is missed
+
+Ids are allocated at INSERT but become visible at COMMIT, so a reader
+can see id N+1 while N is still uncommitted. A stream never moves past
+such a gap while it is younger than CHANGE_FEED_COMMIT_WINDOW_SECONDS
+(see settled_events()); an older gap is taken to be a rolled-back
+transaction. The limit: events whose INSERT is more than the window
+older than their COMMIT are skipped by every stream (and the schedule
+index). Long transactions - bulk status changes, reprice chunks,
+archive batches, merges - therefore write their outbox rows last,
+right before COMMIT; raise the window if a job cannot.
+
+Streams also re-check the outbox on every heartbeat, so changes made
+by other worker processes arrive within HEARTBEAT_SECONDS.
+==============================================================
+"""
+
+import asyncio
+import json
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import ChangeEvent
+from .response_cache import bump_generation
+
+# Idle streams send a comment line this often (keeps proxies from closing them)
+HEARTBEAT_SECONDS = 15
+# Max events read from the outbox per round trip
+BATCH_SIZE = 500
+# How often a stream re-reads while it waits for an id gap to fill
+GAP_POLL_SECONDS = 0.5
+
+
+class ChangeBroker:
+    """
+    Local in-process broker: streams subscribe with an asyncio.Event and
+    publish() (called from any thread) sets them on their own event loop
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def subscribe(self):
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._subscribers.add(waiter)
+        return waiter
+
+    def unsubscribe(self, waiter):
+        with self._lock:
+            self._subscribers.discard(waiter)
+
+    def publish(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, event in subscribers:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Loop already closed - the stream is gone
+                self.unsubscribe((loop, event))
+
+
+broker = ChangeBroker()
+
+
+def record_change(instance, action):
+    # Write one outbox row and wake streams once the transaction commits
+    # (same database as the change, so both commit or roll back together)
+    using = instance._state.db
+    ChangeEvent.objects.using(using).create(
+        model=instance._meta.model_name, object_id=instance.pk, action=action
+    )
+    transaction.on_commit(broker.publish, using=using)
+
+
+def record_changes(model, object_ids, action):
+    # Outbox rows for bulk operations that bypass signals (bulk_create/update)
+    if not object_ids:
+        return
+    # Bulk writes skip the post_save/post_delete cache bump too
+    bump_generation(model)
+    ChangeEvent.objects.bulk_create([
+        ChangeEvent(model=model._meta.model_name, object_id=object_id, action=action)
+        for object_id in object_ids
+    ])
+    transaction.on_commit(broker.publish)
+
+
+def _commit_cutoff():
+    # Rows inserted before this are committed or rolled back by now
+    seconds = getattr(settings, 'CHANGE_FEED_COMMIT_WINDOW_SECONDS', 5)
+    return timezone.now() - timedelta(seconds=seconds)
+
+
+def settled_events(rows, last_id):
+    """
+    The leading part of `rows` (events after last_id, in id order) that
+    is safe to consume: stops at the first id gap whose next event is
+    younger than the commit window, since the missing ids may still
+    commit. Returns (events, waiting) - waiting is True if it stopped early
+    """
+    cutoff = _commit_cutoff()
+    settled = []
+    expected = last_id + 1
+    for event in rows:
+        if event.id != expected and event.created_at > cutoff:
+            return settled, True
+        settled.append(event)
+        expected = event.id + 1
+    return settled, False
+
+
+def latest_event_id():
+    """
+    Cursor for "changes from now on": the newest id with no possibly
+    uncommitted id below it (so nothing before it can appear later)
+    """
+    base = ChangeEvent.objects.filter(created_at__lt=_commit_cutoff()).order_by('-id').values_list(
+        'id', flat=True).first()
+    recent = list(ChangeEvent.objects.filter(id__gt=base or 0).order_by('id').only('id', 'created_at'))
+    if base is None:
+        # Only recent rows (new or just-purged outbox): start at the oldest
+        base = recent[0].id - 1 if recent else 0
+    settled, _ = settled_events(recent, base)
+    return settled[-1].id if settled else base
+
+
+def events_after(last_id, limit=BATCH_SIZE):
+    # Returns (events, waiting): waiting means a gap is holding the rest back
+    return settled_events(ChangeEvent.objects.filter(id__gt=last_id).order_by('id')[:limit], last_id)
+
+
+def format_event(event):
+    data = json.dumps({'model': event.model, 'id': event.object_id, 'action': event.action})
+    return f"id: {event.id}\nevent: change\ndata: {data}\n\n"
+
+
+def purge_old_events():
+    # Delete outbox rows older than CHANGE_EVENT_RETENTION_HOURS
+    hours = getattr(settings, 'CHANGE_EVENT_RETENTION_HOURS', 24)
+    cutoff = timezone.now() - timedelta(hours=hours)
+    deleted, _ = ChangeEvent.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,148 @@
+"""
+==============================================================
+IDEMPOTENCY KEYS
+==============================================================
+Lets clients safely retry POSTs that create money records.
+
+Client sends:  POST /api/payments/   Idempotency-Key: <uuid>
+
+1. First request with a key: a 'processing' row is inserted, the view
+   runs, and its response is stored on the row ('completed')
+2. Retry with the same key: the stored response is returned and the
+   view is NOT run again (header Idempotent-Replayed: true)
+3. Retry while the first is still running: waits for it to finish,
+   then replays its response (409 if it takes too long)
+4. Same key with a different body: 422, the key is already used
+
+Server errors (5xx) and exceptions release the key so it can be retried.
+Rows older than IDEMPOTENCY_KEY_TTL_HOURS are purged by
+`python manage.py purge_idempotency_keys`.
+==============================================================
+"""
+
+import functools
+import hashlib
+import json
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+from utils.http_responses import error_response
+from .models import IdempotencyKey
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+# How long a duplicate waits for the first request before giving up
+WAIT_TIMEOUT_SECONDS = 10
+WAIT_POLL_SECONDS = 0.05
+
+
+def get_ttl():
+    return timedelta(hours=getattr(settings, 'IDEMPOTENCY_KEY_TTL_HOURS', 24))
+
+
+def _request_hash(request):
+    # Fingerprint of the body so a reused key with different data is rejected
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _replay(record):
+    response = Response(record.response_body, status=record.response_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _claim(request, key, request_hash):
+    # Insert the 'processing' row; returns (record, created)
+    lookup = {
+        'key': key,
+        'user': request.user if request.user.is_authenticated else None,
+        'method': request.method,
+        'path': request.path,
+    }
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(request_hash=request_hash, **lookup), True
+    except IntegrityError:
+        record = IdempotencyKey.objects.filter(**lookup).first()
+        if record is None:
+            # The other request failed and released the key meanwhile
+            return _claim(request, key, request_hash)
+        if record.created_at < timezone.now() - get_ttl():
+            # Expired but not purged yet - treat as a fresh key
+            record.delete()
+            return _claim(request, key, request_hash)
+        return record, False
+
+
+def _wait_for_completion(record):
+    # Poll until the first request stores its response (or releases the key)
+    deadline = time.monotonic() + WAIT_TIMEOUT_SECONDS
+    while record.status == 'processing' and time.monotonic() < deadline:
+        time.sleep(WAIT_POLL_SECONDS)
+        record = IdempotencyKey.objects.filter(pk=record.pk).first()
+        if record is None:
+            return None
+    return record
+
+
+def idempotent(view_func):
+    """
+    Decorator for POST views; place it under @api_view/@permission_classes
+    so the request is already authenticated when it runs
+    """
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if request.method != 'POST' or not key:
+            return view_func(request, *args, **kwargs)
+        if len(key) > 255:
+            return error_response("Idempotency-Key must be at most 255 characters")
+
+        request_hash = _request_hash(request)
+        record, created = _claim(request, key, request_hash)
+
+        if not created:
+            if record.request_hash != request_hash:
+                return error_response(
+                    "Idempotency-Key was already used with a different request body",
+                    status_code=422
+                )
+            record = _wait_for_completion(record)
+            if record is None:
+                # First attempt failed; run this one for real
+                return wrapper(request, *args, **kwargs)
+            if record.status == 'processing':
+                return error_response(
+                    "A request with this Idempotency-Key is still being processed",
+                    status_code=409
+                )
+            return _replay(record)
+
+        try:
+            response = view_func(request, *args, **kwargs)
+        except Exception:
+            record.delete()  # Release the key so the client can retry
+            raise
+
+        if response.status_code >= 500:
+            record.delete()
+            return response
+
+        record.status = 'completed'
+        record.response_code = response.status_code
+        record.response_body = response.data
+        record.save(update_fields=['status', 'response_code', 'response_body'])
+        return response
+
+    return wrapper
+
+
+def purge_expired_keys():
+    # Delete stored responses older than the TTL, returns number removed
+    cutoff = timezone.now() - get_ttl()
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,37 @@
+"""
+Move old, settled jobs out of the hot tables, e.g. nightly from cron:
+
+    python manage.py archive_records --older-than-days 730 --batch-size 500
+
+Each batch (services + their invoices and payments) is moved in its own
+short transaction, so the command can be stopped and re-run at any time.
+"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from service_history.services import archive_service
+
+
+class Command(BaseCommand):
+    help = "Archive completed, fully paid services/invoices/payments older than a cutoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=settings.ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=archive_service.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help='Stop after this many batches (spread work over several runs)')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        totals = archive_service.archive_older_than(
+            cutoff=cutoff,
+            batch_size=max(1, options['batch_size']),
+            max_batches=options['max_batches'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {totals['services']} services, {totals['invoices']} invoices and "
+            f"{totals['payments']} payments in {totals['batches']} batches "
+            f"(cutoff {cutoff:%Y-%m-%d})"
+        ))
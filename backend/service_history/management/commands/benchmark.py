@@ -0,0 +1,447 @@
+"""
+Micro-benchmarks for the service_history hot paths.
+
+Each scenario seeds its own throwaway data inside a transaction that is
+rolled back at the end, so it can be pointed at a dev database safely:
+
+    python manage.py benchmark bulk_status --count 200
+
+Multi-threaded scenarios (marked `rollback = False`) need committed rows
+that other connections can see; they delete their own data when done.
+"""
+
+import random
+import threading
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.utils import load_backend
+from django.utils import timezone
+from service_history.models import Customer, Vehicle, Service, VersionConflict
+from service_history.services import service_service
+
+
+class _Rollback(Exception):
+    # Raised to discard everything a scenario wrote
+    pass
+
+
+def seed_services(count, tag):
+    # Create one customer/vehicle with `count` pending services
+    customer = Customer.objects.create(name=f'Bench {tag}', email=f'bench-{tag}@example.com', phone='0000000000')
+    vehicle = Vehicle.objects.create(customer=customer, brand='Bench', model='Car', year='2020', number=f'BENCH-{tag}')
+    now = timezone.now()
+    Service.objects.bulk_create([
+        Service(vehicle=vehicle, type='Bench service', cost=Decimal('100.00'),
+                advance_payment=Decimal('10.00') if i % 2 else 0, date=now)
+        for i in range(count)
+    ])
+    return list(Service.objects.filter(vehicle=vehicle).values_list('id', flat=True))
+
+
+def bench_bulk_status(count):
+    # Completing services one request at a time vs. the bulk endpoint's path
+    per_item_ids = seed_services(count, 'single')
+    start = time.perf_counter()
+    for service_id in per_item_ids:
+        service_service.update_service_status(service_id, 'Completed')
+    per_item = time.perf_counter() - start
+
+    bulk_ids = seed_services(count, 'bulk')
+    start = time.perf_counter()
+    service_service.bulk_update_service_status(bulk_ids, 'Completed')
+    bulk = time.perf_counter() - start
+
+    return [
+        ('per-item update_service_status', per_item, count),
+        ('bulk_update_service_status', bulk, count),
+    ]
+
+
+def _run_threads(threads, target):
+    # Run target(worker_index) on N threads, each with its own DB connection
+    def runner(index):
+        try:
+            target(index)
+        finally:
+            connection.close()
+    workers = [threading.Thread(target=runner, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+def bench_contention(count, threads=8, hot_rows=4):
+    # Many writers editing the same few services:
+    # optimistic (version check + retry) vs pessimistic (SELECT ... FOR UPDATE)
+    ids = seed_services(hot_rows, 'contention')
+    per_thread = max(1, count // threads)
+    conflicts = []
+
+    def optimistic(index):
+        retries = 0
+        for n in range(per_thread):
+            service_id = random.choice(ids)
+            while True:
+                service = Service.objects.get(id=service_id)
+                service.description = f'optimistic {index}-{n}'
+                try:
+                    service.save(expected_version=service.version)
+                    break
+                except VersionConflict:
+                    retries += 1
+        conflicts.append(retries)
+
+    def pessimistic(index):
+        for n in range(per_thread):
+            with transaction.atomic():
+                service = Service.objects.select_for_update().get(id=random.choice(ids))
+                service.description = f'locked {index}-{n}'
+                service.save()
+
+    try:
+        optimistic_time = _run_threads(threads, optimistic)
+        pessimistic_time = _run_threads(threads, pessimistic)
+    finally:
+        Customer.objects.filter(email='bench-contention@example.com').delete()
+
+    total = per_thread * threads
+    return [
+        (f'optimistic saves ({sum(conflicts)} retries)', optimistic_time, total),
+        ('select_for_update saves', pessimistic_time, total),
+    ]
+bench_contention.rollback = False
+
+
+def bench_stock_contention(count, threads=8):
+    # Every thread reserves one unit at a time of the same SKU until it
+    # runs out; stock is half the attempts, so half must be refused.
+    # Fails loudly if the conditional UPDATE ever oversells.
+    from service_history.models import Part
+    from service_history.services import inventory_service
+
+    service_id = seed_services(1, 'stock')[0]
+    service = Service.objects.get(id=service_id)
+    stock = max(1, count // 2)
+    part = Part.objects.create(sku='BENCH-STOCK', name='Bench part', on_hand=stock)
+    per_thread = max(1, count // threads)
+    outcomes = []
+
+    def reserve(index):
+        won = lost = 0
+        for _ in range(per_thread):
+            try:
+                inventory_service.reserve_part(service, part.id, 1)
+                won += 1
+            except inventory_service.OutOfStock:
+                lost += 1
+        outcomes.append((won, lost))
+
+    try:
+        elapsed = _run_threads(threads, reserve)
+        part.refresh_from_db()
+        won = sum(result[0] for result in outcomes)
+        lost = sum(result[1] for result in outcomes)
+        expected = min(stock, per_thread * threads)
+        if won != expected or part.reserved != won or part.available < 0:
+            raise CommandError(
+                f"Stock invariant broken: {won} reservations granted, reserved={part.reserved}, "
+                f"on_hand={part.on_hand} (expected {expected})"
+            )
+    finally:
+        Customer.objects.filter(email='bench-stock@example.com').delete()
+        Part.objects.filter(id=part.id).delete()
+
+    return [(f'reserve_part, 1 SKU x {threads} threads ({won} granted, {lost} refused)', elapsed, won + lost)]
+bench_stock_contention.rollback = False
+
+
+def bench_connections(count):
+    # Request-shaped connection use (connect, query, close) with and without
+    # the pool, against the 'default' database settings
+    base_settings = connections['default'].settings_dict
+
+    def run(engine, alias):
+        wrapper = load_backend(engine).DatabaseWrapper({**base_settings, 'ENGINE': engine}, alias)
+        start = time.perf_counter()
+        for _ in range(count):
+            with wrapper.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            wrapper.close()  # What Django does at the end of every request
+        return time.perf_counter() - start
+
+    rows = [('new connection per request', run('mysql.connector.django', 'bench_direct'), count)]
+    from utils.db_pool.pool import get_pool
+    pooled = run('utils.db_pool', 'bench_pooled')
+    stats = get_pool('bench_pooled').stats()
+    get_pool('bench_pooled').close_all()
+    rows.append((f"pooled ({stats['opened']} opened, {stats['acquired']} checkouts)", pooled, count))
+    return rows
+bench_connections.rollback = False
+
+
+def bench_admin_changelist(count):
+    # Render the big admin changelists (first page, then a prefix search)
+    # over `count` seeded services with invoices and payments
+    from django.contrib import admin
+    from django.test import RequestFactory
+    from django.test.utils import CaptureQueriesContext
+    from accounts.models import User
+    from service_history.models import Invoice, Payment
+
+    ids = seed_services(count, 'admin')
+    service_service.bulk_update_service_status(ids, 'Completed')
+    user = User.objects.create_superuser('bench-admin@example.com', 'bench-admin', name='Bench')
+    factory = RequestFactory()
+
+    rows = []
+    for model, search in ((Vehicle, 'BENCH'), (Service, 'BENCH'), (Invoice, 'INV'), (Payment, 'INV')):
+        model_admin = admin.site._registry[model]
+        for label, params in (('page 1', {}), (f'search "{search}"', {'q': search})):
+            request = factory.get('/admin/', params)
+            request.user = user
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                model_admin.changelist_view(request).render()
+                elapsed = time.perf_counter() - start
+            rows.append((f'{model.__name__} {label} ({len(queries)} queries)', elapsed, 1))
+    return rows
+
+
+def bench_api_includes(count):
+    # The frontend's old pattern - download customers, vehicles and services
+    # in full and join them in JavaScript - vs one services request with
+    # ?include= and ?fields=. Reports bytes and queries per variant.
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIRequestFactory, force_authenticate
+    from accounts.models import User
+    from service_history import views
+    from service_history.models import Technician
+
+    # Spread the services over several customers/vehicles and technicians
+    technicians = [Technician.objects.create(name=f'Bench tech {i}', specialization='General') for i in range(5)]
+    for batch, offset in enumerate(range(0, count, 20)):
+        ids = seed_services(min(20, count - offset), f'include-{batch}')
+        Service.objects.filter(id__in=ids).update(technician=random.choice(technicians))
+    # Customers/vehicles with no service in the list still ship in the full tables
+    for i in range(count):
+        customer = Customer.objects.create(name=f'Bench idle {i}', email=f'bench-idle-{i}@example.com', phone='0000000000')
+        Vehicle.objects.create(customer=customer, brand='Bench', model='Car', year='2020', number=f'IDLE-{i}')
+    user = User.objects.create_superuser('bench-include@example.com', 'bench-include', name='Bench')
+    factory = APIRequestFactory()
+
+    def fetch(view, path, params=None):
+        request = factory.get(path, params or {})
+        force_authenticate(request, user=user)
+        response = view(request)
+        response.render()
+        return len(response.content)
+
+    variants = (
+        ('3 full lists (customers+vehicles+services)', (
+            (views.customer_list, '/api/customers/', None),
+            (views.vehicle_list, '/api/vehicles/', None),
+            (views.service_record_list, '/api/services/', None),
+        )),
+        ('services ?include=vehicle,customer,technician', (
+            (views.service_record_list, '/api/services/', {'include': 'vehicle,customer,technician'}),
+        )),
+        ('services ?include=... &fields=(list columns)', (
+            (views.service_record_list, '/api/services/', {
+                'include': 'vehicle,customer,technician',
+                'fields': 'id,type,status,date,cost,vehicle.number,customer.name,customer.phone,technician.name',
+            }),
+        )),
+    )
+    rows = []
+    for label, requests in variants:
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            size = sum(fetch(view, path, params) for view, path, params in requests)
+            elapsed = time.perf_counter() - start
+        rows.append((f'{label} ({size / 1024:.0f} KB, {len(queries)} queries)', elapsed, count))
+    return rows
+
+
+def bench_reprice(count):
+    # Tax-rate change over `count` open invoices: dry run (read + compute)
+    # and the real run (chunked bulk_update + line items + customer totals)
+    from service_history.services import reprice_service
+
+    ids = seed_services(count, 'reprice')
+    Service.objects.filter(id__in=ids[::2]).update(tax_included=True)
+    service_service.bulk_update_service_status(ids, 'Completed')
+
+    rows = []
+    for label, dry_run in (('reprice_open_invoices (dry run)', True), ('reprice_open_invoices', False)):
+        start = time.perf_counter()
+        totals = reprice_service.reprice_open_invoices(Decimal('0.1500'), dry_run=dry_run)
+        rows.append((f"{label} ({totals['batches']} batches)", time.perf_counter() - start, totals['invoices']))
+    return rows
+
+
+def bench_forecast(count):
+    # The vectorized forecast on synthetic arrays: `count` thousand
+    # historical payments (--count 1000 = 1M) and 1/20 as many open invoices
+    import numpy as np
+    from service_history.services import forecast_service
+
+    rng = np.random.default_rng(0)
+    payments = count * 1000
+    customers = max(1, payments // 50)
+    history = (
+        rng.integers(1, customers + 1, payments),
+        rng.normal(10, 20, payments).astype(np.int64),  # paid ~10 days after due
+        rng.uniform(20, 2000, payments),
+        np.ones(payments, dtype=np.int64),  # one payment per row, i.e. ungrouped
+    )
+    invoices = max(1, payments // 20)
+    open_invoices = (
+        rng.integers(1, customers + 1, invoices),
+        rng.integers(-30, 90, invoices),
+        rng.uniform(20, 2000, invoices),
+    )
+    start = time.perf_counter()
+    forecast_service.weekly_forecast(history, open_invoices)
+    return [(f'weekly_forecast ({payments} payments, {invoices} open)', time.perf_counter() - start, payments)]
+
+
+def bench_cycle_times(count):
+    # Cycle-time report over `count` jobs (4 log rows each: created,
+    # In Progress, Completed via the bulk path)
+    from datetime import timedelta
+    from service_history.models import ServiceStatusChange
+    from service_history.services import status_history_service
+
+    ids = seed_services(count, 'cycle')
+    created = timezone.now() - timedelta(days=1)
+    # seed_services() uses bulk_create, which logs no creation rows
+    ServiceStatusChange.objects.bulk_create([
+        ServiceStatusChange(service_id=service_id, status='Pending', changed_at=created, service_type='Bench service')
+        for service_id in ids
+    ])
+    service_service.bulk_update_service_status(ids, 'In Progress')
+    service_service.bulk_update_service_status(ids, 'Completed')
+
+    start = time.perf_counter()
+    report = status_history_service.cycle_time_report()
+    return [('cycle_time_report', time.perf_counter() - start, report['overall']['jobs'])]
+
+
+def bench_availability(count):
+    # `count` appointments spread over 10 bays for the coming weeks:
+    # full index build, one week's availability, and a conflict check
+    from datetime import timedelta
+    from service_history.models import Appointment, Bay
+    from service_history.services import schedule_service
+
+    service_ids = seed_services(1, 'schedule')
+    bays = [Bay.objects.create(name=f'Bench bay {number}') for number in range(10)]
+    day = timezone.localtime().replace(hour=8, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    # Back-to-back one-hour bookings, 10 a day per bay
+    Appointment.objects.bulk_create([
+        Appointment(
+            service_id=service_ids[0], bay=bays[number % 10],
+            start=day + timedelta(days=number // 100, hours=(number // 10) % 10),
+            end=day + timedelta(days=number // 100, hours=(number // 10) % 10 + 1),
+        )
+        for number in range(count)
+    ])
+    schedule_service.schedule_index.reset()
+
+    start = time.perf_counter()
+    schedule_service.schedule_index.sync()
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    schedule_service.weekly_availability(day.date(), 1.5)
+    availability = time.perf_counter() - start
+    start = time.perf_counter()
+    schedule_service.conflicts(day, day + timedelta(hours=2), bays[0].id)
+    conflict = time.perf_counter() - start
+    schedule_service.schedule_index.reset()
+    return [
+        ('interval index full build', build, count),
+        ('weekly_availability (10 bays)', availability, 7),
+        ('conflicts (one bay)', conflict, 1),
+    ]
+
+
+
+def bench_reminders(count):
+    # Reminder run over `count` vehicles, each with an old and a recent oil
+    # change (the window must pick the recent one); every other vehicle has
+    # driven past its mileage interval since. Then a re-run, with nothing new
+    from datetime import timedelta
+    from django.test.utils import override_settings
+    from service_history.models import MaintenanceReminder
+    from service_history.services import reminder_service
+
+    customer = Customer.objects.create(name='Bench reminders', email='bench-reminders@example.com', phone='0000000000')
+    Vehicle.objects.bulk_create([
+        Vehicle(customer=customer, brand='Bench', model='Car', year='2020', number=f'BENCH-R{number}',
+                normalized_number=f'BENCHR{number}', mileage=20000 if number % 2 else 14000)
+        for number in range(count)
+    ], batch_size=5000)
+    now = timezone.now()
+    Service.objects.bulk_create([
+        Service(vehicle_id=vehicle_id, type='Oil Change', status='Completed',
+                date=now - timedelta(days=days), mileage=mileage)
+        for vehicle_id in Vehicle.objects.filter(customer=customer).values_list('id', flat=True)
+        for days, mileage in ((400, 5000), (60, 12000))
+    ], batch_size=5000)
+
+    with override_settings(MAINTENANCE_INTERVALS={'Oil Change': {'months': 6, 'km': 5000}}):
+        start = time.perf_counter()
+        reminder_service.queue_reminders()
+        first = time.perf_counter() - start
+        queued = MaintenanceReminder.objects.count()
+        start = time.perf_counter()
+        reminder_service.queue_reminders()
+        rerun = time.perf_counter() - start
+    return [('queue_reminders', first, queued), ('queue_reminders (re-run)', rerun, count)]
+
+SCENARIOS = {
+    'reminders': bench_reminders,
+    'stock_contention': bench_stock_contention,
+    'availability': bench_availability,
+    'admin_changelist': bench_admin_changelist,
+    'cycle_times': bench_cycle_times,
+    'forecast': bench_forecast,
+    'api_includes': bench_api_includes,
+    'reprice': bench_reprice,
+    'connections': bench_connections,
+    'bulk_status': bench_bulk_status,
+    'contention': bench_contention,
+}
+
+
+class Command(BaseCommand):
+    help = "Run a service_history benchmark scenario against the configured database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(SCENARIOS))
+        parser.add_argument('--count', type=int, default=100, help='Number of records to exercise')
+
+    def handle(self, *args, **options):
+        if options['count'] < 1:
+            raise CommandError("--count must be at least 1")
+        scenario = SCENARIOS[options['scenario']]
+        rows = []
+        if not getattr(scenario, 'rollback', True):
+            rows = scenario(options['count'])
+        else:
+            try:
+                with transaction.atomic():
+                    rows = scenario(options['count'])
+                    raise _Rollback()
+            except _Rollback:
+                pass
+
+        for label, seconds, items in rows:
+            rate = items / seconds if seconds else float('inf')
+            self.stdout.write(f"{label:<40} {seconds * 1000:10.1f} ms  {rate:10.1f} items/s")
@@ -0,0 +1,140 @@
+"""
+Generate monthly customer statements, e.g. overnight on the 1st:
+
+    python manage.py generate_statements --month 2026-09 --format html,pdf --workers 8
+
+Customers with activity in the month are walked in id order, in chunks.
+For each chunk the data is loaded with a few set-based queries in this
+process, then rendered and written by a process pool (the workers never
+touch the database).
+
+Progress is checkpointed to <out>/checkpoint.json after every chunk whose
+statements are all on disk. Re-running the same command resumes after the
+last checkpointed customer; --fresh starts over.
+
+A statement that fails to render is reported and recorded in the
+checkpoint ('failed'), and the run carries on - one bad statement never
+stops the rest, nor blocks resuming.
+"""
+
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from service_history.models import BillingSetting
+from service_history.services import pdf_service, statement_service
+
+
+def _previous_month():
+    first = timezone.localdate().replace(day=1)
+    return (first - timedelta(days=1)).strftime('%Y-%m')
+
+
+class Command(BaseCommand):
+    help = "Render monthly statements for every customer with activity, across a process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', default=None, help='YYYY-MM (default: last month)')
+        parser.add_argument('--out', default=None, help='Output directory (default: STATEMENT_OUTPUT_DIR/<month>)')
+        parser.add_argument('--format', default='html', help='Comma-separated: html, pdf')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+        parser.add_argument('--chunk-size', type=int, default=500, help='Customers per chunk (and checkpoint)')
+        parser.add_argument('--fresh', action='store_true', help='Ignore an existing checkpoint and start over')
+
+    def handle(self, *args, **options):
+        period = options['month'] or _previous_month()
+        try:
+            start, end = statement_service.month_bounds(period)
+        except ValueError:
+            raise CommandError(f"Invalid month '{period}', expected YYYY-MM")
+        formats = sorted({name.strip() for name in options['format'].split(',') if name.strip()})
+        unknown = set(formats) - set(statement_service.STATEMENT_FORMATS)
+        if not formats or unknown:
+            raise CommandError(f"--format must be one or more of: {', '.join(statement_service.STATEMENT_FORMATS)}")
+        if 'pdf' in formats:
+            try:
+                import reportlab  # noqa: F401
+            except ImportError:
+                raise CommandError("PDF rendering requires the 'reportlab' package")
+
+        out_dir = Path(options['out'] or Path(settings.STATEMENT_OUTPUT_DIR) / period)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        checkpoint_path = out_dir / 'checkpoint.json'
+        checkpoint = {
+            'period': period, 'formats': formats, 'lastCustomerId': 0, 'written': 0, 'failed': [], 'finished': False,
+        }
+        if checkpoint_path.exists() and not options['fresh']:
+            saved = json.loads(checkpoint_path.read_text())
+            if saved.get('period') != period or saved.get('formats') != formats:
+                raise CommandError(f"{checkpoint_path} belongs to another run - use --fresh or another --out")
+            checkpoint = {'failed': [], **saved}
+            if checkpoint['finished']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Statements for {period} are already complete ({checkpoint['written']} written)"
+                ))
+                return
+            self.stdout.write(f"Resuming after customer #{checkpoint['lastCustomerId']}")
+
+        def save_checkpoint():
+            tmp = checkpoint_path.with_suffix('.tmp')
+            tmp.write_text(json.dumps(checkpoint))
+            os.replace(tmp, checkpoint_path)
+
+        total = checkpoint['written'] + len(statement_service.active_customer_ids(
+            start, end, after_id=checkpoint['lastCustomerId']
+        ))
+        company = statement_service.company_details(BillingSetting.objects.first())
+        chunk_size = max(1, options['chunk_size'])
+        max_in_flight = max(1, options['workers']) * 2  # Bounds memory on big runs
+        began = time.monotonic()
+        written_at_start = checkpoint['written']
+
+        def finish_oldest(in_flight):
+            # Chunks are checkpointed in submission order, so the checkpoint
+            # never skips past a chunk that is still being written
+            last_id, future = in_flight.popleft()
+            written, failed = future.result()
+            for customer_id, error in failed:
+                self.stderr.write(f"\nStatement for customer #{customer_id} failed: {error}")
+            checkpoint['written'] += written
+            checkpoint['failed'] += [customer_id for customer_id, _ in failed]
+            checkpoint['lastCustomerId'] = last_id
+            save_checkpoint()
+            rate = (checkpoint['written'] - written_at_start) / max(time.monotonic() - began, 1e-9)
+            self.stdout.write(f"\r{checkpoint['written']}/{total} customers ({rate:.0f}/s)", ending='')
+            self.stdout.flush()
+
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=pdf_service.init_worker) as pool:
+            in_flight = deque()
+            cursor = checkpoint['lastCustomerId']
+            while True:
+                ids = statement_service.active_customer_ids(start, end, after_id=cursor, limit=chunk_size)
+                if not ids:
+                    break
+                statements = statement_service.gather_statements(ids, start, end, period)
+                in_flight.append((ids[-1], pool.submit(
+                    statement_service.render_statement_chunk, statements, company, str(out_dir), formats
+                )))
+                cursor = ids[-1]
+                while len(in_flight) >= max_in_flight:
+                    finish_oldest(in_flight)
+            while in_flight:
+                finish_oldest(in_flight)
+
+        checkpoint['finished'] = True
+        save_checkpoint()
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {checkpoint['written']} statements for {period} into {out_dir}"
+        ))
+        if checkpoint['failed']:
+            self.stdout.write(self.style.WARNING(
+                f"{len(checkpoint['failed'])} statements failed (customers "
+                f"{', '.join(f'#{customer_id}' for customer_id in checkpoint['failed'])}) - see {checkpoint_path}"
+            ))
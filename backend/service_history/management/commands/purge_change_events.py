@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from service_history.events import purge_old_events
+
+
+class Command(BaseCommand):
+    help = "Delete change feed events older than CHANGE_EVENT_RETENTION_HOURS"
+
+    def handle(self, *args, **options):
+        deleted = purge_old_events()
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} change events"))
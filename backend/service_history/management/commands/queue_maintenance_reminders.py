@@ -0,0 +1,39 @@
+"""
+Queue "service due" reminders - run nightly, e.g. from cron:
+
+    python manage.py queue_maintenance_reminders
+
+For every service type in MAINTENANCE_INTERVALS, one set-based query
+finds the vehicles whose last service of that type is due by date or
+mileage; the reminders are inserted in bulk (see reminder_service).
+Safe to re-run: a reminder is queued once per last service, and the
+counts printed are the rows actually inserted.
+"""
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from service_history.services import reminder_service
+
+
+class Command(BaseCommand):
+    help = "Queue maintenance reminders for vehicles due for service"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', default=None, help='Run as of YYYY-MM-DD (default: today)')
+        parser.add_argument('--batch-size', type=int, default=reminder_service.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            today = parse_date(options['date'])
+            if today is None:
+                raise CommandError(f"Invalid date '{options['date']}', expected YYYY-MM-DD")
+        start = time.perf_counter()
+        results = reminder_service.queue_reminders(today, batch_size=max(1, options['batch_size']))
+        for service_type, (queued, dropped) in results.items():
+            self.stdout.write(f"{service_type}: {queued} queued, {dropped} obsolete dropped")
+        self.stdout.write(self.style.SUCCESS(
+            f"{sum(queued for queued, _ in results.values())} reminders queued "
+            f"in {time.perf_counter() - start:.1f}s"
+        ))
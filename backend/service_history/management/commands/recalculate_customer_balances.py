@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from service_history.services import customer_service
+
+
+class Command(BaseCommand):
+    help = "Rebuild customers' lifetime_spend and outstanding_balance from their invoices"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customer', type=int, help='Only repair this customer ID')
+
+    def handle(self, *args, **options):
+        customer_service.recalculate_customer_totals(options.get('customer'))
+        self.stdout.write(self.style.SUCCESS("Customer balances recalculated"))
@@ -0,0 +1,83 @@
+"""
+Pre-render invoice PDFs in bulk, e.g. for month-end mailing:
+
+    python manage.py render_invoice_pdfs --from 2026-01-01 --to 2026-01-31 --workers 8
+
+Invoice IDs are read from the database and handed to a process pool
+in chunks; each worker loads its chunk with one query. Invoices whose
+current version is already cached are skipped, so re-running is cheap.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from service_history.models import Invoice
+from service_history.services import pdf_service
+
+
+def _parse_date(value):
+    try:
+        return timezone.make_aware(datetime.strptime(value, '%Y-%m-%d'))
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = "Render (and cache) invoice PDFs across a process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='Only invoices created on/after YYYY-MM-DD')
+        parser.add_argument('--to', dest='date_to', help='Only invoices created on/before YYYY-MM-DD')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+        parser.add_argument('--chunk-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        try:
+            import reportlab  # noqa: F401
+        except ImportError:
+            raise CommandError("PDF rendering requires the 'reportlab' package")
+
+        invoices = Invoice.objects.order_by('id')
+        if options['date_from']:
+            invoices = invoices.filter(date_created__gte=_parse_date(options['date_from']))
+        if options['date_to']:
+            end = _parse_date(options['date_to']).replace(hour=23, minute=59, second=59)
+            invoices = invoices.filter(date_created__lte=end)
+
+        chunk_size = max(1, options['chunk_size'])
+        # Read in full first: the workers are forked below, and the parent
+        # must not be reading from a connection the children inherit
+        ids = list(invoices.values_list('id', flat=True))
+        total = len(ids)
+
+        # Forked workers must not share the parent's database sockets
+        # (init_worker also drops any handle that is still open)
+        connections.close_all()
+
+        rendered = cached = done = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=pdf_service.init_worker) as pool:
+            futures = []
+            chunk = []
+            for invoice_id in ids:
+                chunk.append(invoice_id)
+                if len(chunk) == chunk_size:
+                    futures.append(pool.submit(pdf_service.render_invoice_chunk, chunk))
+                    chunk = []
+            if chunk:
+                futures.append(pool.submit(pdf_service.render_invoice_chunk, chunk))
+
+            for future in as_completed(futures):
+                chunk_rendered, chunk_cached = future.result()
+                rendered += chunk_rendered
+                cached += chunk_cached
+                done += chunk_rendered + chunk_cached
+                self.stdout.write(f"\r{done}/{total} invoices", ending='')
+                self.stdout.flush()
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {rendered} PDFs ({cached} already cached) into {pdf_service.cache_dir()}"
+        ))
@@ -0,0 +1,69 @@
+"""
+Re-price open invoices after the tax rate changed, e.g.:
+
+    python manage.py reprice_invoices --dry-run          # show what would change
+    python manage.py reprice_invoices                    # apply BillingSetting.tax_rate
+    python manage.py reprice_invoices --rate 0.1500 --batch-size 2000
+
+Each chunk of invoices is re-priced in its own short transaction, so the
+command can be stopped and re-run; already re-priced invoices are skipped.
+"""
+
+from decimal import Decimal, InvalidOperation
+from django.core.management.base import BaseCommand, CommandError
+from service_history.models import BillingSetting
+from service_history.services import reprice_service
+
+
+class Command(BaseCommand):
+    help = "Re-price unpaid invoices to the current (or a given) tax rate"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rate', help='Tax rate as a fraction, e.g. 0.1500 (default: billing settings)')
+        parser.add_argument('--dry-run', action='store_true', help='Print the changes without saving them')
+        parser.add_argument('--batch-size', type=int, default=reprice_service.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--show', type=int, default=50,
+                            help='Print at most this many invoice diffs (0 for none)')
+
+    def handle(self, *args, **options):
+        rate = options['rate']
+        if rate is None:
+            settings = BillingSetting.objects.first()
+            if settings is None:
+                raise CommandError("No billing settings found - pass --rate")
+            rate = settings.tax_rate
+        try:
+            rate = Decimal(str(rate)).quantize(Decimal('0.0001'))
+        except InvalidOperation:
+            raise CommandError("--rate must be a number such as 0.1500")
+        if not Decimal('0') <= rate < Decimal('1'):
+            raise CommandError("--rate must be between 0 and 1")
+
+        shown = 0
+        balance_change = Decimal('0')
+
+        def report(invoice, old):
+            nonlocal shown, balance_change
+            balance_change += invoice.balance_due - old['balance_due']
+            if shown < options['show']:
+                shown += 1
+                self.stdout.write(
+                    f"{invoice.invoice_number}: subtotal {old['subtotal']} -> {invoice.subtotal}, "
+                    f"tax {old['tax_amount']} -> {invoice.tax_amount}, "
+                    f"total {old['total']} -> {invoice.total}, "
+                    f"balance {old['balance_due']} -> {invoice.balance_due}"
+                )
+
+        totals = reprice_service.reprice_open_invoices(
+            rate,
+            dry_run=options['dry_run'],
+            batch_size=max(1, options['batch_size']),
+            on_change=report,
+        )
+        if totals['invoices'] > shown:
+            self.stdout.write(f"... and {totals['invoices'] - shown} more")
+        verb = "Would re-price" if options['dry_run'] else "Re-priced"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {totals['invoices']} invoices to tax rate {rate} in {totals['batches']} batches "
+            f"(outstanding balance change {balance_change:+})"
+        ))
@@ -0,0 +1,20 @@
+"""
+Scrape-time metrics for the service_history app (see utils/metrics)
+Registered in apps.py ready()
+"""
+
+from django.db.models import Count
+from .models import Service
+
+
+def open_jobs_by_status():
+    # One GROUP BY on the (status, date) index per scrape
+    counts = dict(
+        Service.objects.exclude(status='Completed')
+        .values_list('status').annotate(total=Count('id')).order_by()
+    )
+    samples = [
+        ({'status': status}, counts.get(status, 0))
+        for status, _ in Service.STATUS_CHOICES if status != 'Completed'
+    ]
+    return [('open_jobs', 'gauge', 'Services not yet completed, by status', samples)]
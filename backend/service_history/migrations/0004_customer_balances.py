@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-19 14:52
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_customer_balances(apps, schema_editor):
+    # Seed the new denormalized columns from existing invoices
+    Customer = apps.get_model('service_history', 'Customer')
+    Invoice = apps.get_model('service_history', 'Invoice')
+    totals = Invoice.objects.values('customer_id').annotate(
+        paid=Sum('paid_amount'), balance=Sum('balance_due')
+    )
+    for row in totals:
+        Customer.objects.filter(id=row['customer_id']).update(
+            lifetime_spend=row['paid'] or 0,
+            outstanding_balance=row['balance'] or 0
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_history', '0003_alter_payment_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='lifetime_spend',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='outstanding_balance',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_customer_balances, migrations.RunPython.noop),
+    ]
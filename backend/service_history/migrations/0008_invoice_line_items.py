@@ -0,0 +1,80 @@
+# Generated by Django 6.0 on 2026-10-19 15:02
+
+import django.db.models.deletion
+from decimal import Decimal, InvalidOperation
+from django.db import migrations, models
+
+BACKFILL_CHUNK = 1000
+
+
+def _decimal(value, default):
+    try:
+        return Decimal(str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, TypeError, ValueError):
+        return Decimal(default)
+
+
+def backfill_line_items(apps, schema_editor):
+    # Copy every invoice's JSON line items into the new table,
+    # walking invoices by id in chunks so memory stays flat
+    Invoice = apps.get_model('service_history', 'Invoice')
+    InvoiceLineItem = apps.get_model('service_history', 'InvoiceLineItem')
+    last_id = 0
+    while True:
+        chunk = list(
+            Invoice.objects.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'date_created', 'line_items')[:BACKFILL_CHUNK]
+        )
+        if not chunk:
+            break
+        rows = []
+        for invoice_id, date_created, line_items in chunk:
+            for position, item in enumerate(line_items or []):
+                if not isinstance(item, dict):
+                    continue
+                quantity = _decimal(item.get('quantity', 1), '1')
+                unit_price = _decimal(item.get('unitPrice', 0), '0')
+                rows.append(InvoiceLineItem(
+                    invoice_id=invoice_id,
+                    position=position,
+                    type=(item.get('type') or 'service')[:20],
+                    description=str(item.get('description') or '')[:255],
+                    detail=item.get('detail') or None,
+                    quantity=quantity,
+                    unit_price=unit_price,
+                    total=_decimal(item.get('total', quantity * unit_price), '0'),
+                    date=date_created,
+                ))
+        InvoiceLineItem.objects.bulk_create(rows, batch_size=BACKFILL_CHUNK)
+        last_id = chunk[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_history', '0007_change_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceLineItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('type', models.CharField(default='service', max_length=20)),
+                ('description', models.CharField(max_length=255)),
+                ('detail', models.TextField(blank=True, null=True)),
+                ('quantity', models.DecimalField(decimal_places=2, default=1, max_digits=10)),
+                ('unit_price', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('date', models.DateTimeField()),
+                ('invoice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='service_history.invoice')),
+            ],
+            options={
+                'db_table': 'invoice_line_items',
+                'ordering': ['invoice_id', 'position'],
+                'indexes': [models.Index(fields=['type', 'description'], name='line_item_type_desc_idx'), models.Index(fields=['date'], name='line_item_date_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_line_items, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,120 @@
+# Generated by Django 6.0 on 2026-10-19 15:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_history', '0008_invoice_line_items'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedInvoice',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('invoice_number', models.CharField(max_length=50, unique=True)),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('sent', 'Sent'), ('paid', 'Paid'), ('overdue', 'Overdue'), ('canceled', 'Canceled')], max_length=20)),
+                ('date_created', models.DateTimeField(db_index=True)),
+                ('due_date', models.DateTimeField()),
+                ('line_items', models.JSONField(default=list)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('tax_rate', models.DecimalField(decimal_places=4, default=0.1, max_digits=5)),
+                ('tax_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('paid_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('balance_due', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('payment_terms', models.CharField(default='Net 30', max_length=50)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'archived_invoices',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPayment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('method', models.CharField(choices=[('cash', 'Cash'), ('card', 'Card'), ('check', 'Check'), ('bank_transfer', 'Bank Transfer')], max_length=20)),
+                ('date', models.DateTimeField(db_index=True)),
+                ('reference', models.CharField(blank=True, max_length=100, null=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'archived_payments',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedService',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('type', models.CharField(max_length=100)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('cost', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('tax_included', models.BooleanField(default=False)),
+                ('advance_payment', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('advance_payment_method', models.CharField(blank=True, max_length=20, null=True)),
+                ('remaining_balance', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('date', models.DateTimeField(db_index=True)),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('In Progress', 'In Progress'), ('Completed', 'Completed')], max_length=20)),
+                ('estimated_hours', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('created_at', models.DateTimeField()),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'archived_services',
+            },
+        ),
+        migrations.AlterField(
+            model_name='invoicelineitem',
+            name='invoice',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='service_history.invoice'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['status', 'date'], name='service_status_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedinvoice',
+            name='customer',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_invoices', to='service_history.customer'),
+        ),
+        migrations.AddField(
+            model_name='archivedinvoice',
+            name='vehicle',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_invoices', to='service_history.vehicle'),
+        ),
+        migrations.AddField(
+            model_name='invoicelineitem',
+            name='archived_invoice',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='service_history.archivedinvoice'),
+        ),
+        migrations.AddField(
+            model_name='archivedpayment',
+            name='invoice',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='service_history.archivedinvoice'),
+        ),
+        migrations.AddField(
+            model_name='archivedservice',
+            name='technician',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_services', to='service_history.technician'),
+        ),
+        migrations.AddField(
+            model_name='archivedservice',
+            name='vehicle',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_services', to='service_history.vehicle'),
+        ),
+        migrations.AddField(
+            model_name='archivedinvoice',
+            name='service',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invoices', to='service_history.archivedservice'),
+        ),
+    ]
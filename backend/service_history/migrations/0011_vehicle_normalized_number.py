@@ -0,0 +1,64 @@
+# Generated by Django 6.0 on 2026-10-19 15:40
+
+import logging
+from django.db import migrations, models
+
+BACKFILL_CHUNK = 1000
+PLATE_LENGTH = 20  # max_length of normalized_number
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(number):
+    return ''.join(ch for ch in (number or '') if ch.isalnum()).upper()
+
+
+def backfill_normalized_numbers(apps, schema_editor):
+    # Fill the new column in id order; plates that only differed by case or
+    # separators ("ABC-1234" vs "abc1234") would collide on the unique index,
+    # so later duplicates get their id appended and are reported
+    Vehicle = apps.get_model('service_history', 'Vehicle')
+    seen = set()
+    duplicates = []
+    last_id = 0
+    while True:
+        chunk = list(Vehicle.objects.filter(id__gt=last_id).order_by('id').only('id', 'number')[:BACKFILL_CHUNK])
+        if not chunk:
+            break
+        for vehicle in chunk:
+            normalized = _normalize(vehicle.number)
+            if normalized in seen:
+                duplicates.append(vehicle.id)
+                # Shorten the plate, never the suffix, so the result stays unique
+                suffix = f"~{vehicle.id}"
+                normalized = normalized[:PLATE_LENGTH - len(suffix)] + suffix
+            seen.add(normalized)
+            vehicle.normalized_number = normalized
+        Vehicle.objects.bulk_update(chunk, ['normalized_number'])
+        last_id = chunk[-1].id
+    if duplicates:
+        logger.warning(
+            "normalized_number backfill: vehicles %s duplicate another plate - please review",
+            ', '.join(f"#{vehicle_id}" for vehicle_id in duplicates)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_history', '0010_customer_name_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='normalized_number',
+            field=models.CharField(editable=False, max_length=20, null=True),
+        ),
+        migrations.RunPython(backfill_normalized_numbers, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='vehicle',
+            name='normalized_number',
+            field=models.CharField(editable=False, max_length=20, unique=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-19 15:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_history', '0011_vehicle_normalized_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerDuplicate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('reasons', models.JSONField(default=list)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('dismissed', 'Dismissed')], db_index=True, default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='service_history.customer')),
+                ('duplicate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='service_history.customer')),
+            ],
+            options={
+                'db_table': 'customer_duplicates',
+                'ordering': ['-score', 'id'],
+                'constraints': [models.UniqueConstraint(fields=('customer', 'duplicate'), name='uniq_customer_duplicate_pair')],
+            },
+        ),
+    ]
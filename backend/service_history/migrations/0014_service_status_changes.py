@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-19 15:28
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_history', '0013_request_profiles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceStatusChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('previous_status', models.CharField(blank=True, max_length=20, null=True)),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('In Progress', 'In Progress'), ('Completed', 'Completed')], max_length=20)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('service_type', models.CharField(max_length=100)),
+                ('estimated_hours', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('service', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='status_changes', to='service_history.service')),
+                ('technician', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='service_history.technician')),
+            ],
+            options={
+                'db_table': 'service_status_changes',
+                'indexes': [models.Index(fields=['service', 'changed_at'], name='status_change_service_idx'), models.Index(fields=['status', 'changed_at'], name='status_change_status_idx')],
+            },
+        ),
+    ]
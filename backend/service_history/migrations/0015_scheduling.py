@@ -0,0 +1,57 @@
+# Generated by Django 6.0 on 2026-10-19 15:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_history', '0014_service_status_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Bay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'db_table': 'bays',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Appointment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('status', models.CharField(choices=[('booked', 'Booked'), ('canceled', 'Canceled')], default='booked', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointments', to='service_history.service')),
+                ('technician', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='appointments', to='service_history.technician')),
+                ('bay', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='appointments', to='service_history.bay')),
+            ],
+            options={
+                'db_table': 'appointments',
+                'indexes': [models.Index(fields=['bay', 'start'], name='appointment_bay_start_idx'), models.Index(fields=['technician', 'start'], name='appointment_tech_start_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TechnicianShift',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('technician', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shifts', to='service_history.technician')),
+            ],
+            options={
+                'db_table': 'technician_shifts',
+                'indexes': [models.Index(fields=['technician', 'weekday'], name='shift_technician_day_idx')],
+            },
+        ),
+    ]
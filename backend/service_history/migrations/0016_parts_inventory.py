@@ -0,0 +1,50 @@
+# Generated by Django 6.0 on 2026-10-19 15:33
+
+import django.db.models.deletion
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_history', '0015_scheduling'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Part',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sku', models.CharField(max_length=50, unique=True)),
+                ('name', models.CharField(max_length=150)),
+                ('unit_price', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('on_hand', models.IntegerField(default=0)),
+                ('reserved', models.IntegerField(default=0)),
+                ('reorder_level', models.IntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'db_table': 'parts',
+                'ordering': ['sku'],
+                'indexes': [models.Index(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('on_hand'), '-', models.F('reserved')), '-', models.F('reorder_level')), name='part_headroom_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('reserved__gte', 0)), name='part_reserved_not_negative'), models.CheckConstraint(condition=models.Q(('reserved__lte', models.F('on_hand'))), name='part_reserved_lte_on_hand'), models.CheckConstraint(condition=models.Q(('reorder_level__gte', 0)), name='part_reorder_level_not_negative')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ServicePart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('unit_price', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('status', models.CharField(choices=[('reserved', 'Reserved'), ('consumed', 'Consumed'), ('released', 'Released')], default='reserved', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('part', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='service_parts', to='service_history.part')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parts', to='service_history.service')),
+            ],
+            options={
+                'db_table': 'service_parts',
+                'indexes': [models.Index(fields=['service', 'status'], name='service_part_service_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 6.0 on 2026-10-19 15:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_history', '0017_statement_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaintenanceReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service_type', models.CharField(max_length=100)),
+                ('due_date', models.DateField()),
+                ('due_mileage', models.IntegerField(blank=True, null=True)),
+                ('reasons', models.JSONField(default=list)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('dismissed', 'Dismissed')], db_index=True, default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'maintenance_reminders',
+                'ordering': ['due_date', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='mileage',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['type', 'status', 'vehicle', 'date'], name='service_type_vehicle_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='maintenancereminder',
+            name='last_service',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='service_history.service'),
+        ),
+        migrations.AddField(
+            model_name='maintenancereminder',
+            name='vehicle',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='maintenance_reminders', to='service_history.vehicle'),
+        ),
+        migrations.AddConstraint(
+            model_name='maintenancereminder',
+            constraint=models.UniqueConstraint(fields=('last_service',), name='uniq_reminder_last_service'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-19 15:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_history', '0018_maintenance_reminders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='archived_service',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='appointments', to='service_history.archivedservice'),
+        ),
+        migrations.AddField(
+            model_name='servicepart',
+            name='archived_service',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='parts', to='service_history.archivedservice'),
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='service',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='appointments', to='service_history.service'),
+        ),
+        migrations.AlterField(
+            model_name='servicepart',
+            name='service',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='parts', to='service_history.service'),
+        ),
+    ]
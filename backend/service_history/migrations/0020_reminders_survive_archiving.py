@@ -0,0 +1,48 @@
+# Generated by Django 6.0 on 2026-10-19 18:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_last_service_date(apps, schema_editor):
+    MaintenanceReminder = apps.get_model('service_history', 'MaintenanceReminder')
+    Service = apps.get_model('service_history', 'Service')
+    MaintenanceReminder.objects.update(last_service_date=Subquery(
+        Service.objects.filter(id=OuterRef('last_service_id')).values('date')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_history', '0019_archive_service_dependents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedservice',
+            name='mileage',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='archivedservice',
+            index=models.Index(fields=['type', 'status', 'vehicle', 'date'], name='archived_type_vehicle_date_idx'),
+        ),
+        migrations.AlterField(
+            model_name='maintenancereminder',
+            name='last_service',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='service_history.service'),
+        ),
+        migrations.AddField(
+            model_name='maintenancereminder',
+            name='last_service_date',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(backfill_last_service_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='maintenancereminder',
+            name='last_service_date',
+            field=models.DateTimeField(),
+        ),
+    ]
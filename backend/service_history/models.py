@@ -1,15 +1,83 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import F
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 import json
 
-class Customer(models.Model):
+class VersionConflict(Exception):
+    """Raised when a row changed since the client read it (optimistic locking)"""
+
+    def __init__(self, instance, expected_version):
+        self.instance = instance
+        self.expected_version = expected_version
+        super().__init__(
+            f"{type(instance).__name__} #{instance.pk} was modified by someone else "
+            f"(expected version {expected_version})"
+        )
+
+
+class OutboxModel(models.Model):
+    """
+    Abstract base for models on the live change feed
+    Their post_save signal writes a ChangeEvent (the outbox); saving inside
+    an atomic block makes the row and its event commit or roll back together
+    even when the caller is in autocommit. Deletes need nothing extra -
+    Django already sends post_delete inside its own delete transaction.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class VersionedModel(models.Model):
+    """
+    Abstract base adding a row version for optimistic concurrency control
+    - Every update bumps `version`
+    - save(expected_version=n) only succeeds if the row is still at version n:
+      UPDATE ... SET version = version + 1 WHERE id = ? AND version = n
+      and raises VersionConflict otherwise (no long-held row locks)
+    """
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, expected_version=None, **kwargs):
+        if self._state.adding or self.pk is None:
+            return super().save(*args, **kwargs)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'version' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['version']
+
+        with transaction.atomic():
+            if expected_version is not None:
+                # Conditional claim - matches 0 rows if someone saved first
+                claimed = type(self)._base_manager.filter(
+                    pk=self.pk, version=expected_version
+                ).update(version=F('version') + 1)
+                if not claimed:
+                    raise VersionConflict(self, expected_version)
+                self.version = int(expected_version) + 1
+            else:
+                self.version = (self.version or 0) + 1
+            super().save(*args, **kwargs)
+
+
+class Customer(OutboxModel):
     """
     Customer Model - Stores client information for the garage
     This creates the 'customers' table in MySQL database
     """
     
     # Primary identification field (auto-incrementing ID is automatic)
-    name = models.CharField(max_length=100)  # Customer's full name
+    name = models.CharField(max_length=100, db_index=True)  # Customer's full name (indexed for prefix search)
     
     # National Identity Card number - unique to prevent duplicates
     nic = models.CharField(max_length=20, unique=True, null=True, blank=True)
@@ -24,6 +92,11 @@ class Customer(models.Model):
     # Timestamp - automatically set when customer is created
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Denormalized billing totals - kept in sync incrementally by the invoice
+    # signal handlers (see signals.py), so balance lookups never scan invoices
+    lifetime_spend = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # Sum of paid_amount
+    outstanding_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0, db_index=True)  # Sum of balance_due
+
     class Meta:
         db_table = 'customers'  # MySQL table name
 
@@ -32,7 +105,12 @@ class Customer(models.Model):
         return self.name
 
 
-class Vehicle(models.Model):
+def normalize_plate(number):
+    # "abc 1234", "ABC-1234" and "abc1234" all become "ABC1234"
+    return ''.join(ch for ch in (number or '') if ch.isalnum()).upper()
+
+
+class Vehicle(OutboxModel):
     """
     Vehicle Model - Stores vehicle information linked to customers
     Each vehicle belongs to one customer (Foreign Key relationship)
@@ -48,6 +126,8 @@ class Vehicle(models.Model):
     model = models.CharField(max_length=50)  # e.g., Corolla, Civic
     year = models.CharField(max_length=4)    # Manufacturing year
     number = models.CharField(max_length=20, unique=True)  # License plate (unique)
+    # Plate without case/separators - set on save, used for lookups/typeahead
+    normalized_number = models.CharField(max_length=20, unique=True, editable=False)
     
     # Optional vehicle details
     color = models.CharField(max_length=30, null=True, blank=True)
@@ -64,8 +144,16 @@ class Vehicle(models.Model):
         # Display format: "ABC-1234 - Toyota Corolla"
         return f"{self.number} - {self.brand} {self.model}"
 
+    def save(self, *args, **kwargs):
+        # Keep the normalized plate in step with the displayed one
+        self.normalized_number = normalize_plate(self.number)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'number' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'normalized_number'}
+        super().save(*args, **kwargs)
 
-class Technician(models.Model):
+
+class Technician(OutboxModel):
     # Standard auto-incrementing ID
     name = models.CharField(max_length=100)
     specialization = models.CharField(max_length=100, null=True, blank=True)
@@ -80,7 +168,7 @@ class Technician(models.Model):
         return self.name
 
 
-class Service(models.Model):
+class Service(VersionedModel, OutboxModel):
     STATUS_CHOICES = [
         ('Pending', 'Pending'),
         ('In Progress', 'In Progress'),
@@ -105,16 +193,223 @@ class Service(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
     technician = models.ForeignKey(Technician, on_delete=models.SET_NULL, null=True, blank=True, related_name='services')
     estimated_hours = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    mileage = models.IntegerField(null=True, blank=True)  # Odometer reading at the service (drives reminders)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = 'services'
+        indexes = [
+            # Archival candidate scan: completed jobs older than the cutoff
+            models.Index(fields=['status', 'date'], name='service_status_date_idx'),
+            # Maintenance reminders: latest completed service of a type, per vehicle
+            models.Index(fields=['type', 'status', 'vehicle', 'date'], name='service_type_vehicle_date_idx'),
+        ]
 
     def __str__(self):
         return f"Job #{self.id} - {self.vehicle.number}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Remember the loaded status so the post_save signal can log
+        # transitions (ServiceStatusChange) without re-reading the row
+        instance = super().from_db(db, field_names, values)
+        instance.snapshot_status()
+        return instance
+
+    def snapshot_status(self):
+        self._status_snapshot = None if 'status' in self.get_deferred_fields() else self.status
+
 
-class Invoice(models.Model):
+class ServiceStatusChange(models.Model):
+    """
+    Append-only log of service status transitions, one row per change
+    (including the initial status when a service is created). Written by
+    the Service post_save signal and by bulk_update_service_status().
+
+    Type, technician and estimate are copied from the service at the time
+    of the change, and the service link has no database constraint, so
+    the log outlives archived and deleted services.
+    """
+    service = models.ForeignKey(
+        Service, on_delete=models.DO_NOTHING, db_constraint=False, related_name='status_changes'
+    )
+    previous_status = models.CharField(max_length=20, null=True, blank=True)  # None: service created
+    status = models.CharField(max_length=20, choices=Service.STATUS_CHOICES)
+    changed_at = models.DateTimeField(default=timezone.now)
+    service_type = models.CharField(max_length=100)
+    technician = models.ForeignKey(
+        Technician, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    estimated_hours = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'service_status_changes'
+        indexes = [
+            # One service's timeline
+            models.Index(fields=['service', 'changed_at'], name='status_change_service_idx'),
+            # "Completed since ..." scans for the analytics
+            models.Index(fields=['status', 'changed_at'], name='status_change_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job #{self.service_id}: {self.previous_status or '-'} -> {self.status}"
+
+    @classmethod
+    def for_service(cls, service, previous_status, changed_at=None):
+        # Build (but do not save) the log row for service's current status
+        return cls(
+            service_id=service.pk,
+            previous_status=previous_status,
+            status=service.status,
+            changed_at=changed_at or timezone.now(),
+            service_type=service.type,
+            technician_id=service.technician_id,
+            estimated_hours=service.estimated_hours or 0,
+        )
+
+
+class Bay(models.Model):
+    """A workshop bay - one vehicle at a time"""
+    name = models.CharField(max_length=50, unique=True)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        db_table = 'bays'
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class TechnicianShift(models.Model):
+    """A technician's recurring weekly working hours (local time)"""
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'),
+        (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday'),
+    ]
+
+    technician = models.ForeignKey(Technician, on_delete=models.CASCADE, related_name='shifts')
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+
+    class Meta:
+        db_table = 'technician_shifts'
+        indexes = [
+            models.Index(fields=['technician', 'weekday'], name='shift_technician_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.technician} {self.get_weekday_display()} {self.start_time:%H:%M}-{self.end_time:%H:%M}"
+
+
+class Appointment(OutboxModel):
+    """
+    A service booked into a bay (and optionally a technician) for
+    [start, end), where end = start + the service's estimated hours.
+    Booked appointments never overlap on the same bay or technician
+    (enforced by schedule_service.book_appointment()).
+    """
+    STATUS_CHOICES = [
+        ('booked', 'Booked'),
+        ('canceled', 'Canceled'),
+    ]
+
+    # Exactly one of service / archived_service is set; archival re-points
+    # the rows (as for invoice line items) so booking history is kept
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, null=True, blank=True, related_name='appointments')
+    archived_service = models.ForeignKey('ArchivedService', on_delete=models.CASCADE, null=True, blank=True, related_name='appointments')
+    bay = models.ForeignKey(Bay, on_delete=models.PROTECT, related_name='appointments')
+    technician = models.ForeignKey(Technician, on_delete=models.SET_NULL, null=True, blank=True, related_name='appointments')
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='booked')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'appointments'
+        indexes = [
+            # Overlap checks: start < new end AND end > new start, per resource
+            models.Index(fields=['bay', 'start'], name='appointment_bay_start_idx'),
+            models.Index(fields=['technician', 'start'], name='appointment_tech_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job #{self.service_id} in {self.bay} at {self.start:%Y-%m-%d %H:%M}"
+
+
+class Part(models.Model):
+    """
+    A stocked part. Stock moves only through conditional UPDATEs in
+    inventory_service (never read-modify-write):
+    - on_hand:  physically in the store room
+    - reserved: promised to open services, still on the shelf
+    available = on_hand - reserved; low stock = available <= reorder_level
+    """
+    sku = models.CharField(max_length=50, unique=True)
+    name = models.CharField(max_length=150)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Signed columns: MySQL rejects UNSIGNED subtraction results below
+    # zero, and the headroom expression goes negative by design
+    on_hand = models.IntegerField(default=0)
+    reserved = models.IntegerField(default=0)
+    reorder_level = models.IntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        db_table = 'parts'
+        ordering = ['sku']
+        indexes = [
+            # Low-stock report: headroom <= 0 is a range scan on this
+            # expression index (see inventory_service.low_stock_parts())
+            models.Index(F('on_hand') - F('reserved') - F('reorder_level'), name='part_headroom_idx'),
+        ]
+        constraints = [
+            # Last line of defence behind the conditional UPDATEs
+            models.CheckConstraint(condition=models.Q(reserved__gte=0), name='part_reserved_not_negative'),
+            models.CheckConstraint(condition=models.Q(reserved__lte=F('on_hand')), name='part_reserved_lte_on_hand'),
+            models.CheckConstraint(condition=models.Q(reorder_level__gte=0), name='part_reorder_level_not_negative'),
+        ]
+
+    def __str__(self):
+        return f"{self.sku} - {self.name}"
+
+    @property
+    def available(self):
+        return self.on_hand - self.reserved
+
+
+class ServicePart(models.Model):
+    """
+    A part used on a service: reserved while the job is open, consumed
+    (taken out of on_hand) when it completes, or released if removed
+    """
+    STATUS_CHOICES = [
+        ('reserved', 'Reserved'),
+        ('consumed', 'Consumed'),
+        ('released', 'Released'),
+    ]
+
+    # Exactly one of service / archived_service is set (see Appointment)
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, null=True, blank=True, related_name='parts')
+    archived_service = models.ForeignKey('ArchivedService', on_delete=models.CASCADE, null=True, blank=True, related_name='parts')
+    part = models.ForeignKey(Part, on_delete=models.PROTECT, related_name='service_parts')
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)  # Price when reserved
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='reserved')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'service_parts'
+        indexes = [
+            models.Index(fields=['service', 'status'], name='service_part_service_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job #{self.service_id}: {self.quantity} x {self.part_id} ({self.status})"
+
+
+class Invoice(VersionedModel, OutboxModel):
     STATUS_CHOICES = [
         ('draft', 'Draft'),
         ('sent', 'Sent'),
@@ -144,12 +439,76 @@ class Invoice(models.Model):
 
     class Meta:
         db_table = 'invoices'
+        indexes = [
+            # Date-range listings and the monthly statement run
+            models.Index(fields=['date_created', 'customer'], name='invoice_date_customer_idx'),
+        ]
 
     def __str__(self):
         return self.invoice_number
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Remember the loaded billing figures so the save/delete signals can
+        # apply only the difference to the customer's denormalized totals
+        instance = super().from_db(db, field_names, values)
+        instance.snapshot_balances()
+        instance.snapshot_line_items()
+        return instance
+
+    def snapshot_line_items(self):
+        # Serialized line_items as persisted, to detect edits on save
+        if 'line_items' in self.get_deferred_fields():
+            self._line_items_snapshot = None
+        else:
+            self._line_items_snapshot = json.dumps(self.line_items, sort_keys=True, default=str)
+
+    def line_items_changed(self):
+        snapshot = getattr(self, '_line_items_snapshot', None)
+        return snapshot is None or snapshot != json.dumps(self.line_items, sort_keys=True, default=str)
+
+    def snapshot_balances(self):
+        # Record (customer, paid, balance) as currently persisted
+        # Skipped for partially loaded rows (.only()/.defer()) to avoid extra queries
+        if self.get_deferred_fields() & {'customer_id', 'paid_amount', 'balance_due'}:
+            self._balance_snapshot = None
+        else:
+            self._balance_snapshot = (self.customer_id, self.paid_amount, self.balance_due)
+
+
+class InvoiceLineItem(models.Model):
+    """
+    One row per invoice line, mirrored from Invoice.line_items on every save
+    (see line_item_service.py) so revenue can be grouped in SQL by type,
+    description or date instead of parsing JSON in Python
+    """
+    # Exactly one of invoice / archived_invoice is set; archival re-points the
+    # rows instead of moving them, so revenue reports always span all history
+    invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, null=True, blank=True, related_name='items')
+    archived_invoice = models.ForeignKey('ArchivedInvoice', on_delete=models.CASCADE, null=True, blank=True, related_name='items')
+    position = models.PositiveIntegerField(default=0)  # Order within the invoice
+    type = models.CharField(max_length=20, default='service')  # service / part / labour ...
+    description = models.CharField(max_length=255)
+    detail = models.TextField(null=True, blank=True)
+    quantity = models.DecimalField(max_digits=10, decimal_places=2, default=1)
+    unit_price = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Copy of invoice.date_created so date-range reports need no join
+    date = models.DateTimeField()
+
+    class Meta:
+        db_table = 'invoice_line_items'
+        ordering = ['invoice_id', 'position']
+        indexes = [
+            models.Index(fields=['type', 'description'], name='line_item_type_desc_idx'),
+            models.Index(fields=['date'], name='line_item_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.invoice_id} #{self.position} {self.description}"
+
 
-class Payment(models.Model):
+class Payment(OutboxModel):
     METHOD_CHOICES = [
         ('cash', 'Cash'),
         ('card', 'Card'),
@@ -167,11 +526,162 @@ class Payment(models.Model):
 
     class Meta:
         db_table = 'payments'
+        indexes = [
+            models.Index(fields=['date'], name='payment_date_idx'),
+        ]
 
     def __str__(self):
         return f"Payment #{self.id} - {self.invoice.invoice_number}"
 
 
+# ========== ARCHIVE (COLD) TABLES ==========
+# Fully paid, completed jobs older than ARCHIVE_AFTER_DAYS are moved here
+# by archive_service.py so the hot tables above stay small.
+# Columns mirror the hot models (same ids) - keep them in step.
+
+class ArchivedService(models.Model):
+    id = models.BigIntegerField(primary_key=True)  # Same id as the original service
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='archived_services')
+    type = models.CharField(max_length=100)
+    description = models.TextField(null=True, blank=True)
+    cost = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    tax_included = models.BooleanField(default=False)
+    advance_payment = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    advance_payment_method = models.CharField(max_length=20, null=True, blank=True)
+    remaining_balance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    date = models.DateTimeField(db_index=True)
+    status = models.CharField(max_length=20, choices=Service.STATUS_CHOICES)
+    technician = models.ForeignKey(Technician, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_services')
+    estimated_hours = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    mileage = models.IntegerField(null=True, blank=True)  # Still drives reminders once archived
+    created_at = models.DateTimeField()
+    version = models.PositiveIntegerField(default=1)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'archived_services'
+        indexes = [
+            # Last archived service of a type per vehicle (reminder_service)
+            models.Index(fields=['type', 'status', 'vehicle', 'date'], name='archived_type_vehicle_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived job #{self.id}"
+
+
+class ArchivedInvoice(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    invoice_number = models.CharField(max_length=50, unique=True)
+    service = models.ForeignKey(ArchivedService, on_delete=models.CASCADE, related_name='invoices')
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='archived_invoices')
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='archived_invoices')
+    status = models.CharField(max_length=20, choices=Invoice.STATUS_CHOICES)
+    date_created = models.DateTimeField(db_index=True)
+    due_date = models.DateTimeField()
+    line_items = models.JSONField(default=list)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    tax_rate = models.DecimalField(max_digits=5, decimal_places=4, default=0.1000)
+    tax_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    paid_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    balance_due = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    payment_terms = models.CharField(max_length=50, default='Net 30')
+    notes = models.TextField(null=True, blank=True)
+    version = models.PositiveIntegerField(default=1)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'archived_invoices'
+
+    def __str__(self):
+        return self.invoice_number
+
+
+class ArchivedPayment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    invoice = models.ForeignKey(ArchivedInvoice, on_delete=models.CASCADE, related_name='payments')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    method = models.CharField(max_length=20, choices=Payment.METHOD_CHOICES)
+    date = models.DateTimeField(db_index=True)
+    reference = models.CharField(max_length=100, null=True, blank=True)
+    notes = models.TextField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'archived_payments'
+
+    def __str__(self):
+        return f"Archived payment #{self.id}"
+
+
+class CustomerDuplicate(models.Model):
+    """
+    A likely duplicate customer pair found by the dedupe job
+    (dedupe_service.py). Staff either merge the pair or dismiss it;
+    dismissed pairs are not suggested again.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('dismissed', 'Dismissed'),
+    ]
+
+    # Always stored lower id first so a pair has one row
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='+')
+    duplicate = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()  # 0..1, higher = more likely the same person
+    reasons = models.JSONField(default=list)  # e.g. ["phone", "email", "name"]
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'customer_duplicates'
+        ordering = ['-score', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['customer', 'duplicate'], name='uniq_customer_duplicate_pair'),
+        ]
+
+    def __str__(self):
+        return f"{self.customer_id} ~ {self.duplicate_id} ({self.score:.2f})"
+
+
+class MaintenanceReminder(models.Model):
+    """
+    A "service due" reminder queued by the nightly reminder job
+    (reminder_service.py). One per last service of a type, so re-running
+    the job never queues the same reminder twice; a newer service of
+    that type makes a pending reminder obsolete.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('dismissed', 'Dismissed'),
+    ]
+
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='maintenance_reminders')
+    service_type = models.CharField(max_length=100)  # e.g. "Oil Change"
+    # No database constraint: the last service may since have been archived
+    # (archived_services keeps its id), and the reminder must survive that
+    last_service = models.ForeignKey(Service, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    last_service_date = models.DateTimeField()  # Its date, so a newer service can be spotted without it
+    due_date = models.DateField()  # Last service date + the type's interval
+    due_mileage = models.IntegerField(null=True, blank=True)  # Odometer reading it is due at (if known)
+    reasons = models.JSONField(default=list)  # e.g. ["date", "mileage"]
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'maintenance_reminders'
+        ordering = ['due_date', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['last_service'], name='uniq_reminder_last_service'),
+        ]
+
+    def __str__(self):
+        return f"{self.service_type} due {self.due_date} ({self.vehicle_id})"
+
+
 class BillingSetting(models.Model):
     tax_rate = models.DecimalField(max_digits=5, decimal_places=4, default=0.1000)
     invoice_prefix = models.CharField(max_length=10, default='INV')
@@ -189,4 +699,110 @@ class BillingSetting(models.Model):
         db_table = 'billing_settings'
 
     def __str__(self):
-        return f"Billing Settings - {self.company_name}"
\ No newline at end of file
+        return f"Billing Settings - {self.company_name}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Stores the outcome of a POST sent with an Idempotency-Key header
+    A retry with the same key gets the stored response back instead of
+    creating a second payment/service/invoice (see idempotency.py)
+    """
+    STATUS_CHOICES = [
+        ('processing', 'Processing'),  # First request still running
+        ('completed', 'Completed'),    # Response stored, replay it
+    ]
+
+    key = models.CharField(max_length=255)  # Client-supplied header value
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)  # SHA-256 of the request body
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='processing')
+    response_code = models.IntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)  # Indexed for TTL purge
+
+    class Meta:
+        db_table = 'idempotency_keys'
+        constraints = [
+            # One stored response per key, per user, per endpoint
+            models.UniqueConstraint(fields=['key', 'user', 'method', 'path'], name='uniq_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.method} {self.path} [{self.key}]"
+
+
+class ChangeEvent(models.Model):
+    """
+    Transactional outbox of model changes for the live change feed
+    Rows are written inside the same transaction as the change (feed
+    models save atomically, see OutboxModel; bulk writes call
+    events.record_changes() in their transaction), so a rolled-back
+    change never produces an event and a committed one always has one. The auto-increment id is
+    the SSE event id clients resume from (Last-Event-ID).
+    """
+    ACTION_CHOICES = [
+        ('created', 'Created'),
+        ('updated', 'Updated'),
+        ('deleted', 'Deleted'),
+    ]
+
+    model = models.CharField(max_length=50)  # e.g. 'service', 'invoice'
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)  # Indexed for retention purge
+
+    class Meta:
+        db_table = 'change_events'
+
+    def __str__(self):
+        return f"#{self.id} {self.model} {self.object_id} {self.action}"
+
+
+class RequestProfile(models.Model):
+    """
+    One profiled request (see utils/profiling.py), stored as sampled
+    stacks in folded format: "root;caller;leaf <samples>" per line.
+    Viewable and downloadable from the Django admin.
+    """
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255, db_index=True)
+    query_string = models.CharField(max_length=500, blank=True, default='')
+    status_code = models.PositiveIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField(default=0)
+    sample_count = models.PositiveIntegerField(default=0)
+    sample_interval_ms = models.FloatField()
+    folded_stacks = models.TextField(blank=True, default='')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = 'request_profiles'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+    @classmethod
+    def prune(cls, keep):
+        # Delete everything older than the newest `keep` profiles
+        cutoff = cls.objects.order_by('-id').values_list('id', flat=True)[keep:keep + 1].first()
+        if cutoff is not None:
+            cls.objects.filter(id__lte=cutoff).delete()
+
+    def top_functions(self, limit=25):
+        # [(frame, self samples, total samples)] - "self" = frame was the leaf
+        own = {}
+        total = {}
+        for line in self.folded_stacks.splitlines():
+            stack, _, count = line.rpartition(' ')
+            frames = stack.split(';')
+            count = int(count)
+            own[frames[-1]] = own.get(frames[-1], 0) + count
+            for frame in set(frames):
+                total[frame] = total.get(frame, 0) + count
+        ranked = sorted(own.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(frame, samples, total[frame]) for frame, samples in ranked]
@@ -0,0 +1,167 @@
+"""
+==============================================================
+RESPONSE CACHE (GENERATION-BASED)
+==============================================================
+Caches the serialized data of read-mostly GET endpoints (customers,
+vehicles, technicians) so repeat reads skip the database and the
+serializers entirely.
+
+Cache key = endpoint path + sorted query params + user role
+            + the current *generation* of every model the view reads
+
+Each model has a generation counter that is bumped (after commit)
+whenever one of its rows is saved or deleted - by the post_save /
+post_delete signals, and by events.record_changes() for bulk writes.
+A bump changes every key that depends on the model, so old entries
+are simply never looked up again (no key scanning or deletes); they
+fall out of the LRU.
+
+Storage:
+- Default: a bounded in-memory LRU per worker process
+  (RESPONSE_CACHE_MAX_ENTRIES), entries expire after
+  RESPONSE_CACHE_TIMEOUT seconds - this also bounds how long another
+  worker may serve data from before a write it did not see
+- RESPONSE_CACHE_ALIAS = '<CACHES alias>': generations and entries live
+  in that Django cache (e.g. a FileBasedCache shared by all workers on
+  the host), so a write invalidates every worker at once
+
+Usage (under @permission_classes, like @idempotent):
+    @cached_response(Technician, Service)
+==============================================================
+"""
+
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+GENERATION_PREFIX = 'rc-gen:'
+ENTRY_PREFIX = 'rc:'
+
+
+class LocalLRU:
+    """Thread-safe, size-bounded LRU with per-entry expiry"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_entries = LocalLRU(getattr(settings, 'RESPONSE_CACHE_MAX_ENTRIES', 1000))
+_generations = {}
+_generations_lock = threading.Lock()
+
+
+def _shared_cache():
+    alias = getattr(settings, 'RESPONSE_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def _timeout():
+    return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60)
+
+
+def _label(model):
+    return model._meta.label_lower
+
+
+def get_generation(model):
+    shared = _shared_cache()
+    if shared is not None:
+        return shared.get(GENERATION_PREFIX + _label(model), 0)
+    return _generations.get(_label(model), 0)
+
+
+def _bump(label):
+    shared = _shared_cache()
+    if shared is not None:
+        key = GENERATION_PREFIX + label
+        # add() is a no-op if present; incr() is atomic on real backends
+        shared.add(key, 0, timeout=None)
+        try:
+            shared.incr(key)
+        except ValueError:
+            shared.set(key, 1, timeout=None)
+        return
+    with _generations_lock:
+        _generations[label] = _generations.get(label, 0) + 1
+
+
+def bump_generation(model):
+    # Invalidate every cached response that read this model, once the
+    # current transaction commits (so nobody re-caches the old rows)
+    label = _label(model)
+    transaction.on_commit(lambda: _bump(label))
+
+
+def _cache_key(request, models):
+    user = request.user
+    role = getattr(user, 'role', None) if user and user.is_authenticated else 'anonymous'
+    params = '&'.join(
+        f"{key}={value}" for key in sorted(request.query_params) for value in request.query_params.getlist(key)
+    )
+    generations = ','.join(f"{_label(model)}:{get_generation(model)}" for model in models)
+    raw = f"{request.path}?{params}|{role}|{generations}"
+    return ENTRY_PREFIX + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def cached_response(*models):
+    """
+    Cache successful GET responses of a DRF function view
+    `models`: every model whose rows the response is built from
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+
+            key = _cache_key(request, models)
+            shared = _shared_cache()
+            cached = shared.get(key) if shared is not None else _entries.get(key)
+            if cached is not None:
+                status_code, data = cached
+                response = Response(data, status=status_code)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and isinstance(response, Response):
+                entry = (response.status_code, response.data)
+                if shared is not None:
+                    shared.set(key, entry, _timeout())
+                else:
+                    _entries.set(key, entry, _timeout())
+                response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
@@ -11,21 +11,88 @@ They also validate data before saving:
 - Handle data type conversions
 
 This keeps validation logic separate from models.
+
+Read endpoints accept ?fields= (sparse fieldsets) and ?include=
+(embedded related objects) through ExpandableSerializerMixin.
 ==============================================================
 """
 
+from django.db.models import Count, Prefetch, Q
 from rest_framework import serializers
-from .models import Customer, Vehicle, Technician, Service, Invoice, Payment, BillingSetting
+from .models import (
+    Customer, Vehicle, Technician, Service, Invoice, Payment, BillingSetting,
+    Bay, TechnicianShift, Appointment, Part, ServicePart, ArchivedService, ArchivedInvoice, ArchivedPayment, normalize_plate,
+    MaintenanceReminder,
+)
+from .services.service_service import next_invoice_numbers
 from decimal import Decimal
 import uuid
 
-class CustomerSerializer(serializers.ModelSerializer):
+# Services still occupying a technician (TechnicianSerializer.workload)
+OPEN_SERVICE_STATUSES = ['Pending', 'In Progress']
+
+
+def with_workload(queryset):
+    # Annotate each technician's open job count in the same query,
+    # so serializing N technicians does not run N COUNT queries
+    return queryset.annotate(
+        open_jobs=Count('services', filter=Q(services__status__in=OPEN_SERVICE_STATUSES))
+    )
+
+
+class ExpandableSerializerMixin:
+    """
+    Optional serializer arguments, filled from the query string by views:
+    - fields:  keep only these output fields      (?fields=id,status)
+    - include: embed these related objects        (?include=vehicle,customer)
+               "vehicle.number" in fields trims an embedded object
+
+    INCLUDES maps each include name to (serializer class, source, loader).
+    The loader is a select_related path (one JOIN) or a Prefetch (one extra
+    query for all rows) and is applied by load_includes(), so embedding
+    never costs a query per row.
+    """
+    INCLUDES = {}
+
+    def __init__(self, *args, fields=None, include=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = fields or []
+        for name in include:
+            serializer_class, source, _ = self.INCLUDES[name]
+            # "vehicle.number" trims the embedded vehicle to that field
+            nested_fields = [field.split('.', 1)[1] for field in fields if field.startswith(f'{name}.')]
+            # DRF rejects a source equal to the field name
+            options = {'source': source} if source != name else {}
+            self.fields[name] = serializer_class(read_only=True, fields=nested_fields, **options)
+        top_level = [field for field in fields if '.' not in field]
+        if top_level:
+            keep = set(top_level) | set(include)
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
+
+    @classmethod
+    def load_includes(cls, queryset, include):
+        # JOIN the to-one relations, prefetch the rest
+        select, prefetch = [], []
+        for name in include:
+            loader = cls.INCLUDES[name][2]
+            (prefetch if isinstance(loader, Prefetch) else select).append(loader)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+
+class CustomerSerializer(ExpandableSerializerMixin, serializers.ModelSerializer):
     # Validate and convert Customer data to/from JSON
     
     class Meta:
         model = Customer  # Link to Customer model
-        fields = ['id', 'name', 'nic', 'email', 'phone', 'address', 'created_at']
-        read_only_fields = ['id', 'created_at']  # These fields cannot be set by API
+        fields = ['id', 'name', 'nic', 'email', 'phone', 'address', 'created_at', 'lifetime_spend', 'outstanding_balance']
+        # Balances are maintained by the billing paths, never written directly
+        read_only_fields = ['id', 'created_at', 'lifetime_spend', 'outstanding_balance']
         extra_kwargs = {
             # NIC is optional - can be blank or null
             'nic': {'required': False, 'allow_blank': True, 'allow_null': True},
@@ -56,8 +123,11 @@ class CustomerSerializer(serializers.ModelSerializer):
         return value
 
 
-class VehicleSerializer(serializers.ModelSerializer):
+class VehicleSerializer(ExpandableSerializerMixin, serializers.ModelSerializer):
     # Validate and convert Vehicle data, ensure registration number is unique
+    INCLUDES = {
+        'customer': (CustomerSerializer, 'customer', 'customer'),
+    }
     customerId = serializers.PrimaryKeyRelatedField(
         queryset=Customer.objects.all(), 
         source='customer'
@@ -77,12 +147,16 @@ class VehicleSerializer(serializers.ModelSerializer):
     def validate_number(self, value):
         if self.instance and self.instance.number == value:
             return value
-        if Vehicle.objects.filter(number=value).exists():
+        # "ABC-1234" and "abc 1234" are the same plate
+        duplicates = Vehicle.objects.filter(normalized_number=normalize_plate(value))
+        if self.instance:
+            duplicates = duplicates.exclude(id=self.instance.id)
+        if duplicates.exists():
             raise serializers.ValidationError("A vehicle with this number already exists.")
         return value
 
 
-class TechnicianSerializer(serializers.ModelSerializer):
+class TechnicianSerializer(ExpandableSerializerMixin, serializers.ModelSerializer):
     # Technician info with workload (count of pending services)
     workload = serializers.SerializerMethodField()
     
@@ -92,14 +166,27 @@ class TechnicianSerializer(serializers.ModelSerializer):
 
     def get_workload(self, obj):
         # Only count jobs that are not completed
-        return obj.services.filter(status__in=['Pending', 'In Progress']).count()
+        # Querysets built with with_workload() already carry the count
+        if hasattr(obj, 'open_jobs'):
+            return obj.open_jobs
+        return obj.services.filter(status__in=OPEN_SERVICE_STATUSES).count()
 
 
-class ServiceSerializer(serializers.ModelSerializer):
+class ServiceSerializer(ExpandableSerializerMixin, serializers.ModelSerializer):
     # Service data with auto-invoice on advance payment received
+    # A few technicians cover many services: prefetch them once, with workload
+    INCLUDES = {
+        'vehicle': (VehicleSerializer, 'vehicle', 'vehicle'),
+        'customer': (CustomerSerializer, 'vehicle.customer', 'vehicle__customer'),
+        'technician': (
+            TechnicianSerializer, 'technician',
+            Prefetch('technician', queryset=with_workload(Technician.objects.all())),
+        ),
+    }
     vehicleId = serializers.PrimaryKeyRelatedField(queryset=Vehicle.objects.all(), source='vehicle')
     technicianId = serializers.PrimaryKeyRelatedField(queryset=Technician.objects.all(), source='technician', allow_null=True, required=False)
     estimatedHours = serializers.DecimalField(source='estimated_hours', max_digits=5, decimal_places=2, required=False, default=0)
+    mileage = serializers.IntegerField(required=False, allow_null=True, min_value=0)  # Odometer at the service
     advancePayment = serializers.DecimalField(source='advance_payment', max_digits=10, decimal_places=2, required=False, default=0)
     advancePaymentMethod = serializers.CharField(source='advance_payment_method', required=False, allow_blank=True, allow_null=True)
     taxIncluded = serializers.BooleanField(source='tax_included', required=False, default=False)
@@ -108,8 +195,8 @@ class ServiceSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Service
-        fields = ['id', 'vehicleId', 'type', 'description', 'cost', 'taxIncluded', 'advancePayment', 'advancePaymentMethod', 'remainingBalance', 'date', 'status', 'technicianId', 'estimatedHours', 'createdAt']
-        read_only_fields = ['id', 'createdAt']
+        fields = ['id', 'vehicleId', 'type', 'description', 'cost', 'taxIncluded', 'advancePayment', 'advancePaymentMethod', 'remainingBalance', 'date', 'status', 'technicianId', 'estimatedHours', 'mileage', 'createdAt', 'version']
+        read_only_fields = ['id', 'createdAt', 'version']
         extra_kwargs = {
             'description': {'required': False, 'allow_blank': True, 'allow_null': True},
             'status': {'required': False, 'default': 'Pending'},
@@ -144,22 +231,8 @@ class ServiceSerializer(serializers.ModelSerializer):
         tax_rate = settings.tax_rate if settings else Decimal('0.1000')
         prefix = settings.invoice_prefix if settings else "INV"
         
-        # Generate unique invoice number by finding the highest existing number
-        existing_invoices = Invoice.objects.filter(
-            invoice_number__startswith=prefix
-        ).order_by('-invoice_number').first()
-        
-        if existing_invoices:
-            # Extract number from last invoice (e.g., "INV-1005" -> 1005)
-            try:
-                last_num = int(existing_invoices.invoice_number.split('-')[-1])
-                next_num = last_num + 1
-            except (ValueError, IndexError):
-                next_num = 1001
-        else:
-            next_num = 1001
-        
-        invoice_number = f"{prefix}-{next_num}"
+        # Next free number across live and archived invoices
+        invoice_number = next_invoice_numbers(prefix)[0]
 
         cost = Decimal(str(service.cost))
         tax_included = service.tax_included
@@ -215,7 +288,10 @@ class ServiceSerializer(serializers.ModelSerializer):
         tax_included = validated_data.get('tax_included', instance.tax_included)
         
         validated_data['remaining_balance'] = cost - advance
-        instance = super().update(instance, validated_data)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # Conditional save when the view passed the client's version (If-Match)
+        instance.save(expected_version=self.context.get('expected_version'))
 
         new_status = validated_data.get('status', instance.status)
 
@@ -278,8 +354,13 @@ class ServiceSerializer(serializers.ModelSerializer):
         return instance
 
 
-class InvoiceSerializer(serializers.ModelSerializer):
+class InvoiceSerializer(ExpandableSerializerMixin, serializers.ModelSerializer):
     # Invoice data with auto-calculation of tax, discount, and balance due
+    INCLUDES = {
+        'service': (ServiceSerializer, 'service', 'service'),
+        'customer': (CustomerSerializer, 'customer', 'customer'),
+        'vehicle': (VehicleSerializer, 'vehicle', 'vehicle'),
+    }
     invoiceNumber = serializers.CharField(source='invoice_number', required=False)
     serviceId = serializers.PrimaryKeyRelatedField(queryset=Service.objects.all(), source='service')
     customerId = serializers.PrimaryKeyRelatedField(queryset=Customer.objects.all(), source='customer', required=False)
@@ -299,9 +380,9 @@ class InvoiceSerializer(serializers.ModelSerializer):
             'id', 'invoiceNumber', 'serviceId', 'customerId', 'vehicleId', 
             'status', 'dateCreated', 'dueDate', 'lineItems', 'subtotal', 
             'taxRate', 'taxAmount', 'discount', 'total', 'paidAmount', 
-            'balanceDue', 'paymentTerms', 'notes'
+            'balanceDue', 'paymentTerms', 'notes', 'version'
         ]
-        read_only_fields = ['dateCreated']
+        read_only_fields = ['dateCreated', 'version']
         extra_kwargs = {
             'status': {'required': False, 'default': 'draft'},
             'subtotal': {'required': False, 'default': 0},
@@ -337,22 +418,8 @@ class InvoiceSerializer(serializers.ModelSerializer):
             settings = BillingSetting.objects.first()
             prefix = settings.invoice_prefix if settings else "INV"
             
-            # Generate unique invoice number by finding the highest existing number
-            existing_invoices = Invoice.objects.filter(
-                invoice_number__startswith=prefix
-            ).order_by('-invoice_number').first()
-            
-            if existing_invoices:
-                # Extract number from last invoice (e.g., "INV-1005" -> 1005)
-                try:
-                    last_num = int(existing_invoices.invoice_number.split('-')[-1])
-                    next_num = last_num + 1
-                except (ValueError, IndexError):
-                    next_num = 1001
-            else:
-                next_num = 1001
-            
-            validated_data['invoice_number'] = f"{prefix}-{next_num}"
+            # Next free number across live and archived invoices
+            validated_data['invoice_number'] = next_invoice_numbers(prefix)[0]
         
         if 'due_date' not in validated_data:
             validated_data['due_date'] = timezone.now() + timedelta(days=30)
@@ -400,7 +467,15 @@ class InvoiceSerializer(serializers.ModelSerializer):
         return invoice
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # Conditional save when the view passed the client's version (If-Match)
+        instance.save(expected_version=self.context.get('expected_version'))
+        return instance
+
+
+class PaymentSerializer(ExpandableSerializerMixin, serializers.ModelSerializer):
     # Payment transactions linked to invoices
     invoiceId = serializers.PrimaryKeyRelatedField(queryset=Invoice.objects.all(), source='invoice')
     
@@ -409,6 +484,51 @@ class PaymentSerializer(serializers.ModelSerializer):
         fields = ['id', 'invoiceId', 'amount', 'method', 'date', 'reference', 'notes']
 
 
+# Read-only views of archived rows - same JSON shape as the live serializers,
+# plus "archived": true so the frontend can tell them apart
+
+class ArchivedServiceSerializer(ServiceSerializer):
+    vehicleId = serializers.PrimaryKeyRelatedField(source='vehicle', read_only=True)
+    technicianId = serializers.PrimaryKeyRelatedField(source='technician', read_only=True)
+    archived = serializers.SerializerMethodField()
+
+    class Meta(ServiceSerializer.Meta):
+        model = ArchivedService
+        fields = ServiceSerializer.Meta.fields + ['archived']
+        read_only_fields = fields
+
+    def get_archived(self, obj):
+        return True
+
+
+class ArchivedInvoiceSerializer(InvoiceSerializer):
+    serviceId = serializers.PrimaryKeyRelatedField(source='service', read_only=True)
+    customerId = serializers.PrimaryKeyRelatedField(source='customer', read_only=True)
+    vehicleId = serializers.PrimaryKeyRelatedField(source='vehicle', read_only=True)
+    archived = serializers.SerializerMethodField()
+
+    class Meta(InvoiceSerializer.Meta):
+        model = ArchivedInvoice
+        fields = InvoiceSerializer.Meta.fields + ['archived']
+        read_only_fields = fields
+
+    def get_archived(self, obj):
+        return True
+
+
+class ArchivedPaymentSerializer(PaymentSerializer):
+    invoiceId = serializers.PrimaryKeyRelatedField(source='invoice', read_only=True)
+    archived = serializers.SerializerMethodField()
+
+    class Meta(PaymentSerializer.Meta):
+        model = ArchivedPayment
+        fields = PaymentSerializer.Meta.fields + ['archived']
+        read_only_fields = fields
+
+    def get_archived(self, obj):
+        return True
+
+
 class BillingSettingSerializer(serializers.ModelSerializer):
     # Store billing settings (tax rate, invoice prefix, company info)
     taxRate = serializers.DecimalField(source='tax_rate', max_digits=5, decimal_places=4)
@@ -427,3 +547,98 @@ class BillingSettingSerializer(serializers.ModelSerializer):
             'taxRate', 'invoicePrefix', 'nextInvoiceNumber', 'paymentTerms',
             'companyName', 'companyAddress', 'companyCity', 'companyPhone', 'companyEmail'
         ]
+
+
+class BaySerializer(serializers.ModelSerializer):
+    isActive = serializers.BooleanField(source='is_active', required=False, default=True)
+
+    class Meta:
+        model = Bay
+        fields = ['id', 'name', 'isActive']
+
+
+class TechnicianShiftSerializer(serializers.ModelSerializer):
+    # Weekly working hours; weekday 0 = Monday
+    technicianId = serializers.PrimaryKeyRelatedField(queryset=Technician.objects.all(), source='technician')
+    startTime = serializers.TimeField(source='start_time')
+    endTime = serializers.TimeField(source='end_time')
+
+    class Meta:
+        model = TechnicianShift
+        fields = ['id', 'technicianId', 'weekday', 'startTime', 'endTime']
+
+    def validate(self, data):
+        if data['start_time'] >= data['end_time']:
+            raise serializers.ValidationError("endTime must be after startTime")
+        return data
+
+
+class AppointmentSerializer(serializers.ModelSerializer):
+    # Bookings are created through schedule_service.book_appointment(),
+    # which works out the end time and checks for conflicts
+    serviceId = serializers.PrimaryKeyRelatedField(queryset=Service.objects.all(), source='service')
+    bayId = serializers.PrimaryKeyRelatedField(queryset=Bay.objects.all(), source='bay')
+    technicianId = serializers.PrimaryKeyRelatedField(queryset=Technician.objects.all(), source='technician', allow_null=True, required=False)
+    createdAt = serializers.DateTimeField(source='created_at', read_only=True)
+
+    class Meta:
+        model = Appointment
+        fields = ['id', 'serviceId', 'bayId', 'technicianId', 'start', 'end', 'status', 'createdAt']
+        read_only_fields = ['id', 'end', 'status', 'createdAt']
+
+
+class PartSerializer(serializers.ModelSerializer):
+    # onHand can be set when a part is created; after that stock only
+    # moves through inventory_service (receive / reserve / consume)
+    unitPrice = serializers.DecimalField(source='unit_price', max_digits=10, decimal_places=2, required=False, default=0)
+    onHand = serializers.IntegerField(source='on_hand', min_value=0, required=False, default=0)
+    reorderLevel = serializers.IntegerField(source='reorder_level', min_value=0, required=False, default=0)
+    isActive = serializers.BooleanField(source='is_active', required=False, default=True)
+    available = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Part
+        fields = ['id', 'sku', 'name', 'unitPrice', 'onHand', 'reserved', 'available', 'reorderLevel', 'isActive']
+        read_only_fields = ['id', 'reserved', 'available']
+
+    def update(self, instance, validated_data):
+        validated_data.pop('on_hand', None)
+        return super().update(instance, validated_data)
+
+
+class ServicePartSerializer(serializers.ModelSerializer):
+    partId = serializers.PrimaryKeyRelatedField(queryset=Part.objects.all(), source='part')
+    serviceId = serializers.IntegerField(source='service_id', read_only=True)
+    sku = serializers.CharField(source='part.sku', read_only=True)
+    name = serializers.CharField(source='part.name', read_only=True)
+    quantity = serializers.IntegerField(min_value=1)
+    unitPrice = serializers.DecimalField(source='unit_price', max_digits=10, decimal_places=2, read_only=True)
+    createdAt = serializers.DateTimeField(source='created_at', read_only=True)
+
+    class Meta:
+        model = ServicePart
+        fields = ['id', 'serviceId', 'partId', 'sku', 'name', 'quantity', 'unitPrice', 'status', 'createdAt']
+        read_only_fields = ['id', 'status']
+
+
+class MaintenanceReminderSerializer(serializers.ModelSerializer):
+    # Read-only: reminders are queued by reminder_service.queue_reminders()
+    vehicleId = serializers.IntegerField(source='vehicle_id')
+    vehicleNumber = serializers.CharField(source='vehicle.number')
+    currentMileage = serializers.IntegerField(source='vehicle.mileage')
+    customerName = serializers.CharField(source='vehicle.customer.name')
+    customerPhone = serializers.CharField(source='vehicle.customer.phone')
+    customerEmail = serializers.CharField(source='vehicle.customer.email')
+    serviceType = serializers.CharField(source='service_type')
+    lastServiceId = serializers.IntegerField(source='last_service_id')
+    dueDate = serializers.DateField(source='due_date')
+    dueMileage = serializers.IntegerField(source='due_mileage')
+    createdAt = serializers.DateTimeField(source='created_at')
+    sentAt = serializers.DateTimeField(source='sent_at')
+
+    class Meta:
+        model = MaintenanceReminder
+        fields = ['id', 'vehicleId', 'vehicleNumber', 'currentMileage', 'customerName', 'customerPhone',
+                  'customerEmail', 'serviceType', 'lastServiceId', 'dueDate', 'dueMileage', 'reasons',
+                  'status', 'createdAt', 'sentAt']
+        read_only_fields = fields
@@ -0,0 +1,196 @@
+"""
+==============================================================
+ARCHIVE SERVICE LAYER
+==============================================================
+Hot/cold split for the ever-growing services, invoices and payments
+tables. Completed jobs whose invoices are fully paid and that are
+older than a cutoff are moved - in bounded batches, one transaction
+per batch - into the archived_* tables (same ids, same columns).
+
+What stays consistent:
+- Only jobs that were invoiced count as settled (an uninvoiced
+  completed job still has to be billed)
+- Archived invoices keep their payments and line items (line item
+  rows are re-pointed, not copied, so revenue reports are unaffected);
+  appointments and parts used are re-pointed to the archived service
+- Customer lifetime_spend is NOT reduced: the delete signals are
+  suppressed while a batch is being moved
+- Invoice numbering also looks at archived numbers (no reuse)
+
+Read side: list endpoints only touch the archive when a ?from=/?to=
+date range reaches back past the newest archived row.
+
+Functions:
+- is_archiving(): True while a batch is being moved (checked by signals)
+- settled_services(): Completed, invoiced jobs with nothing left to pay
+- find_candidates(): Next batch of archivable service IDs
+- archive_services(): Move one batch of services with their invoices/payments
+- archive_older_than(): Archive everything older than a cutoff, batch by batch
+- archive_reaches(): Does a date range need the archive tables?
+- filter_date_range(): Apply an inclusive ?from=/?to= day range
+- archived_in_range(): Archived rows for a date range
+==============================================================
+"""
+
+from contextvars import ContextVar
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, Max, OuterRef
+from django.utils import timezone
+from ..models import (
+    Service, Invoice, Payment, InvoiceLineItem, Appointment, ServicePart,
+    ArchivedService, ArchivedInvoice, ArchivedPayment,
+)
+from ..events import record_changes
+
+DEFAULT_BATCH_SIZE = 500
+
+# Set while archive_services() deletes hot rows, so the post_delete
+# handlers neither shrink customer totals nor emit one event per row
+_archiving = ContextVar('archiving', default=False)
+
+
+def is_archiving():
+    return _archiving.get()
+
+
+def default_cutoff():
+    # Records dated before this are eligible (settings.ARCHIVE_AFTER_DAYS)
+    return timezone.now() - timedelta(days=getattr(settings, 'ARCHIVE_AFTER_DAYS', 730))
+
+
+def settled_services():
+    # Completed jobs that were invoiced and have nothing left to pay
+    # (without an invoice the exclude() below would pass vacuously)
+    return (
+        Service.objects.filter(status='Completed')
+        .filter(Exists(Invoice.objects.filter(service_id=OuterRef('id'))))
+        .exclude(invoices__balance_due__gt=0)
+    )
+
+
+def find_candidates(cutoff, after_id=0, limit=DEFAULT_BATCH_SIZE):
+    # Settled jobs older than the cutoff
+    # Keyset pagination on id keeps each probe cheap (status+date index)
+    return list(
+        settled_services().filter(date__lt=cutoff, id__gt=after_id)
+        .exclude(invoices__payments__date__gte=cutoff)
+        .order_by('id')
+        .values_list('id', flat=True)[:limit]
+    )
+
+
+def _copy(instance, archive_model):
+    # Same column names (attnames) on both sides; archived_at is set on insert
+    values = {
+        field.attname: getattr(instance, field.attname)
+        for field in archive_model._meta.concrete_fields
+        if field.attname != 'archived_at'
+    }
+    return archive_model(**values)
+
+
+def archive_services(service_ids):
+    """
+    Move one batch of services (and their invoices and payments) to the
+    archive tables in a single transaction. Returns counts per table.
+    """
+    with transaction.atomic():
+        # Lock the batch and re-check eligibility inside the transaction,
+        # in case a payment or edit landed since find_candidates() ran
+        services = list(settled_services().select_for_update().filter(id__in=service_ids))
+        ids = [service.id for service in services]
+        if not ids:
+            return {'services': 0, 'invoices': 0, 'payments': 0}
+
+        invoices = list(Invoice.objects.filter(service_id__in=ids))
+        invoice_ids = [invoice.id for invoice in invoices]
+        payments = list(Payment.objects.filter(invoice_id__in=invoice_ids))
+
+        # Parents first so the archive foreign keys resolve
+        ArchivedService.objects.bulk_create([_copy(s, ArchivedService) for s in services])
+        ArchivedInvoice.objects.bulk_create([_copy(i, ArchivedInvoice) for i in invoices])
+        ArchivedPayment.objects.bulk_create([_copy(p, ArchivedPayment) for p in payments])
+
+        # Two statements: MySQL applies SET clauses left to right, so
+        # clearing invoice_id in the same UPDATE would copy a NULL
+        InvoiceLineItem.objects.filter(invoice_id__in=invoice_ids).update(archived_invoice_id=F('invoice_id'))
+        InvoiceLineItem.objects.filter(archived_invoice_id__in=invoice_ids).update(invoice=None)
+        # Same for the service's dependents, which would otherwise cascade away
+        for dependent in (Appointment, ServicePart):
+            dependent.objects.filter(service_id__in=ids).update(archived_service_id=F('service_id'))
+            dependent.objects.filter(archived_service_id__in=ids).update(service=None)
+
+        token = _archiving.set(True)
+        try:
+            Payment.objects.filter(id__in=[p.id for p in payments]).delete()
+            Invoice.objects.filter(id__in=invoice_ids).delete()
+            Service.objects.filter(id__in=ids).delete()
+        finally:
+            _archiving.reset(token)
+
+        # One outbox write per table instead of one per deleted row
+        record_changes(Payment, [p.id for p in payments], 'deleted')
+        record_changes(Invoice, invoice_ids, 'deleted')
+        record_changes(Service, ids, 'deleted')
+
+    return {'services': len(ids), 'invoices': len(invoice_ids), 'payments': len(payments)}
+
+
+def archive_older_than(cutoff=None, batch_size=DEFAULT_BATCH_SIZE, max_batches=None):
+    """
+    Archive every eligible record older than `cutoff`, one bounded batch
+    (and one short transaction) at a time. Returns the totals moved.
+    """
+    cutoff = cutoff or default_cutoff()
+    totals = {'services': 0, 'invoices': 0, 'payments': 0, 'batches': 0}
+    last_id = 0
+    while max_batches is None or totals['batches'] < max_batches:
+        batch = find_candidates(cutoff, after_id=last_id, limit=batch_size)
+        if not batch:
+            break
+        moved = archive_services(batch)
+        for key, count in moved.items():
+            totals[key] += count
+        totals['batches'] += 1
+        last_id = batch[-1]
+    return totals
+
+
+# Which date column each archive table is ranged on
+ARCHIVE_DATE_FIELDS = {
+    ArchivedService: 'date',
+    ArchivedInvoice: 'date_created',
+    ArchivedPayment: 'date',
+}
+
+
+def archive_reaches(archive_model, date_from=None, date_to=None):
+    # Only a date range that starts at or before the newest archived row
+    # can match anything in the archive (index-only MAX on the date column)
+    if date_from is None and date_to is None:
+        return False
+    date_field = ARCHIVE_DATE_FIELDS[archive_model]
+    newest = archive_model.objects.aggregate(newest=Max(date_field))['newest']
+    if newest is None:
+        return False
+    return date_from is None or date_from <= timezone.localdate(newest)
+
+
+def filter_date_range(queryset, date_field, date_from=None, date_to=None):
+    # Inclusive calendar-day range as plain datetime bounds, so the
+    # date index is used (DATE(column) comparisons cannot use it)
+    if date_from:
+        start = timezone.make_aware(datetime.combine(date_from, time.min))
+        queryset = queryset.filter(**{f'{date_field}__gte': start})
+    if date_to:
+        end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+        queryset = queryset.filter(**{f'{date_field}__lt': end})
+    return queryset
+
+
+def archived_in_range(archive_model, date_from=None, date_to=None):
+    date_field = ARCHIVE_DATE_FIELDS[archive_model]
+    queryset = filter_date_range(archive_model.objects.all(), date_field, date_from, date_to)
+    return queryset.order_by(date_field)
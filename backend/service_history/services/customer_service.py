@@ -11,14 +11,35 @@ Functions:
 - create_customer(): Create new customer
 - update_customer(): Update customer information
 - delete_customer(): Delete customer from database
+- get_customer_overview(): Customer with vehicles, open jobs and invoices
+- adjust_customer_totals(): Apply paid/balance deltas to stored totals
+- recalculate_customer_totals(): Rebuild stored totals from invoices
+- merge_customers(): Fold a duplicate customer into another one
 ==============================================================
 """
 
-from ..models import Customer
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F, Sum, Prefetch
+from ..models import Customer, Vehicle, Service, Invoice, ArchivedInvoice
+from ..response_cache import bump_generation
 
-def get_all_customers():
-    # Get all customers from database
-    return Customer.objects.all()
+# Allowed ?ordering= values for the customer list (all backed by an index)
+CUSTOMER_ORDERINGS = {
+    'balance': 'outstanding_balance',
+    '-balance': '-outstanding_balance',
+    'name': 'name',
+    '-name': '-name',
+    'created': 'created_at',
+    '-created': '-created_at',
+}
+
+def get_all_customers(ordering=None):
+    # Get all customers from database, optionally sorted (e.g. '-balance')
+    customers = Customer.objects.all()
+    if ordering in CUSTOMER_ORDERINGS:
+        customers = customers.order_by(CUSTOMER_ORDERINGS[ordering], 'id')
+    return customers
 
 def get_customer_by_id(customer_id):
     # Find customer by ID, return None if not found
@@ -54,3 +75,119 @@ def delete_customer(customer_id):
         customer.delete()  # Permanently remove from MySQL
         return True
     return False
+
+def get_customer_overview(customer_id):
+    # Load a customer with everything the detail screen needs in 4 queries:
+    # customer, vehicles, open services (joined to vehicle), invoices
+    open_services = Service.objects.filter(
+        status__in=['Pending', 'In Progress']
+    ).order_by('-date')
+    try:
+        customer = Customer.objects.prefetch_related(
+            Prefetch('vehicles', queryset=Vehicle.objects.order_by('id')),
+            Prefetch('invoices', queryset=Invoice.objects.order_by('-date_created')),
+        ).get(id=customer_id)
+    except (Customer.DoesNotExist, ValueError):
+        return None
+    customer.open_services = list(open_services.filter(vehicle__customer_id=customer.id))
+    return customer
+
+def adjust_customer_totals(customer_id, paid_delta=Decimal('0'), balance_delta=Decimal('0')):
+    # Incrementally update the denormalized totals with a single UPDATE
+    # F() expressions let the database do the addition, so concurrent
+    # payments on different invoices never overwrite each other
+    if not customer_id or (not paid_delta and not balance_delta):
+        return
+    from ..events import record_changes
+    with transaction.atomic():
+        updated = Customer.objects.filter(id=customer_id).update(
+            lifetime_spend=F('lifetime_spend') + paid_delta,
+            outstanding_balance=F('outstanding_balance') + balance_delta
+        )
+        if updated:
+            # .update() skips signals, so tell the change feed directly
+            # (same transaction, so the outbox row commits with the totals)
+            record_changes(Customer, [customer_id], 'updated')
+
+def recalculate_customer_totals(customer_id=None):
+    # Rebuild lifetime_spend / outstanding_balance from the invoices table
+    # Pass a customer_id for one customer, or None to repair every customer
+    customers = Customer.objects.all()
+    if customer_id is not None:
+        customers = customers.filter(id=customer_id)
+    # Archived invoices are fully paid but still part of lifetime spend
+    archived = {
+        row['customer_id']: row['paid'] or 0
+        for row in ArchivedInvoice.objects.filter(customer__in=customers)
+        .values('customer_id').annotate(paid=Sum('paid_amount'))
+    }
+    totals = Invoice.objects.filter(customer__in=customers).values('customer_id').annotate(
+        paid=Sum('paid_amount'), balance=Sum('balance_due')
+    )
+    with transaction.atomic():
+        customers.update(lifetime_spend=0, outstanding_balance=0)
+        for row in totals:
+            Customer.objects.filter(id=row['customer_id']).update(
+                lifetime_spend=(row['paid'] or 0) + archived.pop(row['customer_id'], 0),
+                outstanding_balance=row['balance'] or 0
+            )
+        for archived_customer_id, paid in archived.items():
+            Customer.objects.filter(id=archived_customer_id).update(lifetime_spend=paid)
+        # Repair path emits no feed events, but cached customer lists are stale
+        bump_generation(Customer)
+
+
+# Profile fields copied from the merged customer when the kept one has none
+MERGE_FILL_FIELDS = ('nic', 'address')
+
+
+def merge_customers(keep_id, merge_id):
+    """
+    Move everything owned by customer `merge_id` to `keep_id`, then delete
+    `merge_id`. Vehicles and invoices are re-pointed with one UPDATE per
+    table (no per-row saves), all inside one transaction.
+    Returns the kept customer, or None if either customer does not exist.
+    """
+    from ..events import record_changes
+    from . import vehicle_service
+
+    if str(keep_id) == str(merge_id):
+        raise ValueError("Cannot merge a customer into itself")
+
+    with transaction.atomic():
+        # Lock both rows in id order so two merges cannot deadlock
+        customers = Customer.objects.select_for_update().order_by('id').in_bulk([keep_id, merge_id])
+        keep = customers.get(int(keep_id))
+        merged = customers.get(int(merge_id))
+        if not keep or not merged:
+            return None
+
+        vehicle_ids = list(Vehicle.objects.filter(customer_id=merged.id).values_list('id', flat=True))
+        invoice_ids = list(Invoice.objects.filter(customer_id=merged.id).values_list('id', flat=True))
+        Vehicle.objects.filter(customer_id=merged.id).update(customer_id=keep.id)
+        # Bump the row version so clients holding the old invoice get a 412
+        Invoice.objects.filter(customer_id=merged.id).update(customer_id=keep.id, version=F('version') + 1)
+        ArchivedInvoice.objects.filter(customer_id=merged.id).update(customer_id=keep.id)
+
+        # Keep the kept customer's profile, filling gaps from the merged one
+        # (unique NIC: release it from the merged row first)
+        fill = {field: getattr(merged, field) for field in MERGE_FILL_FIELDS
+                if not getattr(keep, field) and getattr(merged, field)}
+        if 'nic' in fill:
+            Customer.objects.filter(id=merged.id).update(nic=None)
+        Customer.objects.filter(id=keep.id).update(
+            lifetime_spend=F('lifetime_spend') + merged.lifetime_spend,
+            outstanding_balance=F('outstanding_balance') + merged.outstanding_balance,
+            **fill
+        )
+
+        # Nothing references the merged row any more; its duplicate
+        # suggestions go with it (CASCADE)
+        merged.delete()
+
+        record_changes(Vehicle, vehicle_ids, 'updated')
+        record_changes(Invoice, invoice_ids, 'updated')
+        record_changes(Customer, [keep.id], 'updated')
+        transaction.on_commit(vehicle_service.clear_plate_cache)
+
+    return Customer.objects.get(id=keep.id)
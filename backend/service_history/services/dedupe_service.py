@@ -0,0 +1,173 @@
+"""
+==============================================================
+CUSTOMER DEDUPE SERVICE
+==============================================================
+Finds customers that are probably the same person (same phone in a
+different format, same Gmail address with dots, old vs new NIC ...)
+and stores them as CustomerDuplicate suggestions for staff to merge.
+
+Blocking instead of comparing every pair (O(n^2)):
+1. Stream customers once and derive normalized blocking keys
+   (phone, email, NIC); customers sharing a key land in the same block
+2. Only pairs inside a block are candidates - blocks bigger than
+   MAX_BLOCK_SIZE (a shared office phone, a placeholder email) are skipped
+3. Candidates are scored on all keys plus name similarity
+
+Functions:
+- normalize_phone() / normalize_email() / normalize_nic() / normalize_name()
+- blocking_keys(): Blocking keys for one customer
+- find_candidate_pairs(): Stream customers into blocks, return candidate pairs
+- score_pair(): Similarity score and reasons for two customers
+- find_duplicates(): Run the whole job and store the suggestions
+==============================================================
+"""
+
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from django.db import transaction
+from ..models import Customer, CustomerDuplicate
+
+STREAM_CHUNK = 5000
+MAX_BLOCK_SIZE = 50
+MIN_SCORE = 0.5
+
+# Weight of each matching key in the score (capped at 1.0)
+WEIGHTS = {
+    'nic': 0.6,
+    'email': 0.5,
+    'phone': 0.4,
+    'name': 0.3,  # multiplied by the name similarity ratio
+}
+
+_NON_DIGITS = re.compile(r'\D')
+_NON_ALNUM = re.compile(r'[^0-9A-Z]')
+# Providers that ignore dots in the local part
+_DOTLESS_DOMAINS = {'gmail.com', 'googlemail.com'}
+
+
+def normalize_phone(phone):
+    # "+94 77 123 4567", "077-1234567" and "0771234567" -> "771234567"
+    # (the 9-digit national number, without trunk 0 or country code)
+    digits = _NON_DIGITS.sub('', phone or '')
+    return digits[-9:] if len(digits) >= 9 else None
+
+
+def normalize_email(email):
+    # Lower-case, drop "+tag", and dots for Gmail ("J.Doe+car@Gmail.com" -> "jdoe@gmail.com")
+    email = (email or '').strip().lower()
+    if '@' not in email:
+        return None
+    local, domain = email.rsplit('@', 1)
+    local = local.split('+', 1)[0]
+    if domain in _DOTLESS_DOMAINS:
+        local = local.replace('.', '')
+        domain = 'gmail.com'
+    return f"{local}@{domain}" if local else None
+
+
+def normalize_nic(nic):
+    # Old 9-digit+V NICs are converted to the 12-digit format:
+    # "853400937V" -> "198534000937"
+    nic = _NON_ALNUM.sub('', (nic or '').upper())
+    if re.fullmatch(r'\d{9}[VX]', nic):
+        return f"19{nic[:5]}0{nic[5:9]}"
+    return nic or None
+
+
+def normalize_name(name):
+    # Case/punctuation-insensitive, word order ignored ("Doe, John" == "john doe")
+    words = re.findall(r'[a-z0-9]+', (name or '').lower())
+    return ' '.join(sorted(words))
+
+
+def blocking_keys(email, phone, nic):
+    keys = []
+    for kind, value in (('email', normalize_email(email)), ('phone', normalize_phone(phone)), ('nic', normalize_nic(nic))):
+        if value:
+            keys.append(f"{kind}:{value}")
+    return keys
+
+
+def find_candidate_pairs():
+    """
+    One pass over the table (id keyset chunks, only the key columns)
+    Returns a set of (lower_id, higher_id) pairs that share a block
+    """
+    blocks = defaultdict(list)
+    last_id = 0
+    while True:
+        chunk = list(
+            Customer.objects.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'email', 'phone', 'nic')[:STREAM_CHUNK]
+        )
+        if not chunk:
+            break
+        for customer_id, email, phone, nic in chunk:
+            for key in blocking_keys(email, phone, nic):
+                blocks[key].append(customer_id)
+        last_id = chunk[-1][0]
+
+    pairs = set()
+    for ids in blocks.values():
+        if len(ids) < 2 or len(ids) > MAX_BLOCK_SIZE:
+            continue
+        for i, first in enumerate(ids):
+            for second in ids[i + 1:]:
+                pairs.add((first, second) if first < second else (second, first))
+    return pairs
+
+
+def score_pair(a, b):
+    # Returns (score, reasons) for two Customer rows
+    score = 0.0
+    reasons = []
+    for kind, normalize, field in (
+        ('nic', normalize_nic, 'nic'),
+        ('email', normalize_email, 'email'),
+        ('phone', normalize_phone, 'phone'),
+    ):
+        value = normalize(getattr(a, field))
+        if value and value == normalize(getattr(b, field)):
+            score += WEIGHTS[kind]
+            reasons.append(kind)
+
+    name_a, name_b = normalize_name(a.name), normalize_name(b.name)
+    if name_a and name_b:
+        similarity = SequenceMatcher(None, name_a, name_b).ratio()
+        if similarity >= 0.8:
+            reasons.append('name')
+        score += WEIGHTS['name'] * similarity
+    return min(score, 1.0), reasons
+
+
+def find_duplicates(min_score=MIN_SCORE):
+    """
+    Rebuild the pending duplicate suggestions
+    Dismissed pairs are kept and never re-suggested
+    Returns (candidate pair count, stored suggestion count)
+    """
+    pairs = find_candidate_pairs()
+    dismissed = set(
+        CustomerDuplicate.objects.filter(status='dismissed').values_list('customer_id', 'duplicate_id')
+    )
+    pairs -= dismissed
+
+    suggestions = []
+    ordered = sorted(pairs)
+    for start in range(0, len(ordered), STREAM_CHUNK):
+        batch = ordered[start:start + STREAM_CHUNK]
+        ids = {customer_id for pair in batch for customer_id in pair}
+        customers = Customer.objects.only('id', 'name', 'email', 'phone', 'nic').in_bulk(ids)
+        for first, second in batch:
+            score, reasons = score_pair(customers[first], customers[second])
+            if score >= min_score:
+                suggestions.append(CustomerDuplicate(
+                    customer_id=first, duplicate_id=second,
+                    score=round(score, 3), reasons=reasons,
+                ))
+
+    with transaction.atomic():
+        CustomerDuplicate.objects.filter(status='pending').delete()
+        CustomerDuplicate.objects.bulk_create(suggestions, batch_size=1000, ignore_conflicts=True)
+    return len(pairs), len(suggestions)
@@ -0,0 +1,121 @@
+"""
+==============================================================
+INVENTORY SERVICE LAYER (PARTS & STOCK)
+==============================================================
+Services reserve parts while the job is open; completing the service
+consumes them.
+
+Every stock change is a single conditional UPDATE, so concurrent
+requests can never oversell or drive a counter negative - the
+database checks and changes the row in one statement, no
+read-modify-write:
+
+    reserve:  SET reserved = reserved + q
+              WHERE id = ? AND on_hand >= reserved + q
+    release:  SET reserved = reserved - q                (row claimed first)
+    consume:  SET on_hand = on_hand - q, reserved = reserved - q
+    receive:  SET on_hand = on_hand + q
+
+A reservation that matches 0 rows raises OutOfStock.
+
+Functions:
+- reserve_part(): Reserve stock for a service (raises OutOfStock)
+- release_part(): Give a reservation back (idempotent)
+- release_stock(): Un-reserve stock directly (deleted reservations)
+- consume_for_services(): Turn reservations into usage when services complete
+- receive_stock(): Book a delivery into on_hand
+- low_stock_parts(): Parts at or below their reorder level (indexed)
+==============================================================
+"""
+
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import F
+from ..models import Part, ServicePart
+
+
+class OutOfStock(Exception):
+    """Not enough unreserved stock for a reservation"""
+
+    def __init__(self, part, requested):
+        self.part = part
+        self.requested = requested
+        available = part.available if part else 0
+        super().__init__(
+            f"Only {available} of {part.sku if part else 'this part'} available ({requested} requested)"
+        )
+
+
+def reserve_part(service, part_id, quantity):
+    """
+    Reserve `quantity` of a part for `service`
+    Returns the ServicePart; raises OutOfStock (also for unknown/inactive parts)
+    """
+    with transaction.atomic():
+        reserved = Part.objects.filter(
+            id=part_id, is_active=True, on_hand__gte=F('reserved') + quantity
+        ).update(reserved=F('reserved') + quantity)
+        part = Part.objects.filter(id=part_id).first()
+        if not reserved:
+            raise OutOfStock(part, quantity)
+        return ServicePart.objects.create(
+            service=service, part=part, quantity=quantity, unit_price=part.unit_price
+        )
+
+
+def release_part(service_part):
+    """
+    Return a reservation to stock; a no-op if it was already consumed or
+    released (the status change is claimed with a conditional UPDATE)
+    Returns True if stock was released
+    """
+    with transaction.atomic():
+        claimed = ServicePart.objects.filter(id=service_part.id, status='reserved').update(status='released')
+        if claimed:
+            release_stock(service_part.part_id, service_part.quantity)
+            service_part.status = 'released'
+    return bool(claimed)
+
+
+def release_stock(part_id, quantity):
+    Part.objects.filter(id=part_id).update(reserved=F('reserved') - quantity)
+
+
+def consume_for_services(service_ids):
+    """
+    Consume every open reservation of the given (now completed) services:
+    one UPDATE per distinct part, in part id order so concurrent
+    completions cannot deadlock
+    Returns the number of ServicePart rows consumed
+    """
+    with transaction.atomic():
+        rows = list(
+            ServicePart.objects.select_for_update()
+            .filter(service_id__in=service_ids, status='reserved')
+            .values_list('id', 'part_id', 'quantity')
+        )
+        if not rows:
+            return 0
+        ServicePart.objects.filter(id__in=[row[0] for row in rows]).update(status='consumed')
+        totals = defaultdict(int)
+        for _, part_id, quantity in rows:
+            totals[part_id] += quantity
+        for part_id in sorted(totals):
+            Part.objects.filter(id=part_id).update(
+                on_hand=F('on_hand') - totals[part_id], reserved=F('reserved') - totals[part_id]
+            )
+    return len(rows)
+
+
+def receive_stock(part_id, quantity):
+    # Returns False for an unknown part
+    return bool(Part.objects.filter(id=part_id).update(on_hand=F('on_hand') + quantity))
+
+
+def low_stock_parts():
+    # Same expression as Part's part_headroom_idx, so the filter is an index range scan
+    return (
+        Part.objects.alias(headroom=F('on_hand') - F('reserved') - F('reorder_level'))
+        .filter(headroom__lte=0, is_active=True)
+        .order_by('headroom')
+    )
@@ -0,0 +1,64 @@
+"""
+==============================================================
+INVOICE LINE ITEM SERVICE
+==============================================================
+Keeps the invoice_line_items table in step with Invoice.line_items.
+The JSON column stays the API/PDF format ("lineItems"); the table is
+the indexed copy used for revenue analytics (report_service.py).
+
+Functions:
+- build_line_items(): Unsaved InvoiceLineItem rows for an invoice
+- sync_line_items(): Replace an invoice's rows from its JSON
+- create_line_items(): Bulk-insert rows for freshly bulk-created invoices
+==============================================================
+"""
+
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from ..models import InvoiceLineItem
+
+
+def _decimal(value, default):
+    # JSON numbers arrive as float/int/str (or garbage from old clients)
+    try:
+        return Decimal(str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, TypeError, ValueError):
+        return Decimal(default)
+
+
+def build_line_items(invoice, line_items=None, date=None):
+    # Convert the JSON list into unsaved rows (invoice must have an id)
+    rows = []
+    items = invoice.line_items if line_items is None else line_items
+    for position, item in enumerate(items or []):
+        if not isinstance(item, dict):
+            continue
+        quantity = _decimal(item.get('quantity', 1), '1')
+        unit_price = _decimal(item.get('unitPrice', 0), '0')
+        rows.append(InvoiceLineItem(
+            invoice_id=invoice.id,
+            position=position,
+            type=(item.get('type') or 'service')[:20],
+            description=str(item.get('description') or '')[:255],
+            detail=item.get('detail') or None,
+            quantity=quantity,
+            unit_price=unit_price,
+            total=_decimal(item.get('total', quantity * unit_price), '0'),
+            date=date or invoice.date_created,
+        ))
+    return rows
+
+
+def sync_line_items(invoice):
+    # Replace the invoice's table rows with what its JSON says now
+    with transaction.atomic(using=invoice._state.db):
+        InvoiceLineItem.objects.filter(invoice_id=invoice.id).delete()
+        InvoiceLineItem.objects.bulk_create(build_line_items(invoice))
+
+
+def create_line_items(invoices):
+    # For invoices inserted with bulk_create (no post_save signal)
+    rows = []
+    for invoice in invoices:
+        rows.extend(build_line_items(invoice))
+    InvoiceLineItem.objects.bulk_create(rows, batch_size=1000)
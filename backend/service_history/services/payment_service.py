@@ -0,0 +1,41 @@
+"""
+==============================================================
+PAYMENT SERVICE LAYER
+==============================================================
+This layer keeps invoices (and their services) in step with the
+payments recorded against them.
+
+Functions:
+- sync_invoice_payments(): Recalculate invoice paid_amount/balance_due
+  from its payments and mirror the balance onto the service
+==============================================================
+"""
+
+from django.db.models import Sum
+from ..models import Payment
+
+
+def sync_invoice_payments(invoice):
+    # Sum all payments for this invoice
+    total_paid = Payment.objects.filter(invoice=invoice).aggregate(Sum('amount'))['amount__sum'] or 0
+
+    # Update invoice with new payment totals
+    # (the invoice post_save signal moves the difference onto the customer)
+    invoice.paid_amount = total_paid
+    invoice.balance_due = invoice.total - invoice.paid_amount
+
+    # If fully paid, mark invoice as 'paid'; a paid invoice that owes
+    # money again (a payment was deleted) goes back to 'sent'
+    if invoice.balance_due <= 0:
+        invoice.status = 'paid'
+    elif invoice.status == 'paid':
+        invoice.status = 'sent'
+    invoice.save()
+
+    # Sync Service remaining_balance with Invoice balance_due
+    # This keeps Service and Invoice balances in sync
+    if invoice.service:
+        service = invoice.service
+        service.remaining_balance = invoice.balance_due
+        service.save()
+    return invoice
@@ -0,0 +1,214 @@
+"""
+==============================================================
+INVOICE PDF SERVICE
+==============================================================
+Renders printable invoice PDFs on the server (ReportLab) from the
+Invoice row, its line_items and the BillingSetting company details.
+
+Rendered files are cached on disk (settings.INVOICE_PDF_CACHE_DIR):
+    <invoice id>-v<invoice version>-<content fingerprint>.pdf
+The fingerprint hashes everything printed on the page - the invoice
+fields, the customer name, the vehicle and the company details - so a
+cached file is never stale, even after writes that do not bump the
+version (bulk updates, a customer rename); older files for the same
+invoice are removed on write.
+
+All user-entered text is XML-escaped before it reaches a ReportLab
+Paragraph, which parses its input as markup.
+
+Functions:
+- get_invoice_pdf(): Cached PDF bytes for one invoice (renders on miss)
+- render_invoice_pdf(): Render PDF bytes (no caching)
+- render_invoice_chunk(): Process-pool worker used by render_invoice_pdfs
+==============================================================
+"""
+
+import hashlib
+import io
+import os
+from pathlib import Path
+from xml.sax.saxutils import escape
+from decimal import Decimal
+from django.conf import settings as django_settings
+from ..models import Invoice, BillingSetting
+
+
+class PdfUnavailable(Exception):
+    """ReportLab is not installed"""
+
+
+def _company_details(billing):
+    # BillingSetting fields printed on the invoice header
+    if billing is None:
+        billing = BillingSetting()  # Model defaults (ProGarage, etc.)
+    return {
+        'name': billing.company_name,
+        'address': billing.company_address,
+        'city': billing.company_city,
+        'phone': billing.company_phone,
+        'email': billing.company_email,
+    }
+
+
+def _printed_values(invoice):
+    # Invoice, customer and vehicle values that appear on the PDF
+    return [
+        invoice.invoice_number, invoice.date_created, invoice.due_date, invoice.payment_terms,
+        invoice.status, invoice.line_items, invoice.subtotal, invoice.discount, invoice.tax_rate,
+        invoice.tax_amount, invoice.total, invoice.paid_amount, invoice.balance_due, invoice.notes,
+        invoice.customer.name, invoice.vehicle.number, invoice.vehicle.brand, invoice.vehicle.model,
+    ]
+
+
+def content_fingerprint(invoice, billing):
+    raw = '|'.join(str(value) for value in [*_company_details(billing).values(), *_printed_values(invoice)])
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+def cache_dir():
+    path = Path(django_settings.INVOICE_PDF_CACHE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def cache_path(invoice, billing):
+    return cache_dir() / f"{invoice.id}-v{invoice.version}-{content_fingerprint(invoice, billing)}.pdf"
+
+
+def _money(value):
+    return f"LKR {Decimal(str(value or 0)):,.2f}"
+
+
+def _text(value):
+    # Plain text for a Paragraph: '<', '>' and '&' would be parsed as markup
+    return escape(str(value if value is not None else ''))
+
+
+def render_invoice_pdf(invoice, billing):
+    # Build the PDF in memory and return its bytes
+    try:
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.lib.units import mm
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    except ImportError as e:
+        raise PdfUnavailable("PDF rendering requires the 'reportlab' package") from e
+
+    company = {key: _text(value) for key, value in _company_details(billing).items()}
+    styles = getSampleStyleSheet()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, pagesize=A4, title=invoice.invoice_number,
+        leftMargin=18 * mm, rightMargin=18 * mm, topMargin=18 * mm, bottomMargin=18 * mm
+    )
+
+    story = [
+        Paragraph(company['name'], styles['Title']),
+        Paragraph(f"{company['address']}<br/>{company['city']}<br/>{company['phone']} | {company['email']}", styles['Normal']),
+        Spacer(1, 8 * mm),
+        Paragraph(f"Invoice {_text(invoice.invoice_number)}", styles['Heading2']),
+        Paragraph(
+            f"Billed to: {_text(invoice.customer.name)}<br/>"
+            f"Vehicle: {_text(invoice.vehicle.number)} ({_text(invoice.vehicle.brand)} {_text(invoice.vehicle.model)})<br/>"
+            f"Date: {invoice.date_created:%Y-%m-%d} &nbsp; Due: {invoice.due_date:%Y-%m-%d} &nbsp; "
+            f"Terms: {_text(invoice.payment_terms)} &nbsp; Status: {invoice.get_status_display()}",
+            styles['Normal']
+        ),
+        Spacer(1, 6 * mm),
+    ]
+
+    rows = [['Description', 'Qty', 'Unit Price', 'Total']]
+    for item in invoice.line_items or []:
+        description = item.get('description', '')
+        if item.get('detail'):
+            description = f"{description} - {item['detail']}"
+        rows.append([
+            Paragraph(_text(description), styles['Normal']),
+            str(item.get('quantity', 1)),
+            _money(item.get('unitPrice')),
+            _money(item.get('total')),
+        ])
+    rows += [
+        ['', '', 'Subtotal', _money(invoice.subtotal)],
+        ['', '', 'Discount', _money(invoice.discount)],
+        ['', '', f"Tax ({Decimal(str(invoice.tax_rate)) * 100:.2f}%)", _money(invoice.tax_amount)],
+        ['', '', 'Total', _money(invoice.total)],
+        ['', '', 'Paid', _money(invoice.paid_amount)],
+        ['', '', 'Balance Due', _money(invoice.balance_due)],
+    ]
+    table = Table(rows, colWidths=[90 * mm, 15 * mm, 35 * mm, 35 * mm])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4f46e5')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+        ('LINEBELOW', (0, 0), (-1, len(invoice.line_items or []) or 1), 0.5, colors.grey),
+        ('FONTNAME', (2, -1), (-1, -1), 'Helvetica-Bold'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ]))
+    story.append(table)
+    if invoice.notes:
+        story += [Spacer(1, 6 * mm), Paragraph(f"Notes: {_text(invoice.notes)}", styles['Normal'])]
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def _write_atomic(path, data):
+    # Write to a temp file then rename, so readers never see half a PDF
+    tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    # Drop files for older versions of the same invoice
+    for old in path.parent.glob(f"{path.name.split('-v')[0]}-v*.pdf"):
+        if old != path:
+            old.unlink(missing_ok=True)
+
+
+def get_invoice_pdf(invoice):
+    # Cached PDF bytes for an invoice, rendering and storing it on a miss
+    billing = BillingSetting.objects.first()
+    path = cache_path(invoice, billing)
+    if path.exists():
+        return path.read_bytes()
+    data = render_invoice_pdf(invoice, billing)
+    _write_atomic(path, data)
+    return data
+
+
+def render_invoice_chunk(invoice_ids):
+    """
+    Process-pool worker: render every uncached PDF in a chunk of invoices
+    One query for the invoices (joined to customer/vehicle), one for settings
+    Returns (rendered, already_cached)
+    """
+    billing = BillingSetting.objects.first()
+    rendered = cached = 0
+    invoices = Invoice.objects.select_related('customer', 'vehicle').filter(id__in=invoice_ids)
+    for invoice in invoices:
+        path = cache_path(invoice, billing)
+        if path.exists():
+            cached += 1
+            continue
+        _write_atomic(path, render_invoice_pdf(invoice, billing))
+        rendered += 1
+    return rendered, cached
+
+
+_inherited_connections = []  # Kept referenced so they are never closed from a worker
+
+
+def init_worker():
+    # Runs once in each pool process (django.setup() is needed when
+    # processes are spawned). A forked worker inherits the parent's open
+    # database connections: forget them without closing - closing would
+    # talk over the parent's socket - and open its own on first query
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    from django.db import connections
+    for wrapper in connections.all(initialized_only=True):
+        if wrapper.connection is not None:
+            _inherited_connections.append(wrapper.connection)
+            wrapper.connection = None
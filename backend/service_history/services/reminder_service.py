@@ -0,0 +1,173 @@
+"""
+==============================================================
+MAINTENANCE REMINDER SERVICE
+==============================================================
+"Which vehicles are due for their next oil change / service?"
+
+Each service type in MAINTENANCE_INTERVALS has a date interval
+(months) and optionally a mileage interval (km), counted from the
+vehicle's last completed service of that type - live or archived
+(archive_service moves old settled jobs out of services, and the last
+one is often among them). A reminder is due when
+either is reached - the date one LEAD_DAYS early, the mileage one
+LEAD_KM early (vehicles.mileage against the odometer reading stored
+on that last service).
+
+Set-based, one query per service type, never one per vehicle:
+1. ROW_NUMBER() OVER (PARTITION BY vehicle ORDER BY date DESC) over
+   the type's completed services picks each vehicle's last one
+   (an ordered scan of service_type_vehicle_date_idx), and the same
+   over archived_services; a UNION ALL keeps whichever is newer
+2. The same query keeps only the due ones, and skips vehicles that
+   already have a job of that type open, or a reminder for that
+   last service (archived services keep their ids)
+3. The rows are queued with bulk INSERTs; the unique last_service
+   key makes a re-run (or two overlapping runs) harmless. Rows skipped
+   as conflicts are not counted: bulk_create(ignore_conflicts=True)
+   returns every object passed in, so each batch's reminders are
+   counted before and after the insert
+
+Pending reminders whose vehicle has since had a newer service of the
+type are dropped first, so the queue only holds what is still due.
+
+Functions:
+- add_months(): Calendar month arithmetic (day clamped to month end)
+- latest_services(): Last completed service of a type, per vehicle (live or archived table)
+- due_services(): The due ones, as (service, vehicle, date, km, vehicle km) rows
+- discard_obsolete(): Drop pending reminders superseded by a newer service
+- insert_reminders(): Bulk insert one batch, returns the rows actually added
+- queue_reminders(): Run the whole job for every configured type
+==============================================================
+"""
+
+import calendar
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db.models import Exists, F, OuterRef, Q, Subquery, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from ..models import ArchivedService, MaintenanceReminder, Service
+
+BATCH_SIZE = 5000
+OPEN_STATUSES = ('Pending', 'In Progress')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def add_months(day, months):
+    # add_months(date(2026, 8, 31), 6) -> date(2027, 2, 28)
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def _completed(model, service_type):
+    return model.objects.filter(type=service_type, status='Completed')
+
+
+def latest_services(service_type, model=Service):
+    """IDs of each vehicle's most recent completed service of `service_type` in `model`"""
+    return _completed(model, service_type).annotate(
+        recency=Window(RowNumber(), partition_by=F('vehicle_id'), order_by=[F('date').desc(), F('id').desc()])
+    ).filter(recency=1).values('id')
+
+
+def due_services(service_type, interval, today):
+    """
+    Latest services of the type whose follow-up is due by `today` (plus
+    the lead time), without an open job of the type or a queued reminder
+    """
+    horizon = today + timedelta(days=_setting('MAINTENANCE_REMINDER_LEAD_DAYS', 14))
+    # Serviced before this (local) day -> due by the horizon
+    cutoff = timezone.make_aware(datetime.combine(
+        add_months(horizon, -interval['months']) + timedelta(days=1), time.min
+    ))
+    due = Q(date__lt=cutoff)
+    if interval.get('km'):
+        due |= Q(mileage__isnull=False, vehicle__mileage__gte=F('mileage') + (
+            interval['km'] - _setting('MAINTENANCE_REMINDER_LEAD_KM', 500)
+        ))
+
+    # Open statuses listed (not "!= Completed") so this is an index seek
+    # on (type, status, vehicle) rather than a scan of the whole type
+    open_job = Service.objects.filter(
+        vehicle_id=OuterRef('vehicle_id'), type=service_type, status__in=OPEN_STATUSES
+    )
+    queued = MaintenanceReminder.objects.filter(last_service_id=OuterRef('id'))
+    # Each table's latest, unless the other table has a newer one (a tie goes to the live job)
+    parts = [
+        model.objects.filter(due, id__in=Subquery(latest_services(service_type, model)))
+        .filter(~Exists(open_job), ~Exists(queued), ~Exists(
+            _completed(other, service_type).filter(vehicle_id=OuterRef('vehicle_id'), **{newer: OuterRef('date')})
+        ))
+        .values_list('id', 'vehicle_id', 'date', 'mileage', 'vehicle__mileage')
+        for model, other, newer in ((Service, ArchivedService, 'date__gt'), (ArchivedService, Service, 'date__gte'))
+    ]
+    return parts[0].union(parts[1], all=True)
+
+
+def discard_obsolete(service_type):
+    # One DELETE: pending reminders whose vehicle has a newer completed service of the type
+    newer = [
+        _completed(model, service_type).filter(
+            vehicle_id=OuterRef('vehicle_id'), date__gt=OuterRef('last_service_date')
+        )
+        for model in (Service, ArchivedService)
+    ]
+    deleted, _ = MaintenanceReminder.objects.filter(
+        service_type=service_type, status='pending'
+    ).filter(Exists(newer[0]) | Exists(newer[1])).delete()
+    return deleted
+
+
+def _reminder(service_type, interval, horizon, row):
+    service_id, vehicle_id, date, mileage, vehicle_mileage = row
+    due_date = add_months(timezone.localdate(date), interval['months'])
+    due_mileage = mileage + interval['km'] if interval.get('km') and mileage is not None else None
+    reasons = []
+    if due_date <= horizon:
+        reasons.append('date')
+    if due_mileage is not None and vehicle_mileage >= due_mileage - _setting('MAINTENANCE_REMINDER_LEAD_KM', 500):
+        reasons.append('mileage')
+    if not reasons:
+        return None
+    return MaintenanceReminder(
+        vehicle_id=vehicle_id, service_type=service_type, last_service_id=service_id, last_service_date=date,
+        due_date=due_date, due_mileage=due_mileage, reasons=reasons,
+    )
+
+
+def insert_reminders(batch):
+    # bulk_create(ignore_conflicts=True) returns all objects, inserted or
+    # not - count the batch's keys around it (one indexed lookup each)
+    existing = MaintenanceReminder.objects.filter(last_service_id__in=[reminder.last_service_id for reminder in batch])
+    before = existing.count()
+    MaintenanceReminder.objects.bulk_create(batch, ignore_conflicts=True)
+    return existing.count() - before
+
+
+def queue_reminders(today=None, batch_size=BATCH_SIZE):
+    """
+    Queue every due reminder as of `today` (default: today)
+    Returns {service type: (reminders inserted, obsolete ones dropped)}
+    """
+    today = today or timezone.localdate()
+    horizon = today + timedelta(days=_setting('MAINTENANCE_REMINDER_LEAD_DAYS', 14))
+    results = {}
+    for service_type, interval in _setting('MAINTENANCE_INTERVALS', {}).items():
+        dropped = discard_obsolete(service_type)
+        queued = 0
+        batch = []
+        for row in due_services(service_type, interval, today).iterator(chunk_size=batch_size):
+            reminder = _reminder(service_type, interval, horizon, row)
+            if reminder:
+                batch.append(reminder)
+            if len(batch) >= batch_size:
+                queued += insert_reminders(batch)
+                batch = []
+        if batch:
+            queued += insert_reminders(batch)
+        results[service_type] = (queued, dropped)
+    return results
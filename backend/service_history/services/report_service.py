@@ -0,0 +1,51 @@
+"""
+==============================================================
+REPORT SERVICE LAYER
+==============================================================
+Revenue analytics over the invoice_line_items table. All grouping
+and summing happens in SQL (GROUP BY on indexed columns) rather
+than by loading invoices and walking their JSON line items.
+
+Functions:
+- line_item_revenue(): Revenue grouped by type, description or month
+==============================================================
+"""
+
+from django.db.models import F, Sum, Count, Avg
+from django.db.models.functions import Coalesce, TruncMonth
+from ..models import InvoiceLineItem
+from .archive_service import filter_date_range
+
+# Allowed ?group_by= values ('month' truncates the invoice date)
+REVENUE_GROUPINGS = ('type', 'description', 'month')
+
+
+def line_item_revenue(group_by='type', date_from=None, date_to=None, item_type=None):
+    """
+    Sum line item totals per group, optionally limited to a date range
+    (inclusive, by invoice date) and a single line item type.
+    Returns a list of dicts ordered by revenue (month: chronologically).
+    """
+    queryset = filter_date_range(InvoiceLineItem.objects.all(), 'date', date_from, date_to)
+    if item_type:
+        queryset = queryset.filter(type=item_type)
+
+    if group_by == 'month':
+        queryset = queryset.annotate(key=TruncMonth('date'))
+    else:
+        queryset = queryset.annotate(key=F(group_by))
+
+    rows = (
+        queryset.values('key')
+        .annotate(
+            revenue=Sum('total'),
+            quantity=Sum('quantity'),
+            lines=Count('id'),
+            # Archived lines point at archived_invoice instead (same ids)
+            invoices=Count(Coalesce('invoice_id', 'archived_invoice_id'), distinct=True),
+            avg_unit_price=Avg('unit_price'),
+        )
+        .order_by('key' if group_by == 'month' else '-revenue')
+    )
+    return list(rows)
+
@@ -0,0 +1,219 @@
+"""
+==============================================================
+INVOICE RE-PRICING SERVICE
+==============================================================
+When BillingSetting.tax_rate changes, open invoices still carry the
+old rate. This re-prices every unpaid invoice to a new rate with the
+same rules as invoice generation (service_service.build_invoice):
+
+- Tax added on top (service.tax_included = False):
+      subtotal stays, tax = (subtotal - discount) x rate
+- Tax included in the quoted price (service.tax_included = True):
+      the gross price (subtotal + tax) stays and is split again:
+      subtotal = gross / (1 + rate), tax = gross - subtotal;
+      line item prices are rescaled to the new subtotal
+- total = subtotal - discount + tax, balance = total - paid
+
+All arithmetic is done on integer cents (and the rate in 1/10000),
+rounded half-to-even like Decimal.quantize(), so the results are
+exact and identical to the invoice-generation path.
+
+Invoices are streamed in id order, one chunk per transaction:
+locked, recomputed, written with one UPDATE ... CASE id WHEN ...
+statement (built directly - Django's bulk_update() spends most of its
+time resolving one expression per row and field), then customer
+outstanding balances and the change feed are updated for the chunk.
+
+Functions:
+- to_cents() / from_cents(): Decimal <-> integer cents
+- reprice_amounts(): New figures for one invoice (pure function)
+- rescale_line_items(): Line item prices scaled to a new subtotal
+- open_invoices(): Invoices that still carry another tax rate
+- reprice_open_invoices(): Run the whole job (or a dry run)
+==============================================================
+"""
+
+from decimal import Decimal
+from django.db import connections, router, transaction
+from django.db.models import F
+from ..models import Invoice, InvoiceLineItem
+from ..events import record_changes
+from . import customer_service, line_item_service
+
+DEFAULT_BATCH_SIZE = 1000
+RATE_SCALE = 10000  # tax_rate has 4 decimal places
+CLOSED_STATUSES = ('paid', 'canceled')
+# Per-row values written with _bulk_set() (CASE WHEN per field; same-for-all
+# columns such as tax_rate/version go in a plain UPDATE instead)
+REPRICED_FIELDS = ['subtotal', 'tax_amount', 'total', 'balance_due']
+
+
+def to_cents(value):
+    # Money columns have 2 decimal places, so this is exact
+    return int(Decimal(value or 0).scaleb(2).to_integral_value())
+
+
+def from_cents(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+def _div_round(numerator, denominator):
+    # Integer division rounded half to even - what Decimal.quantize() does
+    quotient, remainder = divmod(numerator, denominator)
+    twice = 2 * remainder
+    if twice > denominator or (twice == denominator and quotient % 2):
+        quotient += 1
+    return quotient
+
+
+def reprice_amounts(subtotal, tax_amount, discount, paid_amount, tax_included, rate_e4):
+    """
+    All money arguments in cents, rate_e4 = tax rate x 10000
+    Returns the new (subtotal, tax_amount, total, balance_due) in cents
+    """
+    if tax_included:
+        gross = subtotal + tax_amount
+        subtotal = _div_round(gross * RATE_SCALE, RATE_SCALE + rate_e4)
+        tax_amount = gross - subtotal
+    else:
+        tax_amount = _div_round((subtotal - discount) * rate_e4, RATE_SCALE)
+    total = subtotal - discount + tax_amount
+    return subtotal, tax_amount, total, total - paid_amount
+
+
+def rescale_line_items(line_items, old_subtotal, new_subtotal):
+    # Scale each item's total to the new subtotal (cents); the rounding
+    # remainder goes to the last item so the items still add up exactly
+    items = [item for item in line_items or [] if isinstance(item, dict)]
+    if not items or old_subtotal == new_subtotal or not old_subtotal:
+        return line_items
+    old_totals = [to_cents(str(item.get('total', 0))) for item in items]
+    new_totals = [_div_round(total * new_subtotal, old_subtotal) for total in old_totals]
+    new_totals[-1] += (new_subtotal - old_subtotal) - (sum(new_totals) - sum(old_totals))
+    rescaled = []
+    for item, new_total in zip(items, new_totals):
+        quantity = Decimal(str(item.get('quantity', 1) or 1))
+        rescaled.append({
+            **item,
+            'unitPrice': float((from_cents(new_total) / quantity).quantize(Decimal('0.01'))),
+            'total': float(from_cents(new_total)),
+        })
+    return rescaled
+
+
+def _bulk_set(objs, field_names):
+    """
+    bulk_update() equivalent for one chunk, as a single statement:
+        UPDATE invoices SET f = CASE id WHEN %s THEN %s ... END, ... WHERE id IN (...)
+    Values are prepared by the model fields, exactly as save() would
+    """
+    if not objs:
+        return
+    connection = connections[router.db_for_write(Invoice)]
+    quote = connection.ops.quote_name
+    meta = Invoice._meta
+    pk_column = quote(meta.pk.column)
+    assignments, params = [], []
+    for name in field_names:
+        field = meta.get_field(name)
+        cases = []
+        for obj in objs:
+            cases.append('WHEN %s THEN %s')
+            params += [obj.pk, field.get_db_prep_save(getattr(obj, field.attname), connection)]
+        assignments.append(f"{quote(field.column)} = CASE {pk_column} {' '.join(cases)} END")
+    params += [obj.pk for obj in objs]
+    placeholders = ', '.join(['%s'] * len(objs))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {quote(meta.db_table)} SET {', '.join(assignments)} WHERE {pk_column} IN ({placeholders})",
+            params,
+        )
+
+
+def open_invoices(tax_rate):
+    # Unpaid invoices priced at any other rate
+    return (
+        Invoice.objects.exclude(status__in=CLOSED_STATUSES)
+        .filter(balance_due__gt=0)
+        .exclude(tax_rate=tax_rate)
+    )
+
+
+def _reprice_chunk(ids, tax_rate, rate_e4, dry_run, on_change):
+    # Returns the number of invoices changed in this chunk
+    # Re-checked under the lock: a payment may have closed some since
+    invoices = open_invoices(tax_rate).filter(id__in=ids).annotate(tax_included=F('service__tax_included')).order_by('id')
+    if not dry_run:
+        invoices = invoices.select_for_update(of=('self',))
+
+    changed = []
+    balance_deltas = {}
+    for invoice in invoices:
+        old = {field: getattr(invoice, field) for field in ('subtotal', 'tax_amount', 'total', 'balance_due')}
+        subtotal, tax_amount, total, balance = reprice_amounts(
+            to_cents(invoice.subtotal), to_cents(invoice.tax_amount), to_cents(invoice.discount),
+            to_cents(invoice.paid_amount), invoice.tax_included, rate_e4,
+        )
+        invoice.line_items = rescale_line_items(invoice.line_items, to_cents(invoice.subtotal), subtotal)
+        invoice.subtotal = from_cents(subtotal)
+        invoice.tax_amount = from_cents(tax_amount)
+        invoice.total = from_cents(total)
+        invoice.balance_due = from_cents(balance)
+        invoice.tax_rate = tax_rate
+        # Same rule as build_invoice(): nothing left to pay means paid
+        if balance <= 0:
+            invoice.status = 'paid'
+        invoice.version += 1
+        if on_change:
+            on_change(invoice, old)
+        changed.append(invoice)
+        delta = invoice.balance_due - old['balance_due']
+        if delta:
+            balance_deltas[invoice.customer_id] = balance_deltas.get(invoice.customer_id, Decimal('0')) + delta
+
+    if dry_run or not changed:
+        return len(changed)
+
+    changed_ids = [invoice.id for invoice in changed]
+    Invoice.objects.filter(id__in=changed_ids).update(tax_rate=tax_rate, version=F('version') + 1)
+    _bulk_set(changed, REPRICED_FIELDS)
+    paid_ids = [invoice.id for invoice in changed if invoice.status == 'paid']
+    if paid_ids:
+        Invoice.objects.filter(id__in=paid_ids).update(status='paid')
+    # bulk_update skips the post_save signals: line item rows, customer
+    # totals and the change feed are brought up to date here
+    rescaled = [invoice for invoice in changed if invoice.line_items_changed()]
+    if rescaled:
+        _bulk_set(rescaled, ['line_items'])
+        InvoiceLineItem.objects.filter(invoice_id__in=[invoice.id for invoice in rescaled]).delete()
+        line_item_service.create_line_items(rescaled)
+    for customer_id, delta in balance_deltas.items():
+        customer_service.adjust_customer_totals(customer_id, balance_delta=delta)
+    record_changes(Invoice, changed_ids, 'updated')
+    return len(changed)
+
+
+def reprice_open_invoices(tax_rate, dry_run=False, batch_size=DEFAULT_BATCH_SIZE, on_change=None):
+    """
+    Re-price every open invoice to `tax_rate`, one chunk per transaction
+    dry_run: compute and report only, write nothing
+    on_change(invoice, old_values): called for each re-priced invoice
+    Returns {'invoices': n, 'batches': n}
+    """
+    tax_rate = Decimal(tax_rate)
+    rate_e4 = int(tax_rate.scaleb(4).to_integral_value())
+    totals = {'invoices': 0, 'batches': 0}
+    last_id = 0
+    while True:
+        # Keyset pagination: each probe is an index range scan on id
+        ids = list(
+            open_invoices(tax_rate).filter(id__gt=last_id).order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            totals['invoices'] += _reprice_chunk(ids, tax_rate, rate_e4, dry_run, on_change)
+        totals['batches'] += 1
+        last_id = ids[-1]
+    return totals
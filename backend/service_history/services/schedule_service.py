@@ -0,0 +1,354 @@
+"""
+==============================================================
+SCHEDULE SERVICE LAYER (BAYS & APPOINTMENTS)
+==============================================================
+A booking occupies its bay - and its technician, if one is assigned -
+for [start, start + the service's estimated hours).
+
+Conflict and availability questions are answered from an in-memory
+interval index instead of the database:
+- IntervalIndex keeps, per bay and per technician, the booked
+  intervals sorted by start. Bookings on one resource never overlap,
+  so the ends are sorted too and an overlap check is one bisect
+- The index is built once from the upcoming appointments, then kept
+  current incrementally: every appointment save writes a ChangeEvent
+  (the live change feed outbox), and each sync() only reloads the
+  appointments named by events newer than the last one it applied -
+  this also picks up bookings made by other worker processes. Like the
+  change stream, the cursor only moves past settled events (no id gap
+  that might still commit, see events.settled_events)
+- Index hits are confirmed against the database before they are
+  reported, and hits that no longer hold are reloaded, so an entry
+  the index missed an update for cannot block a free slot
+- It is rebuilt from scratch every SCHEDULE_INDEX_REBUILD_SECONDS,
+  which drops past bookings and stays well inside the outbox retention
+
+Booking re-checks the database while holding row locks on the bay and
+technician, so two workers can never double-book even if one's index
+is a moment behind.
+
+Functions:
+- book_appointment(): Book a service into a bay (raises ScheduleConflict)
+- cancel_appointment(): Free an appointment's slot
+- conflicts(): Booked appointments overlapping a bay/technician window
+- weekly_availability(): Open start times per day for a job length
+==============================================================
+"""
+
+import threading
+import time as clock
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from ..models import Appointment, Bay, ChangeEvent, Technician, TechnicianShift
+from ..events import latest_event_id, settled_events
+
+
+class ScheduleConflict(Exception):
+    """The requested window is taken (or outside the technician's shifts)"""
+
+    def __init__(self, message, appointment_ids=()):
+        self.appointment_ids = list(appointment_ids)
+        super().__init__(message)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class IntervalIndex:
+    """
+    Booked [start, end) intervals (epoch seconds) per resource key,
+    e.g. ('bay', 3) or ('technician', 7), kept sorted by start
+    """
+
+    def __init__(self):
+        self._starts = {}     # resource -> [start, ...]
+        self._intervals = {}  # resource -> [(start, end, appointment_id), ...]
+        self._booked = {}     # appointment_id -> ([resource, ...], start)
+
+    def add(self, appointment_id, resources, start, end):
+        self.remove(appointment_id)
+        for resource in resources:
+            intervals = self._intervals.setdefault(resource, [])
+            position = bisect_right(self._starts.setdefault(resource, []), start)
+            self._starts[resource].insert(position, start)
+            intervals.insert(position, (start, end, appointment_id))
+        self._booked[appointment_id] = (list(resources), start)
+
+    def remove(self, appointment_id):
+        resources, start = self._booked.pop(appointment_id, ((), None))
+        for resource in resources:
+            intervals = self._intervals[resource]
+            position = bisect_left(self._starts[resource], start)
+            while intervals[position][2] != appointment_id:
+                position += 1
+            del intervals[position]
+            del self._starts[resource][position]
+
+    def overlapping(self, resource, start, end):
+        # Intervals starting before `end`, walking back while they still
+        # reach past `start` (ends are sorted because nothing overlaps)
+        starts = self._starts.get(resource, [])
+        intervals = self._intervals.get(resource, [])
+        position = bisect_left(starts, end) - 1
+        found = []
+        while position >= 0 and intervals[position][1] > start:
+            found.append(intervals[position])
+            position -= 1
+        return found[::-1]
+
+    def __len__(self):
+        return len(self._booked)
+
+
+class ScheduleIndex:
+    """The process-wide IntervalIndex plus its outbox cursor"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._cursor = 0
+        self._built_at = 0.0
+
+    @staticmethod
+    def _resources(bay_id, technician_id):
+        resources = [('bay', bay_id)]
+        if technician_id:
+            resources.append(('technician', technician_id))
+        return resources
+
+    def _apply(self, index, appointments):
+        for appointment_id, bay_id, technician_id, start, end in appointments:
+            index.add(appointment_id, self._resources(bay_id, technician_id), start.timestamp(), end.timestamp())
+
+    def _rows(self, queryset):
+        return queryset.filter(status='booked').values_list('id', 'bay_id', 'technician_id', 'start', 'end')
+
+    def _rebuild(self):
+        # Cursor first: anything committed meanwhile is replayed by sync()
+        cursor = latest_event_id()
+        index = IntervalIndex()
+        since = timezone.now() - timedelta(days=1)
+        self._apply(index, self._rows(Appointment.objects.filter(end__gte=since)).iterator(chunk_size=5000))
+        self._index, self._cursor, self._built_at = index, cursor, clock.monotonic()
+
+    def sync(self):
+        """Bring the index up to date; returns it"""
+        with self._lock:
+            if self._index is None or clock.monotonic() - self._built_at > _setting('SCHEDULE_INDEX_REBUILD_SECONDS', 3600):
+                self._rebuild()
+                return self._index
+            # Every model's events: the id sequence is shared, so gaps can
+            # only be told apart from other models' rows by reading them
+            events, _ = settled_events(
+                ChangeEvent.objects.filter(id__gt=self._cursor).order_by('id')
+                .only('id', 'created_at', 'model', 'object_id'),
+                self._cursor,
+            )
+            if events:
+                self._reload({event.object_id for event in events if event.model == Appointment._meta.model_name})
+                self._cursor = events[-1].id
+            return self._index
+
+    def _reload(self, appointment_ids):
+        for appointment_id in appointment_ids:
+            self._index.remove(appointment_id)
+        self._apply(self._index, self._rows(Appointment.objects.filter(id__in=appointment_ids)))
+
+    def refresh(self, appointment_ids):
+        """Reload these appointments from the database (stale index entries)"""
+        with self._lock:
+            if self._index is not None:
+                self._reload(set(appointment_ids))
+
+    def reset(self):
+        with self._lock:
+            self._index = None
+
+
+schedule_index = ScheduleIndex()
+
+
+def job_hours(service):
+    # A booking lasts the service's estimate (a default when none is set)
+    hours = Decimal(service.estimated_hours or 0)
+    return hours if hours > 0 else Decimal(str(_setting('SCHEDULE_DEFAULT_HOURS', 1)))
+
+
+def conflicts(start, end, bay_id=None, technician_id=None):
+    """
+    IDs of booked appointments overlapping [start, end) on the bay or
+    technician - found in the index, confirmed by one primary-key query
+    """
+    index = schedule_index.sync()
+    resources = [('bay', bay_id)] if bay_id else []
+    if technician_id:
+        resources.append(('technician', technician_id))
+    found = set()
+    for resource in resources:
+        found.update(interval[2] for interval in index.overlapping(resource, start.timestamp(), end.timestamp()))
+    if not found:
+        return []
+    confirmed = set(
+        Appointment.objects.filter(id__in=found, status='booked', start__lt=end, end__gt=start)
+        .values_list('id', flat=True)
+    )
+    if confirmed != found:
+        schedule_index.refresh(found - confirmed)
+    return sorted(confirmed)
+
+
+def _shift_windows(technician_id, day):
+    # The technician's working windows on `day` as aware datetimes
+    return [
+        (_at(day, start_time), _at(day, end_time))
+        for start_time, end_time in TechnicianShift.objects.filter(technician_id=technician_id, weekday=day.weekday())
+        .order_by('start_time').values_list('start_time', 'end_time')
+    ]
+
+
+def _at(day, moment):
+    return timezone.make_aware(datetime.combine(day, moment))
+
+
+def book_appointment(service, bay, start, technician=None):
+    """
+    Book `service` into `bay` from `start` for its estimated hours
+    The technician defaults to the service's; if that technician has
+    shifts, the booking must fit inside one of them
+    Raises ScheduleConflict; returns the Appointment
+    """
+    technician_id = technician.id if technician else service.technician_id
+    end = start + timedelta(hours=float(job_hours(service)))
+    if not bay.is_active:
+        raise ScheduleConflict(f"Bay {bay.name} is not in use")
+
+    # Cheap rejection from the index before taking any locks
+    clashes = conflicts(start, end, bay.id, technician_id)
+    if clashes:
+        raise ScheduleConflict("The bay or technician is already booked at that time", clashes)
+
+    with transaction.atomic():
+        # Row locks serialize bookings per bay/technician across workers;
+        # always bay first, then technician, so two bookings cannot deadlock
+        Bay.objects.select_for_update().filter(id=bay.id).first()
+        if technician_id:
+            Technician.objects.select_for_update().filter(id=technician_id).first()
+            shifts = _shift_windows(technician_id, timezone.localtime(start).date())
+            has_shifts = shifts or TechnicianShift.objects.filter(technician_id=technician_id).exists()
+            if has_shifts and not any(shift_start <= start and end <= shift_end for shift_start, shift_end in shifts):
+                raise ScheduleConflict("The technician is not on shift for the whole booking")
+
+        resource_filter = Q(bay_id=bay.id)
+        if technician_id:
+            resource_filter |= Q(technician_id=technician_id)
+        clashes = list(
+            Appointment.objects.filter(resource_filter, status='booked', start__lt=end, end__gt=start)
+            .values_list('id', flat=True)
+        )
+        if clashes:
+            raise ScheduleConflict("The bay or technician is already booked at that time", clashes)
+        return Appointment.objects.create(
+            service=service, bay=bay, technician_id=technician_id, start=start, end=end
+        )
+
+
+def cancel_appointment(appointment):
+    appointment.status = 'canceled'
+    appointment.save(update_fields=['status'])
+    return appointment
+
+
+def _free_gaps(busy, window_start, window_end):
+    # Gaps of [window_start, window_end) not covered by the sorted busy intervals
+    gaps = []
+    cursor = window_start
+    for start, end, _ in busy:
+        if start > cursor:
+            gaps.append((cursor, min(start, window_end)))
+        cursor = max(cursor, end)
+        if cursor >= window_end:
+            break
+    if cursor < window_end:
+        gaps.append((cursor, window_end))
+    return gaps
+
+
+def _slot_starts(gaps, length, step, origin):
+    # Start times on the step grid (from origin) where `length` seconds fit
+    starts = []
+    for gap_start, gap_end in gaps:
+        first = origin + -(-(gap_start - origin) // step) * step  # Round up to the grid
+        starts.extend(range(int(first), int(gap_end - length) + 1, step))
+    return starts
+
+
+def weekly_availability(week_start, hours, bay_id=None, technician_id=None, days=7):
+    """
+    Open start times for a job of `hours` on each of `days` days from
+    week_start, within opening hours (SCHEDULE_OPEN_HOUR..CLOSE_HOUR) and
+    on the SCHEDULE_SLOT_MINUTES grid. A slot needs a free active bay
+    (or the given one) and, with technician_id, that technician on shift
+    and free. Returns [{'date', 'slots': [{'start', 'end', 'bayIds'}]}]
+    """
+    index = schedule_index.sync()
+    bays = Bay.objects.filter(is_active=True)
+    if bay_id:
+        bays = bays.filter(id=bay_id)
+    bay_ids = list(bays.values_list('id', flat=True))
+    shifts = {}
+    if technician_id:
+        for weekday, start_time, end_time in TechnicianShift.objects.filter(technician_id=technician_id).values_list(
+                'weekday', 'start_time', 'end_time'):
+            shifts.setdefault(weekday, []).append((start_time, end_time))
+    has_shifts = bool(shifts)
+
+    length = float(hours) * 3600
+    step = int(_setting('SCHEDULE_SLOT_MINUTES', 30)) * 60
+    open_time = time(int(_setting('SCHEDULE_OPEN_HOUR', 8)))
+    close_time = time(int(_setting('SCHEDULE_CLOSE_HOUR', 18)))
+    now = timezone.now().timestamp()
+
+    result = []
+    for offset in range(days):
+        day = week_start + timedelta(days=offset)
+        day_open = _at(day, open_time).timestamp()
+        day_close = _at(day, close_time).timestamp()
+        window_start = max(day_open, now)
+        free_bays = {}  # slot start -> [bay ids]
+        if window_start < day_close:
+            for bay in bay_ids:
+                busy = index.overlapping(('bay', bay), window_start, day_close)
+                for start in _slot_starts(_free_gaps(busy, window_start, day_close), length, step, day_open):
+                    free_bays.setdefault(start, []).append(bay)
+
+        if technician_id and free_bays:
+            windows = [
+                (max(_at(day, shift_start).timestamp(), window_start), _at(day, shift_end).timestamp())
+                for shift_start, shift_end in shifts.get(day.weekday(), [])
+            ] if has_shifts else [(window_start, day_close)]
+            technician_starts = set()
+            for shift_start, shift_end in windows:
+                if shift_start >= shift_end:
+                    continue
+                busy = index.overlapping(('technician', technician_id), shift_start, shift_end)
+                technician_starts.update(_slot_starts(_free_gaps(busy, shift_start, shift_end), length, step, day_open))
+            free_bays = {start: bays_free for start, bays_free in free_bays.items() if start in technician_starts}
+
+        result.append({
+            'date': day.isoformat(),
+            'slots': [
+                {
+                    'start': datetime.fromtimestamp(start, tz=timezone.get_current_timezone()).isoformat(),
+                    'end': datetime.fromtimestamp(start + length, tz=timezone.get_current_timezone()).isoformat(),
+                    'bayIds': free_bays[start],
+                }
+                for start in sorted(free_bays)
+            ],
+        })
+    return result
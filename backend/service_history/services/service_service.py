@@ -19,22 +19,138 @@ Functions:
 - get_all_services(): Fetch all services
 - auto_generate_invoice(): Create invoice when service completes (IMPORTANT)
 - update_service_status(): Change service status, trigger invoice if 'Completed'
+- bulk_update_service_status(): Change many statuses, batch-create invoices
 - create_service_record(): Create new service, auto-invoice if advance payment
 - get_service_by_id(): Find one service
-- update_service_record(): Update service information
+- get_service_version(): Current row version of a service
+- update_service_record(): Update service information (optionally version-checked)
 - delete_service_record(): Delete service
 ==============================================================
 """
 
-from ..models import Service, Invoice, Payment, BillingSetting
+from ..models import Service, ServiceStatusChange, Invoice, Payment, BillingSetting, ArchivedInvoice
+from . import customer_service, line_item_service, inventory_service, vehicle_service
+from ..events import record_changes
+from utils import metrics
+import re
 from datetime import timedelta
 from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import F, IntegerField, Max
+from django.db.models.functions import Cast, Substr
 from django.utils import timezone
 
 def get_all_services():
     # Get all services from database
     return Service.objects.all()
 
+def next_invoice_numbers(prefix, count=1):
+    # Reserve a block of `count` consecutive invoice numbers for this prefix
+    # The counter lives on the billing settings row, locked while it is
+    # advanced, so concurrent invoices (single or bulk) never share a number
+    with transaction.atomic():
+        settings = BillingSetting.objects.select_for_update().order_by('id').first()
+        if settings is None:
+            settings = _create_billing_settings()
+        next_num = settings.next_invoice_number
+        numbers = [f"{prefix}-{num}" for num in range(next_num, next_num + count)]
+        if (Invoice.objects.filter(invoice_number__in=numbers).exists()
+                or ArchivedInvoice.objects.filter(invoice_number__in=numbers).exists()):
+            # Counter behind the data (numbers issued before it was kept,
+            # or it was edited back): skip past the highest number in use
+            next_num = max(next_num, _highest_invoice_number(prefix) + 1)
+            numbers = [f"{prefix}-{num}" for num in range(next_num, next_num + count)]
+        BillingSetting.objects.filter(id=settings.id).update(next_invoice_number=next_num + count)
+    return numbers
+
+def _create_billing_settings():
+    # First use: create the settings row with a fixed id, so two first
+    # callers collide on the primary key instead of each creating a row
+    # (and numbering from 1001 on its own). Returns it locked
+    try:
+        with transaction.atomic():
+            BillingSetting.objects.create(id=1)
+    except IntegrityError:
+        pass  # The other caller won
+    # A locking read sees the other caller's committed row
+    return BillingSetting.objects.select_for_update().get(id=1)
+
+def _highest_invoice_number(prefix):
+    # Numeric maximum over live and archived invoices, computed by the
+    # database (a string MAX would put "INV-9999" after "INV-10000")
+    highest = 0
+    for model in (Invoice, ArchivedInvoice):
+        value = model.objects.filter(
+            invoice_number__startswith=f"{prefix}-",  # Index range on the unique column
+            invoice_number__regex=rf"^{re.escape(prefix)}-[0-9]+$",
+        ).aggregate(highest=Max(Cast(Substr('invoice_number', len(prefix) + 2), IntegerField())))['highest']
+        highest = max(highest, value or 0)
+    return highest
+
+def build_invoice(service, settings, invoice_number):
+    # Build (but do not save) the invoice for a completed service
+    # Get the service cost (this is the base price)
+    subtotal = service.cost
+    tax_rate = settings.tax_rate if settings else Decimal('0.1000')
+    
+    # CRITICAL: Two tax scenarios with different math
+    if service.tax_included:
+        # Tax is already IN the price customer quoted
+        # Need to extract tax from total
+        # Formula: subtotal = total / (1 + tax_rate)
+        total = subtotal  # The $100 already includes tax
+        subtotal = total / (1 + tax_rate)  # Extract actual cost: $90.91
+        tax_amount = total - subtotal  # Tax is difference: $9.09
+    else:
+        # Tax is NOT in price, add it on top
+        # Formula: total = subtotal + (subtotal × tax_rate)
+        tax_amount = subtotal * tax_rate  # Calculate tax: $100 × 10% = $10
+        total = subtotal + tax_amount  # Add to subtotal: $100 + $10 = $110
+        
+    # No discounts for now
+    discount = Decimal('0')
+    
+    # Payment tracking
+    paid_amount = service.advance_payment  # How much already paid
+    balance_due = total - paid_amount  # How much still owed
+    
+    # Create line item for invoice (shows service details)
+    line_items = [{
+        'description': f"Service: {service.type}",
+        'detail': service.description or '',
+        'quantity': 1,
+        'unitPrice': float(subtotal.quantize(Decimal("0.01"))),
+        'total': float(subtotal.quantize(Decimal("0.01"))),
+        'type': 'service'
+    }]
+    
+    return Invoice(
+        invoice_number=invoice_number,  # Auto-generated: INV-1001
+        service=service,  # Link to service
+        customer_id=service.vehicle.customer_id,  # Who to bill
+        vehicle=service.vehicle,  # What vehicle was serviced
+        status='paid' if balance_due <= 0 else 'sent',  # If fully paid, mark as paid
+        due_date=timezone.now() + timedelta(days=30),  # Payment due in 30 days
+        line_items=line_items,  # What service was done
+        subtotal=subtotal.quantize(Decimal("0.01")),  # Stored with 2 decimal places
+        tax_rate=tax_rate,
+        tax_amount=tax_amount.quantize(Decimal("0.01")),
+        discount=discount,
+        total=total.quantize(Decimal("0.01")),  # Final price
+        paid_amount=paid_amount,  # Already received from advance
+        balance_due=balance_due.quantize(Decimal("0.01")),  # Still owed
+        payment_terms=settings.payment_terms if settings else 'Net 30'  # Payment terms
+    )
+
+def build_advance_payment(invoice, service):
+    # Build (but do not save) the Payment recording a service's advance
+    return Payment(
+        invoice=invoice,  # Link to invoice
+        amount=service.advance_payment,  # How much was paid
+        method=service.advance_payment_method or 'cash',  # How was it paid (cash/card/check)
+        notes='Advance payment from Service record'  # Explanation
+    )
+
 def auto_generate_invoice(service):
     # Auto-generate invoice when service completes, handle tax calculation and payment tracking
     try:
@@ -42,90 +158,21 @@ def auto_generate_invoice(service):
         if Invoice.objects.filter(service=service).exists():
             return None
         
-        # Get billing settings for tax rate and invoice prefix
-        settings = BillingSetting.objects.first()
-        prefix = settings.invoice_prefix if settings else "INV"
-        
-        # Generate unique invoice number by finding the highest existing number
-        existing_invoices = Invoice.objects.filter(
-            invoice_number__startswith=prefix
-        ).order_by('-invoice_number').first()
-        
-        if existing_invoices:
-            # Extract number from last invoice (e.g., "INV-1005" -> 1005)
-            try:
-                last_num = int(existing_invoices.invoice_number.split('-')[-1])
-                next_num = last_num + 1
-            except (ValueError, IndexError):
-                next_num = 1001
-        else:
-            next_num = 1001
-        
-        invoice_number = f"{prefix}-{next_num}"
-        
-        # Get the service cost (this is the base price)
-        subtotal = service.cost
-        tax_rate = settings.tax_rate if settings else Decimal('0.1000')
-        
-        # CRITICAL: Two tax scenarios with different math
-        if service.tax_included:
-            # Tax is already IN the price customer quoted
-            # Need to extract tax from total
-            # Formula: subtotal = total / (1 + tax_rate)
-            total = subtotal  # The $100 already includes tax
-            subtotal = total / (1 + tax_rate)  # Extract actual cost: $90.91
-            tax_amount = total - subtotal  # Tax is difference: $9.09
-        else:
-            # Tax is NOT in price, add it on top
-            # Formula: total = subtotal + (subtotal × tax_rate)
-            tax_amount = subtotal * tax_rate  # Calculate tax: $100 × 10% = $10
-            total = subtotal + tax_amount  # Add to subtotal: $100 + $10 = $110
+        with metrics.timer('invoice_generation_seconds', {'source': 'auto'}):
+            # Get billing settings for tax rate and invoice prefix
+            settings = BillingSetting.objects.first()
+            prefix = settings.invoice_prefix if settings else "INV"
+            invoice_number = next_invoice_numbers(prefix)[0]
             
-        # No discounts for now
-        discount = Decimal('0')
-        
-        # Payment tracking
-        paid_amount = service.advance_payment  # How much already paid
-        balance_due = total - paid_amount  # How much still owed
-        
-        # Create line item for invoice (shows service details)
-        line_items = [{
-            'description': f"Service: {service.type}",
-            'detail': service.description or '',
-            'quantity': 1,
-            'unitPrice': float(subtotal.quantize(Decimal("0.01"))),
-            'total': float(subtotal.quantize(Decimal("0.01"))),
-            'type': 'service'
-        }]
-        
-        # Create the Invoice in database
-        invoice = Invoice.objects.create(
-            invoice_number=invoice_number,  # Auto-generated: INV-1001
-            service=service,  # Link to service
-            customer=service.vehicle.customer,  # Who to bill
-            vehicle=service.vehicle,  # What vehicle was serviced
-            status='paid' if balance_due <= 0 else 'sent',  # If fully paid, mark as paid
-            due_date=timezone.now() + timedelta(days=30),  # Payment due in 30 days
-            line_items=line_items,  # What service was done
-            subtotal=subtotal.quantize(Decimal("0.01")),  # Stored with 2 decimal places
-            tax_rate=tax_rate,
-            tax_amount=tax_amount.quantize(Decimal("0.01")),
-            discount=discount,
-            total=total.quantize(Decimal("0.01")),  # Final price
-            paid_amount=paid_amount,  # Already received from advance
-            balance_due=balance_due.quantize(Decimal("0.01")),  # Still owed
-            payment_terms=settings.payment_terms if settings else 'Net 30'  # Payment terms
-        )
-        
-        # Record advance payment as a Payment transaction
-        if service.advance_payment > 0:
-            Payment.objects.create(
-                invoice=invoice,  # Link to invoice
-                amount=service.advance_payment,  # How much was paid
-                method=service.advance_payment_method or 'cash',  # How was it paid (cash/card/check)
-                notes='Advance payment from Service record'  # Explanation
-            )
+            # Create the Invoice in database
+            invoice = build_invoice(service, settings, invoice_number)
+            invoice.save()
+            
+            # Record advance payment as a Payment transaction
+            if service.advance_payment > 0:
+                build_advance_payment(invoice, service).save()
         
+        metrics.inc('invoices_generated_total', {'source': 'auto'})
         return invoice
     except Exception as e:
         # If something goes wrong, print error but don't crash
@@ -133,12 +180,13 @@ def auto_generate_invoice(service):
         return None
 
 
-def update_service_status(service_id, new_status):
+def update_service_status(service_id, new_status, expected_version=None):
     # Update service status, auto-generate invoice when marked 'Completed'
+    # expected_version: raise VersionConflict if the row changed since then
     try:
         service = Service.objects.get(id=service_id)
         service.status = new_status  # Update status
-        service.save()  # Save to database
+        service.save(expected_version=expected_version)  # Save to database
         
         # TRIGGER: If completed, auto-generate invoice
         if new_status == 'Completed':
@@ -148,6 +196,113 @@ def update_service_status(service_id, new_status):
     except Service.DoesNotExist:
         return None
 
+def bulk_update_service_status(service_ids, new_status):
+    """
+    Move many services to new_status in one transaction
+    When the status is 'Completed', invoices (and advance Payments) for every
+    service that does not have one yet are built in memory and written with
+    bulk_create, using one settings lookup and one block of invoice numbers.
+
+    Args: service_ids (list), new_status (str)
+    Returns: list of per-item result dicts, in the order the IDs were given
+    """
+    # Validate every ID in a single query
+    services = {
+        str(service.id): service
+        for service in Service.objects.select_related('vehicle').filter(id__in=service_ids)
+    }
+    results = []
+    for service_id in service_ids:
+        service = services.get(str(service_id))
+        if service is None:
+            results.append({'id': service_id, 'status': 'error', 'error': 'Service record not found'})
+        else:
+            results.append({'id': service.id, 'status': 'updated', 'invoiceNumber': None})
+    found = list(services.values())
+
+    with transaction.atomic():
+        Service.objects.filter(id__in=[service.id for service in found]).update(
+            status=new_status, version=F('version') + 1
+        )
+        # .update() skips post_save, so the status log is written here
+        now = timezone.now()
+        transitions = []
+        for service in found:
+            previous = service._status_snapshot
+            service.status = new_status
+            service.version += 1
+            if previous != new_status:
+                transitions.append(ServiceStatusChange.for_service(service, previous, now))
+            service.snapshot_status()
+        ServiceStatusChange.objects.bulk_create(transitions)
+
+        if new_status == 'Completed' and found:
+            # .update() skips the signal that consumes reserved parts
+            inventory_service.consume_for_services([service.id for service in found])
+            invoices = _bulk_generate_invoices(found)
+            for result in results:
+                if result['status'] == 'updated' and result['id'] in invoices:
+                    result['invoiceNumber'] = invoices[result['id']]
+        # Outbox rows last, just before COMMIT (see events.settled_events)
+        record_changes(Service, [service.id for service in found], 'updated')
+
+    return results
+
+def _bulk_generate_invoices(services):
+    # Batched version of auto_generate_invoice, returns {service_id: invoice_number}
+    # Prevent duplicate invoices for services that already have one
+    invoiced = set(Invoice.objects.filter(
+        service_id__in=[service.id for service in services]
+    ).values_list('service_id', flat=True))
+    pending = [service for service in services if service.id not in invoiced]
+    if not pending:
+        return {}
+
+    with metrics.timer('invoice_generation_seconds', {'source': 'bulk'}):
+        generated = _create_invoices(pending)
+    metrics.inc('invoices_generated_total', {'source': 'bulk'}, len(pending))
+    return generated
+
+def _create_invoices(pending):
+    settings = BillingSetting.objects.first()
+    prefix = settings.invoice_prefix if settings else "INV"
+    numbers = next_invoice_numbers(prefix, len(pending))
+
+    invoices = [build_invoice(service, settings, number) for service, number in zip(pending, numbers)]
+    Invoice.objects.bulk_create(invoices)
+
+    # Some backends (MySQL) do not return primary keys from bulk_create,
+    # so look the new rows up by their unique numbers in one query
+    saved = {
+        invoice.invoice_number: invoice
+        for invoice in Invoice.objects.filter(invoice_number__in=numbers).only('id', 'invoice_number', 'date_created')
+    }
+    for invoice in invoices:
+        invoice.id = saved[invoice.invoice_number].id
+        invoice.date_created = saved[invoice.invoice_number].date_created
+    line_item_service.create_line_items(invoices)
+    payments = [
+        build_advance_payment(saved[invoice.invoice_number], service)
+        for service, invoice in zip(pending, invoices)
+        if service.advance_payment > 0
+    ]
+    Payment.objects.bulk_create(payments)
+    record_changes(Invoice, [invoice.id for invoice in saved.values()], 'created')
+    # Payment ids are not returned by bulk_create on every backend
+    record_changes(Payment, list(Payment.objects.filter(
+        invoice_id__in=[invoice.id for invoice in saved.values()]
+    ).values_list('id', flat=True)), 'created')
+
+    # bulk_create skips the post_save signal, so move customer totals here
+    totals = {}
+    for invoice in invoices:
+        paid, balance = totals.get(invoice.customer_id, (Decimal('0'), Decimal('0')))
+        totals[invoice.customer_id] = (paid + invoice.paid_amount, balance + invoice.balance_due)
+    for customer_id, (paid, balance) in totals.items():
+        customer_service.adjust_customer_totals(customer_id, paid, balance)
+
+    return {service.id: number for service, number in zip(pending, numbers)}
+
 def create_service_record(data):
     """
     Create a new service record
@@ -166,6 +321,13 @@ def create_service_record(data):
     cost = data.get('cost', 0)
     advance = data.get('advance_payment', 0)
     data['remaining_balance'] = cost - advance
+
+    # Odometer at the service (drives mileage reminders): defaults to the
+    # vehicle's current reading, and a higher reading updates the vehicle
+    if data.get('mileage') is None:
+        data['mileage'] = data['vehicle'].mileage
+    else:
+        vehicle_service.record_odometer(data['vehicle'].id, data['mileage'])
     
     # Create service in database
     service = Service.objects.create(**data)
@@ -183,8 +345,13 @@ def get_service_by_id(service_id):
     except Service.DoesNotExist:
         return None
 
-def update_service_record(service_id, data):
+def get_service_version(service_id):
+    # Current row version (used to report conflicts to the client)
+    return Service.objects.filter(id=service_id).values_list('version', flat=True).first()
+
+def update_service_record(service_id, data, expected_version=None):
     # Update service info, recalculate balance if cost or advance changed
+    # expected_version: only save if nobody changed the row since the client read it
     service = get_service_by_id(service_id)
     if service:
         # Recalculate balance if cost or advance changed
@@ -195,7 +362,9 @@ def update_service_record(service_id, data):
         # Update all fields
         for attr, value in data.items():
             setattr(service, attr, value)
-        service.save()  # Save to database
+        service.save(expected_version=expected_version)  # Conditional UPDATE when a version is given
+        if data.get('mileage') is not None:
+            vehicle_service.record_odometer(service.vehicle_id, data['mileage'])
         return service
     return None
 
@@ -0,0 +1,280 @@
+"""
+==============================================================
+MONTHLY STATEMENT SERVICE
+==============================================================
+One statement per customer per month, covering all of their
+vehicles: invoices issued and payments received in the month, older
+invoices that are still unpaid, and the balance due now.
+
+Data is gathered per chunk of customers with a fixed number of
+set-based queries (customers, invoices in the month, payments in the
+month, older open invoices), never one query per customer. Rendering
+needs no database, so the chunks are rendered on a process pool from
+plain dicts (see the generate_statements command).
+
+Customers with activity (an invoice or a payment in the month) are
+walked in id order, so a run can resume after the last customer id
+whose statement was written.
+
+Functions:
+- month_bounds(): Aware [start, end) datetimes of a YYYY-MM month
+- active_customer_ids(): Customers with activity, keyset-paginated
+- gather_statements(): Statement data for a chunk of customers
+- render_statement_html() / render_statement_pdf(): One statement
+- render_statement_chunk(): Process-pool worker writing the files
+==============================================================
+"""
+
+import io
+import os
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from django.db.models import F
+from django.template import Context, Engine
+from django.utils import timezone
+from ..models import Customer, Invoice, Payment
+from .pdf_service import PdfUnavailable, _company_details, _money, _text
+
+STATEMENT_FORMATS = ('html', 'pdf')
+
+STATEMENT_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Statement {{ period }} - {{ customer.name }}</title>
+<style>
+body { font-family: Helvetica, Arial, sans-serif; color: #111; margin: 32px; }
+table { border-collapse: collapse; width: 100%; margin-bottom: 24px; }
+th { background: #4f46e5; color: #fff; text-align: left; padding: 6px; }
+td { border-bottom: 1px solid #ddd; padding: 6px; }
+td.amount, th.amount { text-align: right; }
+.summary td { border: none; }
+</style></head>
+<body>
+<h1>{{ company.name }}</h1>
+<p>{{ company.address }}<br>{{ company.city }}<br>{{ company.phone }} | {{ company.email }}</p>
+<h2>Statement for {{ period }}</h2>
+<p>{{ customer.name }}<br>{{ customer.email }} | {{ customer.phone }}{% if customer.address %}<br>{{ customer.address }}{% endif %}</p>
+
+<h3>Invoices this month</h3>
+{% if invoices %}<table>
+<tr><th>Invoice</th><th>Date</th><th>Vehicle</th><th>Status</th><th class="amount">Total</th><th class="amount">Balance</th></tr>
+{% for invoice in invoices %}<tr><td>{{ invoice.number }}</td><td>{{ invoice.date|date:"Y-m-d" }}</td><td>{{ invoice.vehicle }}</td><td>{{ invoice.status }}</td><td class="amount">{{ invoice.total_display }}</td><td class="amount">{{ invoice.balance_display }}</td></tr>
+{% endfor %}</table>{% else %}<p>No invoices this month.</p>{% endif %}
+
+<h3>Payments received</h3>
+{% if payments %}<table>
+<tr><th>Date</th><th>Invoice</th><th>Method</th><th class="amount">Amount</th></tr>
+{% for payment in payments %}<tr><td>{{ payment.date|date:"Y-m-d" }}</td><td>{{ payment.invoice }}</td><td>{{ payment.method }}</td><td class="amount">{{ payment.amount_display }}</td></tr>
+{% endfor %}</table>{% else %}<p>No payments this month.</p>{% endif %}
+
+{% if earlier_open %}<h3>Still unpaid from earlier months</h3>
+<table>
+<tr><th>Invoice</th><th>Date</th><th>Vehicle</th><th class="amount">Balance</th></tr>
+{% for invoice in earlier_open %}<tr><td>{{ invoice.number }}</td><td>{{ invoice.date|date:"Y-m-d" }}</td><td>{{ invoice.vehicle }}</td><td class="amount">{{ invoice.balance_display }}</td></tr>
+{% endfor %}</table>{% endif %}
+
+<table class="summary">
+<tr><td>Invoiced this month</td><td class="amount">{{ invoiced_display }}</td></tr>
+<tr><td>Paid this month</td><td class="amount">{{ paid_display }}</td></tr>
+<tr><td><strong>Balance due</strong></td><td class="amount"><strong>{{ balance_display }}</strong></td></tr>
+</table>
+</body></html>
+"""
+
+_engine = None
+
+
+def _template():
+    # Standalone engine: statements do not depend on the TEMPLATES setting
+    global _engine
+    if _engine is None:
+        _engine = Engine().from_string(STATEMENT_TEMPLATE)
+    return _engine
+
+
+def company_details(billing):
+    # Letterhead shared with the invoice PDFs (picklable dict for the workers)
+    return _company_details(billing)
+
+
+def month_bounds(period):
+    """'2026-09' -> (2026-09-01 00:00, 2026-10-01 00:00) in local time; ValueError if malformed"""
+    start = datetime.strptime(period, '%Y-%m')
+    end = start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return timezone.make_aware(start), timezone.make_aware(end)
+
+
+def active_customer_ids(start, end, after_id=0, limit=None):
+    """
+    IDs (ascending, > after_id) of customers with an invoice or a payment
+    in [start, end): one UNION of two date-index range scans
+    """
+    invoiced = Invoice.objects.filter(
+        date_created__gte=start, date_created__lt=end, customer_id__gt=after_id
+    ).values_list('customer_id', flat=True)
+    paid = Payment.objects.filter(
+        date__gte=start, date__lt=end, invoice__customer_id__gt=after_id
+    ).values_list('invoice__customer_id', flat=True)
+    queryset = invoiced.union(paid).order_by('customer_id')
+    return list(queryset[:limit] if limit else queryset)
+
+
+def _invoice_rows(queryset):
+    return queryset.values(
+        'customer_id', 'invoice_number', 'date_created', 'status', 'total', 'balance_due',
+        vehicle_number=F('vehicle__number'),
+    ).order_by('customer_id', 'date_created', 'id')
+
+
+def _invoice_entry(row):
+    return {
+        'number': row['invoice_number'],
+        'date': timezone.localtime(row['date_created']),
+        'vehicle': row['vehicle_number'],
+        'status': row['status'],
+        'total': row['total'],
+        'balance': row['balance_due'],
+    }
+
+
+def gather_statements(customer_ids, start, end, period):
+    """
+    Statement dicts for the given customers (in id order), from four
+    set-based queries regardless of how many customers are in the chunk
+    """
+    customers = Customer.objects.filter(id__in=customer_ids).order_by('id').values(
+        'id', 'name', 'email', 'phone', 'address', 'outstanding_balance'
+    )
+    invoices = defaultdict(list)
+    for row in _invoice_rows(Invoice.objects.filter(
+            customer_id__in=customer_ids, date_created__gte=start, date_created__lt=end)):
+        invoices[row['customer_id']].append(_invoice_entry(row))
+    earlier_open = defaultdict(list)
+    for row in _invoice_rows(Invoice.objects.filter(
+            customer_id__in=customer_ids, date_created__lt=start, balance_due__gt=0
+    ).exclude(status='canceled')):
+        earlier_open[row['customer_id']].append(_invoice_entry(row))
+    payments = defaultdict(list)
+    for row in Payment.objects.filter(
+            invoice__customer_id__in=customer_ids, date__gte=start, date__lt=end
+    ).values('date', 'amount', 'method', customer_id=F('invoice__customer_id'),
+             invoice_number=F('invoice__invoice_number')).order_by('date', 'id'):
+        payments[row['customer_id']].append({
+            'date': timezone.localtime(row['date']), 'invoice': row['invoice_number'],
+            'method': row['method'], 'amount': row['amount'],
+        })
+
+    return [
+        {
+            'period': period,
+            'customer': customer,
+            'invoices': invoices[customer['id']],
+            'payments': payments[customer['id']],
+            'earlier_open': earlier_open[customer['id']],
+            'invoiced': sum((invoice['total'] for invoice in invoices[customer['id']]), Decimal('0')),
+            'paid': sum((payment['amount'] for payment in payments[customer['id']]), Decimal('0')),
+            'balance': customer['outstanding_balance'],
+        }
+        for customer in customers
+    ]
+
+
+def _display(statement):
+    # Money columns pre-formatted the way invoice PDFs print them
+    for invoice in statement['invoices'] + statement['earlier_open']:
+        invoice['total_display'] = _money(invoice['total'])
+        invoice['balance_display'] = _money(invoice['balance'])
+    for payment in statement['payments']:
+        payment['amount_display'] = _money(payment['amount'])
+    for key in ('invoiced', 'paid', 'balance'):
+        statement[f'{key}_display'] = _money(statement[key])
+    return statement
+
+
+def render_statement_html(statement, company):
+    return _template().render(Context({**_display(statement), 'company': company}))
+
+
+def render_statement_pdf(statement, company):
+    try:
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.lib.units import mm
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
+    except ImportError as e:
+        raise PdfUnavailable("PDF rendering requires the 'reportlab' package") from e
+
+    statement = _display(statement)
+    customer = statement['customer']
+    styles = getSampleStyleSheet()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, title=f"Statement {statement['period']}",
+                            leftMargin=18 * mm, rightMargin=18 * mm, topMargin=18 * mm, bottomMargin=18 * mm)
+    # Paragraphs parse markup, so every value is escaped (table cells are plain text)
+    company = {key: _text(value) for key, value in company.items()}
+    story = [
+        Paragraph(company['name'], styles['Title']),
+        Paragraph(f"{company['address']}<br/>{company['city']}<br/>{company['phone']} | {company['email']}", styles['Normal']),
+        Spacer(1, 8 * mm),
+        Paragraph(f"Statement for {_text(statement['period'])}", styles['Heading2']),
+        Paragraph(f"{_text(customer['name'])}<br/>{_text(customer['email'])} | {_text(customer['phone'])}", styles['Normal']),
+        Spacer(1, 6 * mm),
+    ]
+    sections = [
+        ('Invoices this month', ['Invoice', 'Date', 'Vehicle', 'Total', 'Balance'], [
+            [i['number'], f"{i['date']:%Y-%m-%d}", i['vehicle'], i['total_display'], i['balance_display']]
+            for i in statement['invoices']
+        ]),
+        ('Payments received', ['Date', 'Invoice', 'Method', 'Amount'], [
+            [f"{p['date']:%Y-%m-%d}", p['invoice'], p['method'], p['amount_display']] for p in statement['payments']
+        ]),
+        ('Still unpaid from earlier months', ['Invoice', 'Date', 'Vehicle', 'Balance'], [
+            [i['number'], f"{i['date']:%Y-%m-%d}", i['vehicle'], i['balance_display']] for i in statement['earlier_open']
+        ]),
+    ]
+    for title, header, rows in sections:
+        if rows:
+            story += [Paragraph(title, styles['Heading3']), Table([header] + rows), Spacer(1, 4 * mm)]
+    story.append(Table([
+        ['Invoiced this month', statement['invoiced_display']],
+        ['Paid this month', statement['paid_display']],
+        ['Balance due', statement['balance_display']],
+    ]))
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def statement_path(out_dir, statement, extension):
+    return Path(out_dir) / f"statement-{statement['period']}-{statement['customer']['id']}.{extension}"
+
+
+def _write_atomic(path, data):
+    # Temp file + rename: a crash never leaves half a statement behind
+    tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def render_statement_chunk(statements, billing_company, out_dir, formats):
+    """
+    Process-pool worker: render and write every statement in a chunk
+    (no database access). A statement that fails is skipped, not the chunk
+    Returns (statements written, [(customer id, error), ...])
+    """
+    written, failed = 0, []
+    for statement in statements:
+        try:
+            if 'html' in formats:
+                html = render_statement_html(statement, billing_company)
+                _write_atomic(statement_path(out_dir, statement, 'html'), html.encode('utf-8'))
+            if 'pdf' in formats:
+                _write_atomic(statement_path(out_dir, statement, 'pdf'), render_statement_pdf(statement, billing_company))
+        except Exception as e:
+            failed.append((statement['customer']['id'], f"{type(e).__name__}: {e}"))
+        else:
+            written += 1
+    return written, failed
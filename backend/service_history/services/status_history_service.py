@@ -0,0 +1,177 @@
+"""
+==============================================================
+STATUS HISTORY SERVICE (CYCLE-TIME ANALYTICS)
+==============================================================
+"How long do jobs really take, and how good are our estimates?"
+
+Source: the append-only service_status_changes log (one row per
+status transition, see models.ServiceStatusChange).
+
+For every job completed in the requested range:
+- Cycle time:        created -> first 'Completed'
+- Pending time:      total time spent 'Pending' before completion
+- In-progress time:  total time spent 'In Progress' before completion
+- Estimate ratio:    in-progress hours / estimated_hours (> 1: overran)
+
+Only jobs whose log starts with their creation row are counted (jobs
+created before the log existed have no reliable start). The SQL side
+is two index scans - completed rows by (status, changed_at), then
+their timelines by (service, changed_at) - and the per-job figures
+and p50/p90 per group are computed with NumPy over the whole log at
+once, not job by job.
+
+Functions:
+- load_timelines(): Log rows of jobs completed in a date range
+- job_cycle_times(): Per-job hours from the log (vectorized)
+- cycle_time_report(): p50/p90 overall, by service type and technician
+==============================================================
+"""
+
+from django.db.models import Subquery
+from ..models import ServiceStatusChange, Technician
+from .archive_service import filter_date_range
+
+STATUS_CODES = {'Pending': 0, 'In Progress': 1, 'Completed': 2}
+PERCENTILES = (50, 90)
+
+
+class AnalyticsUnavailable(Exception):
+    """NumPy is not installed"""
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise AnalyticsUnavailable("Cycle-time analytics require the 'numpy' package") from e
+    return numpy
+
+
+def load_timelines(date_from=None, date_to=None):
+    """
+    Every log row of the jobs completed in the range (inclusive days),
+    ordered by job then time, as a dict of NumPy arrays
+    """
+    np = _numpy()
+    completed = filter_date_range(
+        ServiceStatusChange.objects.filter(status='Completed'), 'changed_at', date_from, date_to
+    ).values('service_id')
+    rows = list(
+        ServiceStatusChange.objects.filter(service_id__in=Subquery(completed))
+        .order_by('service_id', 'changed_at', 'id')
+        .values_list('service_id', 'previous_status', 'status', 'changed_at',
+                     'service_type', 'technician_id', 'estimated_hours')
+        .iterator(chunk_size=20000)
+    )
+    services, previous, statuses, changed_at, types, technicians, estimates = zip(*rows) if rows else ((),) * 7
+    count = len(rows)
+    return {
+        'service': np.fromiter(services, dtype=np.int64, count=count),
+        'is_start': np.fromiter((value is None for value in previous), dtype=bool, count=count),
+        'status': np.fromiter((STATUS_CODES.get(value, -1) for value in statuses), dtype=np.int8, count=count),
+        'time': np.fromiter((value.timestamp() for value in changed_at), dtype=np.float64, count=count),
+        'type': np.array(types, dtype=object),
+        'technician': np.fromiter((value or 0 for value in technicians), dtype=np.int64, count=count),  # 0: unassigned
+        'estimate': np.fromiter((float(value) for value in estimates), dtype=np.float64, count=count),
+    }
+
+
+def job_cycle_times(timelines):
+    """
+    Per-job figures from load_timelines() output, one entry per job that
+    was completed and whose creation is in the log
+    Returns a dict of arrays: type, technician, estimate (as of
+    completion), cycle / pending / in_progress hours
+    """
+    np = _numpy()
+    service, status, moment = timelines['service'], timelines['status'], timelines['time']
+    rows = len(service)
+
+    # Time spent in each row's status = gap to the job's next row
+    same_job_next = np.zeros(rows, dtype=bool)
+    same_job_next[:-1] = service[1:] == service[:-1]
+    spent = np.zeros(rows)
+    spent[:-1] = np.where(same_job_next[:-1], moment[1:] - moment[:-1], 0.0)
+
+    jobs, first_row, job_of_row = np.unique(service, return_index=True, return_inverse=True)
+    # First 'Completed' row of each job (rows are time-ordered per job)
+    completed_rows = np.flatnonzero(status == STATUS_CODES['Completed'])
+    completed_jobs, first_completed = np.unique(service[completed_rows], return_index=True)
+    completion_row = np.full(len(jobs), -1, dtype=np.int64)
+    completion_row[np.searchsorted(jobs, completed_jobs)] = completed_rows[first_completed]
+
+    before_completion = np.arange(rows) < completion_row[job_of_row]
+
+    def hours_in(status_name):
+        weights = np.where(before_completion & (status == STATUS_CODES[status_name]), spent, 0.0)
+        return np.bincount(job_of_row, weights=weights, minlength=len(jobs)) / 3600
+
+    pending = hours_in('Pending')
+    in_progress = hours_in('In Progress')
+    counted = (completion_row >= 0) & timelines['is_start'][first_row]
+    end = completion_row[counted]
+    return {
+        'type': timelines['type'][end],
+        'technician': timelines['technician'][end],
+        'estimate': timelines['estimate'][end],
+        'cycle': (moment[end] - moment[first_row[counted]]) / 3600,
+        'pending': pending[counted],
+        'in_progress': in_progress[counted],
+    }
+
+
+def _percentiles(np, values):
+    if not len(values):
+        return None
+    points = np.percentile(values, PERCENTILES)
+    return {f'p{level}': round(float(point), 2) for level, point in zip(PERCENTILES, points)}
+
+
+def _summary(np, jobs, selection):
+    estimate = jobs['estimate'][selection]
+    in_progress = jobs['in_progress'][selection]
+    estimated = estimate > 0
+    return {
+        'jobs': int(len(estimate)),
+        'cycleHours': _percentiles(np, jobs['cycle'][selection]),
+        'pendingHours': _percentiles(np, jobs['pending'][selection]),
+        'inProgressHours': _percentiles(np, in_progress),
+        'estimatedHours': _percentiles(np, estimate[estimated]),
+        'estimateRatio': _percentiles(np, in_progress[estimated] / estimate[estimated]),
+    }
+
+
+def _grouped(np, jobs, keys):
+    # [(key, summary)] ordered by job count; one stable sort, then slices
+    if not len(keys):
+        return []
+    groups, group_of_job = np.unique(keys, return_inverse=True)
+    order = np.argsort(group_of_job, kind='stable')
+    bounds = np.cumsum(np.bincount(group_of_job, minlength=len(groups)))[:-1]
+    results = [
+        (key, _summary(np, jobs, selection))
+        for key, selection in zip(groups.tolist(), np.split(order, bounds))
+    ]
+    return sorted(results, key=lambda item: -item[1]['jobs'])
+
+
+def cycle_time_report(date_from=None, date_to=None):
+    """
+    p50/p90 cycle, pending and in-progress hours (and estimate accuracy)
+    for jobs completed in the range: overall, by service type and by
+    technician (as of completion)
+    """
+    np = _numpy()
+    jobs = job_cycle_times(load_timelines(date_from, date_to))
+    everything = np.arange(len(jobs['cycle']))
+
+    by_technician = _grouped(np, jobs, jobs['technician'])
+    names = dict(Technician.objects.filter(id__in=[key for key, _ in by_technician]).values_list('id', 'name'))
+    return {
+        'overall': _summary(np, jobs, everything),
+        'byType': [{'type': key, **summary} for key, summary in _grouped(np, jobs, jobs['type'])],
+        'byTechnician': [
+            {'technicianId': key or None, 'technician': names.get(key, 'Unassigned' if not key else None), **summary}
+            for key, summary in by_technician
+        ],
+    }
@@ -12,10 +12,27 @@ Functions:
 - create_vehicle(): Create new vehicle
 - update_vehicle(): Update vehicle information
 - delete_vehicle(): Delete vehicle from database
+- record_odometer(): Move a vehicle's mileage forward to a new reading
+- lookup_plates(): Typeahead on the normalized plate (LRU cached)
+- clear_plate_cache(): Drop cached lookups after a vehicle/customer change
 ==============================================================
 """
 
-from ..models import Vehicle
+import threading
+import time
+from collections import OrderedDict
+from django.db import transaction
+from ..models import Vehicle, normalize_plate
+
+# Front-desk plate lookups: a small per-process LRU over the hottest
+# prefixes. Entries expire after PLATE_CACHE_TTL seconds so changes made
+# through other processes show up quickly; local changes clear it at once.
+PLATE_CACHE_SIZE = 512
+PLATE_CACHE_TTL = 30
+PLATE_LOOKUP_LIMIT = 10
+
+_plate_cache = OrderedDict()
+_plate_cache_lock = threading.Lock()
 
 def get_all_vehicles():
     # Get all vehicles from database
@@ -36,6 +53,17 @@ def create_vehicle(data):
     vehicle = Vehicle.objects.create(**data)
     return vehicle
 
+def record_odometer(vehicle_id, reading):
+    # Conditional UPDATE: the odometer only ever moves forward
+    # Returns True if the vehicle's mileage changed
+    from ..events import record_changes
+    with transaction.atomic():
+        changed = bool(Vehicle.objects.filter(id=vehicle_id, mileage__lt=reading).update(mileage=reading))
+        if changed:
+            # .update() skips signals, so tell the change feed (and cache) directly
+            record_changes(Vehicle, [vehicle_id], 'updated')
+    return changed
+
 def get_vehicles_by_customer(customer_id):
     # Get all vehicles for a specific customer
     return Vehicle.objects.filter(customer_id=customer_id)
@@ -72,3 +100,54 @@ def delete_vehicle(vehicle_id):
         vehicle.delete()  # Permanently remove
         return True
     return False
+
+
+def _lookup_rows(normalized, limit):
+    # Range scan on the unique normalized_number index: LIKE 'ABC12%'
+    vehicles = (
+        Vehicle.objects.filter(normalized_number__startswith=normalized)
+        .select_related('customer')
+        .only('id', 'number', 'brand', 'model', 'customer_id', 'customer__name', 'customer__phone')
+        .order_by('normalized_number')[:limit]
+    )
+    return [
+        {
+            'id': vehicle.id,
+            'number': vehicle.number,
+            'brand': vehicle.brand,
+            'model': vehicle.model,
+            'customerId': vehicle.customer_id,
+            'customerName': vehicle.customer.name,
+            'customerPhone': vehicle.customer.phone,
+        }
+        for vehicle in vehicles
+    ]
+
+
+def lookup_plates(plate, limit=PLATE_LOOKUP_LIMIT):
+    # Vehicles whose plate starts with `plate`, ignoring case and separators
+    # Exact matches sort first because they are the shortest normalized value
+    normalized = normalize_plate(plate)
+    if not normalized:
+        return []
+    key = (normalized, limit)
+    now = time.monotonic()
+    with _plate_cache_lock:
+        cached = _plate_cache.get(key)
+        if cached and cached[0] > now:
+            _plate_cache.move_to_end(key)
+            return cached[1]
+
+    rows = _lookup_rows(normalized, limit)
+
+    with _plate_cache_lock:
+        _plate_cache[key] = (now + PLATE_CACHE_TTL, rows)
+        _plate_cache.move_to_end(key)
+        while len(_plate_cache) > PLATE_CACHE_SIZE:
+            _plate_cache.popitem(last=False)
+    return rows
+
+
+def clear_plate_cache():
+    with _plate_cache_lock:
+        _plate_cache.clear()
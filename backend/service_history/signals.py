@@ -0,0 +1,164 @@
+"""
+==============================================================
+MODEL SIGNALS
+==============================================================
+Hooks that run whenever service_history models are saved or deleted,
+no matter which view, serializer or admin page made the change.
+
+Handlers:
+- sync_customer_totals_on_save(): Apply invoice paid/balance changes
+  to the customer's denormalized lifetime_spend / outstanding_balance
+- sync_customer_totals_on_delete(): Remove a deleted invoice's figures
+  from its customer's totals
+- sync_line_items_on_save(): Mirror Invoice.line_items into the
+  invoice_line_items table when they changed
+- clear_plate_lookup_cache(): Drop cached plate lookups when a vehicle
+  or customer changes
+- publish_change_on_save() / publish_change_on_delete(): Write a
+  ChangeEvent outbox row for the live change feed (events.py)
+- bump_response_cache(): Invalidate cached GET responses that read
+  the changed model (response_cache.py)
+- log_status_change(): Append a ServiceStatusChange row when a service
+  is created or its status changes
+- consume_parts_on_completion(): Take a completed service's reserved
+  parts out of stock
+- release_parts_on_delete(): Give reserved stock back when a service's
+  parts are deleted (also by cascade)
+==============================================================
+"""
+
+from decimal import Decimal
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Customer, Vehicle, Technician, Service, Invoice, Payment, Appointment, ServiceStatusChange, ServicePart, MaintenanceReminder
+from .services import customer_service, line_item_service, archive_service, vehicle_service, inventory_service
+from . import events
+from .response_cache import bump_generation
+
+# Models whose changes are pushed to the frontend's change feed
+# (appointment events also keep schedule_service's interval index current)
+FEED_MODELS = (Customer, Vehicle, Technician, Service, Invoice, Payment, Appointment)
+
+
+def _as_decimal(value):
+    # Invoice amounts are sometimes assigned as int/float before save
+    return Decimal(str(value or 0))
+
+
+@receiver(post_save, sender=Invoice)
+def sync_customer_totals_on_save(sender, instance, created, **kwargs):
+    # Apply only the difference between the stored and the new figures
+    snapshot = None if created else getattr(instance, '_balance_snapshot', None)
+    paid = _as_decimal(instance.paid_amount)
+    balance = _as_decimal(instance.balance_due)
+
+    if created:
+        customer_service.adjust_customer_totals(instance.customer_id, paid, balance)
+    elif snapshot is None:
+        # Previous figures unknown (e.g. deferred load) - rebuild from invoices
+        customer_service.recalculate_customer_totals(instance.customer_id)
+    else:
+        old_customer_id, old_paid, old_balance = snapshot
+        if old_customer_id != instance.customer_id:
+            # Invoice moved to another customer: take it off the old one entirely
+            customer_service.adjust_customer_totals(
+                old_customer_id, -_as_decimal(old_paid), -_as_decimal(old_balance)
+            )
+            customer_service.adjust_customer_totals(instance.customer_id, paid, balance)
+        else:
+            customer_service.adjust_customer_totals(
+                instance.customer_id,
+                paid - _as_decimal(old_paid),
+                balance - _as_decimal(old_balance)
+            )
+
+    instance.snapshot_balances()
+
+
+@receiver(post_delete, sender=Invoice)
+def sync_customer_totals_on_delete(sender, instance, **kwargs):
+    # Archived invoices still count towards the customer's lifetime spend
+    if archive_service.is_archiving():
+        return
+    # Use the persisted figures, not any unsaved edits on the instance
+    snapshot = getattr(instance, '_balance_snapshot', None)
+    if snapshot is None:
+        customer_service.recalculate_customer_totals(instance.customer_id)
+        return
+    customer_id, paid, balance = snapshot
+    customer_service.adjust_customer_totals(customer_id, -_as_decimal(paid), -_as_decimal(balance))
+
+
+@receiver(post_save, sender=Invoice)
+def sync_line_items_on_save(sender, instance, created, **kwargs):
+    # Payment syncs re-save invoices constantly; only rewrite rows on edits
+    if created or instance.line_items_changed():
+        line_item_service.sync_line_items(instance)
+        instance.snapshot_line_items()
+
+
+@receiver(post_save, sender=Service)
+def log_status_change(sender, instance, created, **kwargs):
+    # Initial status on create, then only real transitions
+    # (bulk_update_service_status() writes its rows itself)
+    previous = getattr(instance, '_status_snapshot', None)
+    if created:
+        ServiceStatusChange.for_service(instance, None).save()
+    elif previous is not None and previous != instance.status:
+        # previous is None for deferred loads - nothing reliable to log
+        ServiceStatusChange.for_service(instance, previous).save()
+    instance.snapshot_status()
+
+
+@receiver(post_save, sender=Service)
+def consume_parts_on_completion(sender, instance, **kwargs):
+    # Idempotent (only 'reserved' rows move), so no need to detect the transition
+    if instance.status == 'Completed':
+        inventory_service.consume_for_services([instance.pk])
+
+
+@receiver(post_delete, sender=ServicePart)
+def release_parts_on_delete(sender, instance, **kwargs):
+    if instance.status == 'reserved':
+        inventory_service.release_stock(instance.part_id, instance.quantity)
+
+
+@receiver(post_delete, sender=Service)
+def drop_reminders_on_delete(sender, instance, **kwargs):
+    # A deleted job never happened, so reminders counted from it go too;
+    # an archived one still counts (reminders keep its id, no FK constraint)
+    if archive_service.is_archiving():
+        return
+    MaintenanceReminder.objects.filter(last_service_id=instance.id).delete()
+
+
+@receiver(post_save, sender=Vehicle)
+@receiver(post_delete, sender=Vehicle)
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def clear_plate_lookup_cache(sender, **kwargs):
+    # Plate lookups embed the owner's name/phone, so both models invalidate
+    vehicle_service.clear_plate_cache()
+
+
+def publish_change_on_save(sender, instance, created, **kwargs):
+    events.record_change(instance, 'created' if created else 'updated')
+
+
+def publish_change_on_delete(sender, instance, **kwargs):
+    if archive_service.is_archiving():
+        return  # archive_service emits these in bulk per batch
+    events.record_change(instance, 'deleted')
+
+
+def bump_response_cache(sender, **kwargs):
+    if archive_service.is_archiving():
+        return  # record_changes() bumps once per archived batch
+    bump_generation(sender)
+
+
+for _model in FEED_MODELS:
+    post_save.connect(publish_change_on_save, sender=_model, dispatch_uid=f'feed_save_{_model.__name__}')
+    post_delete.connect(publish_change_on_delete, sender=_model, dispatch_uid=f'feed_delete_{_model.__name__}')
+    post_save.connect(bump_response_cache, sender=_model, dispatch_uid=f'cache_save_{_model.__name__}')
+    post_delete.connect(bump_response_cache, sender=_model, dispatch_uid=f'cache_delete_{_model.__name__}')
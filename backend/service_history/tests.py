@@ -1,3 +1,545 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_EVEN
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from utils.db_router import PrimaryReplicaRouter, ReplicaRoutingMiddleware, PRIMARY_PIN_COOKIE
+from .models import (
+    Technician, ChangeEvent, Customer, Vehicle, Service, Part, ServicePart, RequestProfile, Appointment,
+    MaintenanceReminder, Bay, TechnicianShift, BillingSetting, Invoice, Payment, IdempotencyKey,
+    InvoiceLineItem, ArchivedService, ArchivedInvoice, ArchivedPayment,
+)
+from . import events, idempotency
+from .services import archive_service, customer_service, service_service
+from .services.inventory_service import OutOfStock, reserve_part
+from .services.payment_service import sync_invoice_payments
+from .services.reprice_service import _div_round, reprice_amounts, rescale_line_items
+
+
+class ReplicaRouterTests(unittest.TestCase):
+    """
+    Two SQLite files stand in for the MySQL primary and replica. Each holds a
+    different technician, so the name read back shows which database served it.
+    """
+    PRIMARY = 'router_primary'
+    REPLICA = 'router_replica'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.mkdtemp()
+        for alias in (cls.PRIMARY, cls.REPLICA):
+            connections.settings[alias] = connections.configure_settings({
+                'default': {},
+                alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(Path(cls.tmpdir) / f'{alias}.sqlite3')},
+            })[alias]
+            with connections[alias].schema_editor() as editor:
+                editor.create_model(Technician)
+                editor.create_model(ChangeEvent)  # Written by the change feed signals
+        Technician.objects.using(cls.PRIMARY).create(name='primary')
+        Technician.objects.using(cls.REPLICA).create(name='replica')
+
+    @classmethod
+    def tearDownClass(cls):
+        for alias in (cls.PRIMARY, cls.REPLICA):
+            connections[alias].close()
+            del connections.settings[alias]
+        shutil.rmtree(cls.tmpdir)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter(primary=self.PRIMARY, replica=self.REPLICA)
+        override = override_settings(DATABASE_ROUTERS=[self.router], REPLICA_STICKY_SECONDS=5)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.middleware = ReplicaRoutingMiddleware(self.read_technician)
+        self.factory = RequestFactory()
+
+    def read_technician(self, request):
+        # Stand-in view: report which database answered the read
+        return HttpResponse(Technician.objects.get().name)
+
+    def test_get_reads_from_replica(self):
+        response = self.middleware(self.factory.get('/api/technicians/'))
+        self.assertEqual(response.content, b'replica')
+
+    def test_writes_and_non_get_reads_use_primary(self):
+        self.assertEqual(self.router.db_for_write(Technician), self.PRIMARY)
+        response = self.middleware(self.factory.post('/api/technicians/'))
+        self.assertEqual(response.content, b'primary')
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(Technician.objects.get().name, 'primary')
+
+    def test_write_pins_browser_to_primary(self):
+        response = self.middleware(self.factory.post('/api/technicians/'))
+        self.assertEqual(response.cookies[PRIMARY_PIN_COOKIE]['max-age'], 5)
+
+        request = self.factory.get('/api/technicians/')
+        request.COOKIES[PRIMARY_PIN_COOKIE] = '1'
+        self.assertEqual(self.middleware(request).content, b'primary')
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        with mock.patch.object(self.router.health, 'measure_lag', return_value=30):
+            response = self.middleware(self.factory.get('/api/technicians/'))
+        self.assertEqual(response.content, b'primary')
+
+    def test_unlisted_models_stay_on_primary(self):
+        self.router.models = set()
+        response = self.middleware(self.factory.get('/api/technicians/'))
+        self.assertEqual(response.content, b'primary')
+
+    def test_replica_is_never_migrated(self):
+        self.assertFalse(self.router.allow_migrate(self.REPLICA, 'service_history'))
+        self.assertTrue(self.router.allow_migrate(self.PRIMARY, 'service_history'))
+
+
+class RepriceMathTests(unittest.TestCase):
+    """Integer-cent arithmetic behind reprice_open_invoices()"""
+
+    def test_div_round_is_half_even(self):
+        self.assertEqual(_div_round(5, 2), 2)    # 2.5  -> 2
+        self.assertEqual(_div_round(7, 2), 4)    # 3.5  -> 4
+        self.assertEqual(_div_round(9, 4), 2)    # 2.25 -> 2
+        self.assertEqual(_div_round(11, 4), 3)   # 2.75 -> 3
+
+    def test_div_round_matches_decimal_quantize(self):
+        for cents in range(0, 5000, 7):
+            expected = (Decimal(cents) * Decimal('0.0625')).quantize(Decimal('1'), rounding=ROUND_HALF_EVEN)
+            self.assertEqual(_div_round(cents * 625, 10000), int(expected), cents)
+
+    def test_tax_added_on_top(self):
+        # 10.00 at 6.25% = 0.625 -> 0.62; 10.16 -> 0.635 -> 0.64
+        self.assertEqual(reprice_amounts(1000, 0, 0, 0, False, 625), (1000, 62, 1062, 1062))
+        self.assertEqual(reprice_amounts(1016, 0, 0, 500, False, 625), (1016, 64, 1080, 580))
+        # Discount comes off before tax
+        self.assertEqual(reprice_amounts(1000, 0, 200, 0, False, 2000), (1000, 160, 960, 960))
+
+    def test_tax_included_keeps_the_gross(self):
+        # 11.00 gross at 20%: net 9.1666.. -> 9.17, tax is what is left
+        self.assertEqual(reprice_amounts(1000, 100, 0, 500, True, 2000), (917, 183, 1100, 600))
+
+    def test_rescale_puts_the_remainder_on_the_last_item(self):
+        items = [{'description': name, 'quantity': 1, 'unitPrice': 10.0, 'total': 10.0} for name in 'abc']
+        rescaled = rescale_line_items(items, 3000, 1000)
+        self.assertEqual([item['total'] for item in rescaled], [3.33, 3.33, 3.34])
+        self.assertEqual(sum(Decimal(str(item['total'])) for item in rescaled), Decimal('10.00'))
+        self.assertEqual(rescaled[0]['description'], 'a')
+
+    def test_rescale_unit_price_follows_quantity(self):
+        rescaled = rescale_line_items([{'quantity': 2, 'unitPrice': 5.0, 'total': 10.0}], 1000, 1500)
+        self.assertEqual(rescaled, [{'quantity': 2, 'unitPrice': 7.5, 'total': 15.0}])
+
+    def test_rescale_leaves_unchanged_items_alone(self):
+        items = [{'quantity': 1, 'unitPrice': 10.0, 'total': 10.0}]
+        self.assertIs(rescale_line_items(items, 1000, 1000), items)
+        self.assertIs(rescale_line_items(items, 0, 1000), items)
+        self.assertEqual(rescale_line_items([], 1000, 900), [])
+
+
+class StockDatabaseRouter:
+    """Sends every query to one database"""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def db_for_read(self, model, **hints):
+        return self.alias
+
+    def db_for_write(self, model, **hints):
+        return self.alias
+
+
+class ConcurrentReservationTests(unittest.TestCase):
+    """
+    Many threads reserve the same SKU at once. A SQLite file (not the
+    in-memory test database, and no test transaction around it) so every
+    thread has its own connection and every reservation really commits.
+    """
+    STOCK = 'inventory_stock'
+    THREADS = 16
+    ATTEMPTS = 10   # Reservations per thread, one unit each
+    ON_HAND = 50
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.mkdtemp()
+        connections.settings[cls.STOCK] = connections.configure_settings({
+            'default': {},
+            cls.STOCK: {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': str(Path(cls.tmpdir) / 'stock.sqlite3'),
+                'OPTIONS': {'timeout': 30},  # Writers queue for the file lock
+            },
+        })[cls.STOCK]
+        with connections[cls.STOCK].schema_editor() as editor:
+            for model in apps.get_app_config('service_history').get_models():
+                editor.create_model(model)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[cls.STOCK].close()
+        del connections.settings[cls.STOCK]
+        shutil.rmtree(cls.tmpdir)
+        super().tearDownClass()
+
+    def setUp(self):
+        override = override_settings(DATABASE_ROUTERS=[StockDatabaseRouter(self.STOCK)])
+        override.enable()
+        self.addCleanup(override.disable)
+        customer = Customer.objects.create(name='Stock Test', email='stock@example.com', phone='0700000000')
+        vehicle = Vehicle.objects.create(customer=customer, brand='Toyota', model='Corolla', year='2020', number='STK-1')
+        self.service = Service.objects.create(vehicle=vehicle, type='Brakes', date=timezone.now())
+        self.part = Part.objects.create(sku='PAD-1', name='Brake pad', unit_price=Decimal('25.00'), on_hand=self.ON_HAND)
+
+    def reserve_many(self, start, granted, refused):
+        try:
+            start.wait()
+            for _ in range(self.ATTEMPTS):
+                try:
+                    granted.append(reserve_part(self.service, self.part.id, 1).id)
+                except OutOfStock:
+                    refused.append(1)
+        finally:
+            connections.close_all()
+
+    def test_same_sku_is_never_oversold(self):
+        start = threading.Barrier(self.THREADS)
+        granted, refused = [], []
+        threads = [
+            threading.Thread(target=self.reserve_many, args=(start, granted, refused))
+            for _ in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.part.refresh_from_db()
+        self.assertLessEqual(self.part.reserved, self.part.on_hand)
+        self.assertEqual(self.part.reserved, self.ON_HAND)
+        self.assertEqual(len(granted), self.ON_HAND)
+        self.assertEqual(len(refused), self.THREADS * self.ATTEMPTS - self.ON_HAND)
+        self.assertEqual(ServicePart.objects.filter(part=self.part).count(), len(granted))
+
+
+class AdminRegistrationTests(unittest.TestCase):
+    """Every admin page the backend ships stays registered"""
+
+    def test_models_are_registered(self):
+        for model in (Customer, Vehicle, Technician, Service, Invoice, Payment, BillingSetting, Bay,
+                      TechnicianShift, Appointment, Part, MaintenanceReminder, RequestProfile):
+            self.assertTrue(admin.site.is_registered(model), model.__name__)
+
+    def test_stock_counters_are_read_only(self):
+        # A full-row admin save must not write back stale on_hand/reserved values
+        readonly = admin.site._registry[Part].get_readonly_fields(None)
+        self.assertIn('on_hand', readonly)
+        self.assertIn('reserved', readonly)
+
+
+class GarageDataMixin:
+    """Logged-in staff client plus one customer with a vehicle"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_superuser('staff@example.com', 'Passw0rd!', name='Staff')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.customer = Customer.objects.create(name='John', email='john@example.com', phone='0771234567')
+        self.vehicle = self.add_vehicle(self.customer, 'ABC-1234')
+
+    def add_vehicle(self, customer, number):
+        return Vehicle.objects.create(customer=customer, brand='Toyota', model='Axio', year='2015', number=number)
+
+    def completed_service(self, vehicle, cost='100.00', date=None):
+        # Completing a job generates its invoice (and the customer's totals)
+        service = Service.objects.create(vehicle=vehicle, type='Oil Change', cost=Decimal(cost),
+                                         date=date or timezone.now())
+        service_service.update_service_status(service.id, 'Completed')
+        return Service.objects.get(id=service.id)
+
+
+class IdempotencyTests(GarageDataMixin, TestCase):
+    URL = '/api/services/'
+
+    def body(self, **overrides):
+        return {'vehicleId': self.vehicle.id, 'type': 'Oil Change', 'cost': '100.00',
+                'date': '2026-01-01T10:00:00Z', **overrides}
+
+    def post(self, key, body=None):
+        return self.client.post(self.URL, body or self.body(), format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_the_first_response(self):
+        first = self.post('key-1')
+        retry = self.post('key-1')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json()['data']['id'], first.json()['data']['id'])
+        self.assertEqual(Service.objects.count(), 1)
+
+    def test_reused_key_with_another_body_is_rejected(self):
+        self.post('key-1')
+        response = self.post('key-1', self.body(cost='150.00'))
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Service.objects.count(), 1)
+
+    def test_other_keys_and_no_key_create_new_records(self):
+        self.post('key-1')
+        self.post('key-2')
+        self.client.post(self.URL, self.body(), format='json')
+        self.assertEqual(Service.objects.count(), 3)
+
+    def claim_in_progress(self, key):
+        # What a concurrent first request with the same key has written so far
+        return IdempotencyKey.objects.create(
+            key=key, user=self.user, method='POST', path=self.URL,
+            request_hash=idempotency._request_hash(SimpleNamespace(data=self.body())),
+        )
+
+    def test_duplicate_waits_for_the_first_request(self):
+        record = self.claim_in_progress('key-1')
+
+        def first_request_finishes(seconds):
+            IdempotencyKey.objects.filter(pk=record.pk).update(
+                status='completed', response_code=201, response_body={'status': 'success', 'data': {'id': 42}}
+            )
+
+        with mock.patch.object(idempotency.time, 'sleep', side_effect=first_request_finishes):
+            response = self.post('key-1')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(response.json()['data']['id'], 42)
+        self.assertEqual(Service.objects.count(), 0)
+
+    def test_duplicate_gives_up_while_the_first_is_still_running(self):
+        self.claim_in_progress('key-1')
+        with mock.patch.object(idempotency, 'WAIT_TIMEOUT_SECONDS', 0):
+            response = self.post('key-1')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Service.objects.count(), 0)
+
+    def test_duplicate_runs_when_the_first_request_released_the_key(self):
+        record = self.claim_in_progress('key-1')
+        with mock.patch.object(idempotency.time, 'sleep', side_effect=lambda seconds: record.delete()):
+            response = self.post('key-1')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Service.objects.count(), 1)
+
+
+class ConditionalUpdateTests(GarageDataMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.service = Service.objects.create(vehicle=self.vehicle, type='Oil Change', cost=Decimal('100.00'),
+                                              date=timezone.now())
+        self.url = f'/api/services/{self.service.id}/'
+
+    def put(self, if_match, description='Changed'):
+        return self.client.put(self.url, {'description': description}, format='json', HTTP_IF_MATCH=if_match)
+
+    def test_get_exposes_the_version_as_etag(self):
+        self.assertEqual(self.client.get(self.url)['ETag'], f'"{self.service.version}"')
+
+    def test_matching_version_saves_and_bumps_it(self):
+        response = self.put(f'"{self.service.version}"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], f'"{self.service.version + 1}"')
+        self.assertEqual(Service.objects.get(id=self.service.id).description, 'Changed')
+
+    def test_stale_version_is_refused_with_412(self):
+        self.put(f'"{self.service.version}"')
+        response = self.put(f'W/"{self.service.version}"', description='Lost update')
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response.json()['errors'], {'version': self.service.version + 1})
+        self.assertEqual(response['ETag'], f'"{self.service.version + 1}"')
+        self.assertEqual(Service.objects.get(id=self.service.id).description, 'Changed')
+
+    def test_stale_body_version_is_refused_with_412(self):
+        self.put(f'"{self.service.version}"')
+        response = self.client.put(self.url, {'description': 'Lost', 'version': self.service.version}, format='json')
+        self.assertEqual(response.status_code, 412)
+
+    def test_malformed_if_match_is_a_400_not_an_unconditional_save(self):
+        response = self.put('"abc"', description='Unconditional')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Service.objects.get(id=self.service.id).version, self.service.version)
+
+    def test_stale_invoice_update_is_refused(self):
+        invoice = Invoice.objects.get(service=self.completed_service(self.vehicle))
+        url = f'/api/invoices/{invoice.id}/'
+        ok = self.client.put(url, {'notes': 'First'}, format='json', HTTP_IF_MATCH=f'"{invoice.version}"')
+        stale = self.client.put(url, {'notes': 'Second'}, format='json', HTTP_IF_MATCH=f'"{invoice.version}"')
+        self.assertEqual((ok.status_code, stale.status_code), (200, 412))
+        self.assertEqual(Invoice.objects.get(id=invoice.id).notes, 'First')
+
+
+class OutboxTests(TransactionTestCase):
+    """Runs in real autocommit: the model save itself has to be atomic"""
+
+    def test_save_rolls_back_when_the_outbox_write_fails(self):
+        with mock.patch.object(events, 'record_change', side_effect=RuntimeError('outbox down')):
+            with self.assertRaises(RuntimeError):
+                Customer.objects.create(name='John', email='john@example.com', phone='0771234567')
+        self.assertFalse(Customer.objects.exists())
+        self.assertFalse(ChangeEvent.objects.exists())
+
+    def test_save_writes_its_outbox_row(self):
+        customer = Customer.objects.create(name='John', email='john@example.com', phone='0771234567')
+        self.assertEqual(
+            list(ChangeEvent.objects.values_list('model', 'object_id', 'action')),
+            [('customer', customer.id, 'created')],
+        )
+
+
+class SettledEventsTests(unittest.TestCase):
+    """Id gaps in the outbox: an uncommitted id below must hold the stream back"""
+
+    def event(self, event_id, age_seconds):
+        return SimpleNamespace(id=event_id, created_at=timezone.now() - timedelta(seconds=age_seconds))
+
+    @override_settings(CHANGE_FEED_COMMIT_WINDOW_SECONDS=5)
+    def test_contiguous_ids_are_all_consumed(self):
+        rows = [self.event(11, 1), self.event(12, 1)]
+        self.assertEqual(events.settled_events(rows, 10), (rows, False))
+
+    @override_settings(CHANGE_FEED_COMMIT_WINDOW_SECONDS=5)
+    def test_recent_gap_waits_for_the_missing_id(self):
+        rows = [self.event(11, 1), self.event(13, 1), self.event(14, 1)]
+        self.assertEqual(events.settled_events(rows, 10), (rows[:1], True))
+
+    @override_settings(CHANGE_FEED_COMMIT_WINDOW_SECONDS=5)
+    def test_gap_older_than_the_window_is_skipped(self):
+        # The missing id's transaction rolled back
+        rows = [self.event(12, 60), self.event(13, 1)]
+        self.assertEqual(events.settled_events(rows, 10), (rows, False))
+
+    @override_settings(CHANGE_FEED_COMMIT_WINDOW_SECONDS=5)
+    def test_gap_right_after_the_cursor_waits_too(self):
+        self.assertEqual(events.settled_events([self.event(12, 1)], 10), ([], True))
+
+
+class ArchiveTests(GarageDataMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        old = timezone.now() - timedelta(days=1000)
+        self.service = self.completed_service(self.vehicle, date=old)
+        self.invoice = Invoice.objects.get(service=self.service)
+        Payment.objects.create(invoice=self.invoice, amount=self.invoice.total, method='cash', date=old)
+        sync_invoice_payments(self.invoice)
+        bay = Bay.objects.create(name='Bay 1')
+        part = Part.objects.create(sku='OIL-1', name='Oil filter', on_hand=5)
+        self.appointment = Appointment.objects.create(service=self.service, bay=bay, start=old,
+                                                      end=old + timedelta(hours=1))
+        self.service_part = ServicePart.objects.create(service=self.service, part=part, quantity=1,
+                                                       status='consumed')
+        # Still owes money: must stay in the hot tables
+        self.unpaid = self.completed_service(self.vehicle, date=old)
+
+    def totals(self):
+        return Customer.objects.values_list('lifetime_spend', 'outstanding_balance').get(id=self.customer.id)
+
+    def test_settled_job_moves_with_its_invoice_and_payments(self):
+        line_items = set(InvoiceLineItem.objects.filter(invoice=self.invoice).values_list('id', flat=True))
+        self.assertTrue(line_items)
+
+        moved = archive_service.archive_older_than()
+
+        self.assertEqual((moved['services'], moved['invoices'], moved['payments']), (1, 1, 1))
+        self.assertEqual(list(Service.objects.values_list('id', flat=True)), [self.unpaid.id])
+        self.assertEqual(ArchivedService.objects.get().id, self.service.id)
+        archived = ArchivedInvoice.objects.get()
+        self.assertEqual((archived.id, archived.total, archived.paid_amount, archived.balance_due),
+                         (self.invoice.id, self.invoice.total, self.invoice.total, 0))
+        self.assertEqual(ArchivedPayment.objects.get().invoice_id, self.invoice.id)
+        # Line items are re-pointed, not copied or deleted
+        self.assertEqual(
+            set(InvoiceLineItem.objects.filter(archived_invoice_id=self.invoice.id, invoice=None)
+                .values_list('id', flat=True)),
+            line_items,
+        )
+
+    def test_dependents_are_re_pointed_to_the_archived_service(self):
+        archive_service.archive_older_than()
+        self.appointment.refresh_from_db()
+        self.service_part.refresh_from_db()
+        self.assertEqual((self.appointment.service_id, self.appointment.archived_service_id),
+                         (None, self.service.id))
+        self.assertEqual((self.service_part.service_id, self.service_part.archived_service_id),
+                         (None, self.service.id))
+
+    def test_customer_totals_are_unchanged(self):
+        before = self.totals()
+        archive_service.archive_older_than()
+        self.assertEqual(self.totals(), before)
+        # And a full rebuild (live + archived invoices) agrees
+        customer_service.recalculate_customer_totals(self.customer.id)
+        self.assertEqual(self.totals(), before)
+
+    def test_recent_payment_keeps_the_job_hot(self):
+        Payment.objects.filter(invoice=self.invoice).update(date=timezone.now())
+        self.assertEqual(archive_service.archive_older_than()['services'], 0)
+
+
+class MergeCustomersTests(GarageDataMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.duplicate = Customer.objects.create(name='john', email='john+car@example.com',
+                                                 phone='+94 77 123 4567', nic='853400937V')
+        self.duplicate_vehicle = self.add_vehicle(self.duplicate, 'QQ-1')
+        self.completed_service(self.vehicle, cost='100.00')
+        self.completed_service(self.duplicate_vehicle, cost='40.00')
+        self.duplicate_invoice = Invoice.objects.get(customer=self.duplicate)
+
+    def test_everything_is_re_pointed_and_totals_added(self):
+        keep = Customer.objects.get(id=self.customer.id)
+        duplicate = Customer.objects.get(id=self.duplicate.id)
+
+        merged = customer_service.merge_customers(keep.id, duplicate.id)
+
+        self.assertFalse(Customer.objects.filter(id=duplicate.id).exists())
+        self.assertEqual(Vehicle.objects.get(id=self.duplicate_vehicle.id).customer_id, keep.id)
+        invoice = Invoice.objects.get(id=self.duplicate_invoice.id)
+        self.assertEqual(invoice.customer_id, keep.id)
+        self.assertEqual(invoice.version, self.duplicate_invoice.version + 1)
+        self.assertEqual(merged.outstanding_balance, keep.outstanding_balance + duplicate.outstanding_balance)
+        self.assertEqual(merged.lifetime_spend, keep.lifetime_spend + duplicate.lifetime_spend)
+        # Gaps in the kept profile are filled from the merged one
+        self.assertEqual(merged.nic, '853400937V')
+
+    def test_merged_totals_match_a_rebuild_from_invoices(self):
+        merged = customer_service.merge_customers(self.customer.id, self.duplicate.id)
+        customer_service.recalculate_customer_totals(merged.id)
+        rebuilt = Customer.objects.get(id=merged.id)
+        self.assertEqual((rebuilt.lifetime_spend, rebuilt.outstanding_balance),
+                         (merged.lifetime_spend, merged.outstanding_balance))
+
+    def test_merge_endpoint(self):
+        response = self.client.post('/api/customers/merge/',
+                                    {'keepId': self.customer.id, 'mergeId': self.duplicate.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Invoice.objects.filter(customer=self.customer).count(), 2)
+
+    def test_self_merge_and_unknown_customers(self):
+        with self.assertRaises(ValueError):
+            customer_service.merge_customers(self.customer.id, self.customer.id)
+        self.assertIsNone(customer_service.merge_customers(self.customer.id, 999999))
+        self.assertTrue(Customer.objects.filter(id=self.customer.id).exists())
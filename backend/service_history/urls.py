@@ -4,10 +4,15 @@ from . import views
 urlpatterns = [
     # Customer endpoints
     path('customers/', views.customer_list),
+    path('customers/duplicates/', views.customer_duplicates),  # Before <pk> routes
+    path('customers/duplicates/<int:pk>/', views.customer_duplicate_dismiss),
+    path('customers/merge/', views.customer_merge),
     path('customers/<str:pk>/', views.customer_detail),
+    path('customers/<str:pk>/overview/', views.customer_overview),
     
     # Vehicle endpoints
     path('vehicles/', views.vehicle_list),
+    path('vehicles/lookup/', views.vehicle_lookup),  # Before <pk> so 'lookup' is not read as an ID
     path('vehicles/<str:pk>/', views.vehicle_detail),
 
     
@@ -17,16 +22,44 @@ urlpatterns = [
     
     # Service endpoints
     path('services/', views.service_record_list),
+    path('services/status/', views.bulk_update_service_record_status),  # Before <pk> so 'status' is not read as an ID
     path('services/<str:pk>/', views.service_record_detail),
     path('services/<str:pk>/status/', views.update_service_record_status),
+    path('services/<str:pk>/parts/', views.service_part_list),
+    path('services/<str:pk>/parts/<str:part_pk>/', views.service_part_detail),
     
+    # Parts inventory endpoints
+    path('parts/', views.part_list),
+    path('parts/<str:pk>/', views.part_detail),
+    path('parts/<str:pk>/receive/', views.part_receive),
+
+    # Maintenance reminders
+    path('reminders/', views.maintenance_reminder_list),
+    path('reminders/<int:pk>/', views.maintenance_reminder_detail),
+
+    # Scheduling endpoints
+    path('bays/', views.bay_list),
+    path('shifts/', views.shift_list),
+    path('appointments/', views.appointment_list),
+    path('appointments/<str:pk>/', views.appointment_detail),
+    path('schedule/availability/', views.schedule_availability),
+
     # Invoice & Payment endpoints
     path('invoices/', views.invoice_list),
     path('invoices/<str:pk>/', views.invoice_detail),
+    path('invoices/<str:pk>/pdf/', views.invoice_pdf),
     path('payments/', views.payment_list),
     path('payments/<str:pk>/', views.payment_detail),
 
+
+    # Reports
+    path('reports/line-items/', views.line_item_revenue_report),
+    path('reports/cash-flow/', views.cash_flow_forecast_report),
+    path('reports/cycle-times/', views.cycle_time_report),
     
+    # Live change feed (Server-Sent Events)
+    path('events/', views.change_feed),
+
     # Billing Settings
     path('billing-settings/current/', views.get_billing_settings),
 ]
@@ -23,23 +23,86 @@ Request Flow:
 ==============================================================
 """
 
+import asyncio
+from decimal import Decimal, InvalidOperation
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from utils.http_responses import success_response, error_response
 from utils.permissions import IsAdmin
-from .models import Customer, Vehicle, Technician, Service, Invoice, Payment, BillingSetting
+from utils import metrics
+from utils.conditional import (
+    get_expected_version, with_etag, precondition_failed_response,
+    InvalidPrecondition, invalid_precondition_response,
+)
+from .models import (
+    Customer, Vehicle, Technician, Service, Invoice, Payment, BillingSetting, VersionConflict,
+    ArchivedService, ArchivedInvoice, ArchivedPayment, CustomerDuplicate, normalize_plate,
+    Bay, TechnicianShift, Appointment, Part, ServicePart, MaintenanceReminder,
+)
 from .serializers import (
     CustomerSerializer, VehicleSerializer, TechnicianSerializer,
     ServiceSerializer, InvoiceSerializer, PaymentSerializer,
-    BillingSettingSerializer
+    BillingSettingSerializer, ArchivedServiceSerializer,
+    ArchivedInvoiceSerializer, ArchivedPaymentSerializer, with_workload,
+    BaySerializer, TechnicianShiftSerializer, AppointmentSerializer,
+    PartSerializer, ServicePartSerializer, MaintenanceReminderSerializer,
 )
-from .services import customer_service, vehicle_service, service_service
+from .services import customer_service, vehicle_service, service_service, payment_service, pdf_service, report_service, archive_service, forecast_service, status_history_service, schedule_service, inventory_service
+from .idempotency import idempotent
+from .response_cache import cached_response
+from . import events
+
+# Upper bound on IDs accepted by the bulk status endpoint
+BULK_STATUS_MAX_IDS = 500
+
+
+def _date_range(request):
+    """
+    Parse optional ?from=YYYY-MM-DD&to=YYYY-MM-DD (inclusive days)
+    Returns (date_from, date_to, error) - error is a message or None
+    """
+    raw_from = request.query_params.get('from')
+    raw_to = request.query_params.get('to')
+    try:
+        date_from = parse_date(raw_from) if raw_from else None
+        date_to = parse_date(raw_to) if raw_to else None
+    except ValueError:
+        date_from = date_to = None
+    if (raw_from and not date_from) or (raw_to and not date_to):
+        return None, None, "from/to must be dates (YYYY-MM-DD)"
+    return date_from, date_to, None
+
+
+def _expansion(request, serializer_class):
+    """
+    Parse optional ?fields=a,b (sparse fieldset) and ?include=x,y (embedded
+    related objects) for serializer_class
+    Returns (serializer kwargs, error) - error is a message or None
+    """
+    fields = [name for name in request.query_params.get('fields', '').split(',') if name]
+    include = [name for name in request.query_params.get('include', '').split(',') if name]
+    unknown = [name for name in include if name not in serializer_class.INCLUDES]
+    if unknown:
+        allowed = ', '.join(serializer_class.INCLUDES) or 'nothing'
+        return None, f"Cannot include {', '.join(unknown)} (allowed: {allowed})"
+    known = set(serializer_class().fields)
+    for name in include:
+        known.update(f"{name}.{field}" for field in serializer_class.INCLUDES[name][0]().fields)
+    unknown = [name for name in fields if name not in known and name not in include]
+    if unknown:
+        return None, f"Unknown fields: {', '.join(unknown)}"
+    return {'fields': fields, 'include': include}, None
 
 # ========== CUSTOMER API ENDPOINTS ==========
 # Customer is the person who brings vehicle for repair
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])  # Must be logged in with valid JWT token
+@cached_response(Customer)  # GET served from the response cache until a customer changes
 def customer_list(request):
     """
     GET:  List all customers from database
@@ -47,13 +110,19 @@ def customer_list(request):
     
     Frontend usage:
     GET  /api/customers/ -> Returns list of all customers
+    GET  /api/customers/?ordering=-balance -> Highest outstanding balance first
     POST /api/customers/ -> Creates new customer with data from form
     """
     if request.method == 'GET':
         # Fetch all customers using service layer
-        customers = customer_service.get_all_customers()
+        # Optional ?ordering=-balance sorts by the indexed outstanding_balance
+        customers = customer_service.get_all_customers(request.query_params.get('ordering'))
+        # Optional ?fields= trims the payload
+        expansion, error = _expansion(request, CustomerSerializer)
+        if error:
+            return error_response(error)
         # Convert Python objects to JSON using Serializer
-        serializer = CustomerSerializer(customers, many=True)
+        serializer = CustomerSerializer(customers, many=True, **expansion)
         # Return JSON response
         return success_response(serializer.data)
     
@@ -74,6 +143,7 @@ def customer_list(request):
 
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
+@cached_response(Customer)
 def customer_detail(request, pk):
     """
     GET:    Retrieve single customer by ID
@@ -92,7 +162,10 @@ def customer_detail(request, pk):
     
     if request.method == 'GET':
         # Return single customer as JSON
-        serializer = CustomerSerializer(customer)
+        expansion, error = _expansion(request, CustomerSerializer)
+        if error:
+            return error_response(error)
+        serializer = CustomerSerializer(customer, **expansion)
         return success_response(serializer.data)
     
     elif request.method == 'PUT':
@@ -112,11 +185,89 @@ def customer_detail(request, pk):
         customer_service.delete_customer(pk)
         return success_response(None, "Customer deleted")
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def customer_overview(request, pk):
+    """
+    GET /api/customers/{id}/overview/
+    Customer 360 view: profile, vehicles, open jobs, invoices and balances
+    in one response (a fixed number of queries regardless of history size)
+    """
+    customer = customer_service.get_customer_overview(pk)
+    if not customer:
+        return error_response("Customer not found", status_code=404)
+
+    return success_response({
+        'customer': CustomerSerializer(customer).data,
+        'vehicles': VehicleSerializer(customer.vehicles.all(), many=True).data,
+        'openServices': ServiceSerializer(customer.open_services, many=True).data,
+        'invoices': InvoiceSerializer(customer.invoices.all(), many=True).data,
+        'lifetimeSpend': customer.lifetime_spend,
+        'outstandingBalance': customer.outstanding_balance,
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def customer_duplicates(request):
+    """
+    GET /api/customers/duplicates/
+    Likely duplicate customer pairs found by the dedupe job
+    (python manage.py find_duplicate_customers), best matches first
+    """
+    suggestions = CustomerDuplicate.objects.filter(status='pending').select_related('customer', 'duplicate')[:200]
+    return success_response([
+        {
+            'id': suggestion.id,
+            'score': suggestion.score,
+            'reasons': suggestion.reasons,
+            'customer': CustomerSerializer(suggestion.customer).data,
+            'duplicate': CustomerSerializer(suggestion.duplicate).data,
+        }
+        for suggestion in suggestions
+    ])
+
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def customer_duplicate_dismiss(request, pk):
+    """
+    DELETE /api/customers/duplicates/{id}/
+    Not the same person - hide this pair from future dedupe runs
+    """
+    updated = CustomerDuplicate.objects.filter(id=pk, status='pending').update(status='dismissed')
+    if not updated:
+        return error_response("Suggestion not found", status_code=404)
+    return success_response(None, "Suggestion dismissed")
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def customer_merge(request):
+    """
+    POST /api/customers/merge/
+    Body: {"keepId": 12, "mergeId": 57}
+    Moves customer 57's vehicles, invoices and balances to customer 12
+    and deletes customer 57
+    """
+    try:
+        keep_id = int(request.data.get('keepId'))
+        merge_id = int(request.data.get('mergeId'))
+    except (TypeError, ValueError):
+        return error_response("keepId and mergeId must be customer IDs")
+    if keep_id == merge_id:
+        return error_response("Cannot merge a customer into itself")
+
+    customer = customer_service.merge_customers(keep_id, merge_id)
+    if not customer:
+        return error_response("Customer not found", status_code=404)
+    return success_response(CustomerSerializer(customer).data, "Customers merged")
+
 # ========== VEHICLE API ENDPOINTS ==========
 # Vehicle is the car/bike being serviced
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@cached_response(Vehicle, Customer)  # ?include=customer embeds the owner
 def vehicle_list(request):
     """
     GET:  List vehicles (optionally filter by customer_id)
@@ -136,7 +287,12 @@ def vehicle_list(request):
         else:
             # Get all vehicles
             vehicles = vehicle_service.get_all_vehicles()
-        serializer = VehicleSerializer(vehicles, many=True)
+        # ?include=customer embeds the owner (one JOIN, no extra request)
+        expansion, error = _expansion(request, VehicleSerializer)
+        if error:
+            return error_response(error)
+        vehicles = VehicleSerializer.load_includes(vehicles, expansion['include'])
+        serializer = VehicleSerializer(vehicles, many=True, **expansion)
         return success_response(serializer.data)
     
     elif request.method == 'POST':
@@ -148,8 +304,27 @@ def vehicle_list(request):
         return error_response(serializer.errors)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def vehicle_lookup(request):
+    """
+    GET /api/vehicles/lookup/?plate=abc12&limit=10
+    Front-desk typeahead: vehicles whose plate starts with the typed text,
+    ignoring case, spaces and dashes ("abc1234" finds "ABC-1234")
+    """
+    plate = request.query_params.get('plate', '')
+    if not normalize_plate(plate):
+        return error_response("plate is required")
+    try:
+        limit = min(max(int(request.query_params.get('limit', vehicle_service.PLATE_LOOKUP_LIMIT)), 1), 50)
+    except ValueError:
+        return error_response("limit must be a number")
+    return success_response(vehicle_service.lookup_plates(plate, limit))
+
+
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
+@cached_response(Vehicle, Customer)
 def vehicle_detail(request, pk):
     """
     GET:    Get single vehicle
@@ -161,7 +336,10 @@ def vehicle_detail(request, pk):
         return error_response("Vehicle not found", status_code=404)
     
     if request.method == 'GET':
-        serializer = VehicleSerializer(vehicle)
+        expansion, error = _expansion(request, VehicleSerializer)
+        if error:
+            return error_response(error)
+        serializer = VehicleSerializer(vehicle, **expansion)
         return success_response(serializer.data)
     
     elif request.method == 'PUT':
@@ -182,16 +360,36 @@ def vehicle_detail(request, pk):
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@idempotent  # POST honours the Idempotency-Key header (safe retries)
 def service_record_list(request):
     """
     GET:  List all services
+          ?from=YYYY-MM-DD&to=YYYY-MM-DD limits by service date and, when the
+          range reaches back far enough, includes archived services
+          ?fields=id,status,date keeps only those fields
+          ?include=vehicle,customer,technician embeds the related objects
+          (loaded with JOINs / one prefetch, not a query per service);
+          ?fields=...,vehicle.number trims an embedded object
     POST: Create new service (may trigger auto-invoice if advance payment)
     """
     if request.method == 'GET':
+        date_from, date_to, error = _date_range(request)
+        if error:
+            return error_response(error)
+        expansion, error = _expansion(request, ServiceSerializer)
+        if error:
+            return error_response(error)
         # Get all services from database
-        services = service_service.get_all_services()
-        serializer = ServiceSerializer(services, many=True)
-        return success_response(serializer.data)
+        services = archive_service.filter_date_range(
+            service_service.get_all_services(), 'date', date_from, date_to
+        )
+        services = ServiceSerializer.load_includes(services, expansion['include'])
+        data = ServiceSerializer(services, many=True, **expansion).data
+        if archive_service.archive_reaches(ArchivedService, date_from, date_to):
+            archived = archive_service.archived_in_range(ArchivedService, date_from, date_to)
+            archived = ArchivedServiceSerializer.load_includes(archived, expansion['include'])
+            data = ArchivedServiceSerializer(archived, many=True, **expansion).data + data
+        return success_response(data)
     
     elif request.method == 'POST':
         # Create new service record
@@ -216,14 +414,30 @@ def service_record_detail(request, pk):
         return error_response("Service record not found", status_code=404)
     
     if request.method == 'GET':
-        serializer = ServiceSerializer(service_record)
-        return success_response(serializer.data)
+        expansion, error = _expansion(request, ServiceSerializer)
+        if error:
+            return error_response(error)
+        serializer = ServiceSerializer(service_record, **expansion)
+        return with_etag(success_response(serializer.data), service_record.version)
     
     elif request.method == 'PUT':
+        try:
+            expected_version = get_expected_version(request)
+        except InvalidPrecondition as e:
+            return invalid_precondition_response(e)
         serializer = ServiceSerializer(service_record, data=request.data, partial=True)
         if serializer.is_valid():
-            updated_service = service_service.update_service_record(pk, serializer.validated_data)
-            return success_response(ServiceSerializer(updated_service).data, "Service record updated")
+            # If-Match (or body 'version') makes the save conditional: 412 if stale
+            try:
+                updated_service = service_service.update_service_record(
+                    pk, serializer.validated_data, expected_version=expected_version
+                )
+            except VersionConflict as conflict:
+                return precondition_failed_response(service_service.get_service_version(conflict.instance.pk))
+            return with_etag(
+                success_response(ServiceSerializer(updated_service).data, "Service record updated"),
+                updated_service.version
+            )
         return error_response(serializer.errors)
     
     elif request.method == 'DELETE':
@@ -242,13 +456,54 @@ def update_service_record_status(request, pk):
     new_status = request.data.get('status')
     if not new_status:
         return error_response("Status is required")
+    try:
+        expected_version = get_expected_version(request)
+    except InvalidPrecondition as e:
+        return invalid_precondition_response(e)
     
     # Update status via service layer
-    service_record = service_service.update_service_status(pk, new_status)
+    try:
+        service_record = service_service.update_service_status(
+            pk, new_status, expected_version=expected_version
+        )
+    except VersionConflict as conflict:
+        return precondition_failed_response(service_service.get_service_version(conflict.instance.pk))
     if service_record:
-        return success_response(ServiceSerializer(service_record).data, "Status updated")
+        return with_etag(
+            success_response(ServiceSerializer(service_record).data, "Status updated"),
+            service_record.version
+        )
     return error_response("Service record not found", status_code=404)
 
+@api_view(['PATCH'])
+@permission_classes([IsAuthenticated])
+def bulk_update_service_record_status(request):
+    """
+    PATCH /api/services/status/
+    Update the status of many services at once, e.g. end-of-day completion
+    Body: {"ids": [1, 2, 3], "status": "Completed"}
+    Invoices for newly completed services are generated in one batch
+    Returns a result per ID (updated + invoice number, or an error)
+    """
+    ids = request.data.get('ids')
+    new_status = request.data.get('status')
+    if not new_status:
+        return error_response("Status is required")
+    if new_status not in dict(Service.STATUS_CHOICES):
+        return error_response(f"Invalid status '{new_status}'")
+    if not isinstance(ids, list) or not ids:
+        return error_response("ids must be a non-empty list")
+    if len(ids) > BULK_STATUS_MAX_IDS:
+        return error_response(f"At most {BULK_STATUS_MAX_IDS} services can be updated at once")
+    try:
+        ids = [int(service_id) for service_id in ids]
+    except (TypeError, ValueError):
+        return error_response("ids must be service IDs")
+
+    results = service_service.bulk_update_service_status(ids, new_status)
+    updated = sum(1 for result in results if result['status'] == 'updated')
+    return success_response(results, f"{updated} of {len(results)} services updated")
+
 # ========== BILLING SETTINGS ==========
 # Global settings for taxes, invoice prefix, company info
 
@@ -270,6 +525,7 @@ def get_billing_settings(request):
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@cached_response(Technician, Service)  # workload counts the technician's open services
 def technician_list(request):
     """
     GET:  List all technicians
@@ -277,8 +533,12 @@ def technician_list(request):
     """
     if request.method == 'GET':
         # Get all technicians from database
-        technicians = Technician.objects.all()
-        serializer = TechnicianSerializer(technicians, many=True)
+        # Workload is counted in the same query for every technician
+        technicians = with_workload(Technician.objects.all())
+        expansion, error = _expansion(request, TechnicianSerializer)
+        if error:
+            return error_response(error)
+        serializer = TechnicianSerializer(technicians, many=True, **expansion)
         return success_response(serializer.data)
     elif request.method == 'POST':
         # Create new technician
@@ -291,6 +551,7 @@ def technician_list(request):
 
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
+@cached_response(Technician, Service)
 def technician_detail(request, pk):
     """
     GET:    Get technician details
@@ -303,7 +564,10 @@ def technician_detail(request, pk):
         return error_response("Technician not found", status_code=404)
     
     if request.method == 'GET':
-        serializer = TechnicianSerializer(technician)
+        expansion, error = _expansion(request, TechnicianSerializer)
+        if error:
+            return error_response(error)
+        serializer = TechnicianSerializer(technician, **expansion)
         return success_response(serializer.data)
     
     elif request.method == 'PUT':
@@ -318,21 +582,318 @@ def technician_detail(request, pk):
         return success_response(None, "Technician deleted")
 
 
+# ========== SCHEDULE API ENDPOINTS ==========
+# Bays, technician shifts and appointments (services booked into a bay)
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def bay_list(request):
+    """
+    GET:  List all bays
+    POST: Add a bay
+    """
+    if request.method == 'GET':
+        return success_response(BaySerializer(Bay.objects.all(), many=True).data)
+    serializer = BaySerializer(data=request.data)
+    if serializer.is_valid():
+        bay = serializer.save()
+        return success_response(BaySerializer(bay).data, "Bay created", status_code=201)
+    return error_response(serializer.errors)
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def shift_list(request):
+    """
+    GET:  List technician shifts (?technicianId= for one technician)
+    POST: Add a weekly shift {technicianId, weekday (0 = Monday), startTime, endTime}
+    """
+    if request.method == 'GET':
+        shifts = TechnicianShift.objects.order_by('technician_id', 'weekday', 'start_time')
+        if request.query_params.get('technicianId'):
+            shifts = shifts.filter(technician_id=request.query_params['technicianId'])
+        return success_response(TechnicianShiftSerializer(shifts, many=True).data)
+    serializer = TechnicianShiftSerializer(data=request.data)
+    if serializer.is_valid():
+        shift = serializer.save()
+        return success_response(TechnicianShiftSerializer(shift).data, "Shift created", status_code=201)
+    return error_response(serializer.errors)
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def appointment_list(request):
+    """
+    GET:  Booked appointments, ?from=YYYY-MM-DD&to=YYYY-MM-DD (by start),
+          ?bayId= / ?technicianId= to narrow down
+    POST: Book a service {serviceId, bayId, start, technicianId?}
+          The booking lasts the service's estimated hours; 409 with the
+          clashing appointment IDs if the bay or technician is taken
+    """
+    if request.method == 'GET':
+        date_from, date_to, error = _date_range(request)
+        if error:
+            return error_response(error, status_code=400)
+        appointments = archive_service.filter_date_range(
+            Appointment.objects.filter(status='booked'), 'start', date_from, date_to
+        ).order_by('start')
+        if request.query_params.get('bayId'):
+            appointments = appointments.filter(bay_id=request.query_params['bayId'])
+        if request.query_params.get('technicianId'):
+            appointments = appointments.filter(technician_id=request.query_params['technicianId'])
+        return success_response(AppointmentSerializer(appointments, many=True).data)
+
+    serializer = AppointmentSerializer(data=request.data)
+    if not serializer.is_valid():
+        return error_response(serializer.errors)
+    data = serializer.validated_data
+    try:
+        appointment = schedule_service.book_appointment(
+            data['service'], data['bay'], data['start'], technician=data.get('technician')
+        )
+    except schedule_service.ScheduleConflict as conflict:
+        return error_response({'conflicts': conflict.appointment_ids}, str(conflict), status_code=409)
+    return success_response(AppointmentSerializer(appointment).data, "Appointment booked", status_code=201)
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def appointment_detail(request, pk):
+    """
+    GET:    Get one appointment
+    DELETE: Cancel it (the row is kept with status 'canceled')
+    """
+    try:
+        appointment = Appointment.objects.get(id=pk)
+    except (Appointment.DoesNotExist, ValueError):
+        return error_response("Appointment not found", status_code=404)
+    if request.method == 'DELETE':
+        schedule_service.cancel_appointment(appointment)
+        return success_response(AppointmentSerializer(appointment).data, "Appointment canceled")
+    return success_response(AppointmentSerializer(appointment).data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def schedule_availability(request):
+    """
+    GET /api/schedule/availability/?week=YYYY-MM-DD&hours=1.5
+        (or ?serviceId= to use that service's estimate)
+        &bayId=&technicianId=
+    Open start times for the 7 days from `week` (default today), served
+    from the in-memory interval index
+    """
+    raw_week = request.query_params.get('week')
+    try:
+        week_start = parse_date(raw_week) if raw_week else timezone.localdate()
+    except ValueError:
+        week_start = None
+    if week_start is None:
+        return error_response("week must be a date (YYYY-MM-DD)")
+
+    if request.query_params.get('serviceId'):
+        try:
+            service = service_service.get_service_by_id(request.query_params['serviceId'])
+        except ValueError:
+            service = None
+        if service is None:
+            return error_response("Service record not found", status_code=404)
+        hours = schedule_service.job_hours(service)
+    else:
+        try:
+            hours = Decimal(request.query_params.get('hours', '1'))
+        except InvalidOperation:
+            hours = None
+        if hours is None or not 0 < hours <= 24:
+            return error_response("hours must be a number between 0 and 24")
+
+    try:
+        bay_id = int(request.query_params.get('bayId') or 0) or None
+        technician_id = int(request.query_params.get('technicianId') or 0) or None
+    except ValueError:
+        return error_response("bayId and technicianId must be numbers")
+
+    days = schedule_service.weekly_availability(week_start, hours, bay_id=bay_id, technician_id=technician_id)
+    return success_response({'week': week_start.isoformat(), 'hours': float(hours), 'days': days})
+
+
+# ========== PARTS INVENTORY API ENDPOINTS ==========
+# Parts catalogue, stock, and parts reserved/used by services
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def part_list(request):
+    """
+    GET:  List parts (?lowStock=1: only parts at or below their reorder level)
+    POST: Add a part to the catalogue
+    """
+    if request.method == 'GET':
+        if request.query_params.get('lowStock') == '1':
+            parts = inventory_service.low_stock_parts()
+        else:
+            parts = Part.objects.all()
+        return success_response(PartSerializer(parts, many=True).data)
+    serializer = PartSerializer(data=request.data)
+    if serializer.is_valid():
+        part = serializer.save()
+        return success_response(PartSerializer(part).data, "Part created", status_code=201)
+    return error_response(serializer.errors)
+
+
+@api_view(['GET', 'PUT'])
+@permission_classes([IsAuthenticated])
+def part_detail(request, pk):
+    """
+    GET: Get one part
+    PUT: Update catalogue details (name, price, reorder level - not stock)
+    """
+    try:
+        part = Part.objects.get(id=pk)
+    except (Part.DoesNotExist, ValueError):
+        return error_response("Part not found", status_code=404)
+    if request.method == 'GET':
+        return success_response(PartSerializer(part).data)
+    serializer = PartSerializer(part, data=request.data, partial=True)
+    if serializer.is_valid():
+        serializer.save()
+        return success_response(serializer.data, "Part updated")
+    return error_response(serializer.errors)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def part_receive(request, pk):
+    """
+    POST /api/parts/<pk>/receive/ {"quantity": 10}
+    Book a delivery into stock
+    """
+    try:
+        quantity = int(request.data.get('quantity'))
+    except (TypeError, ValueError):
+        quantity = 0
+    if quantity < 1:
+        return error_response("quantity must be a positive whole number")
+    if not inventory_service.receive_stock(pk, quantity):
+        return error_response("Part not found", status_code=404)
+    return success_response(PartSerializer(Part.objects.get(id=pk)).data, "Stock received")
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def service_part_list(request, pk):
+    """
+    GET:  Parts reserved for / used by a service
+    POST: Reserve a part {partId, quantity} - 409 if not enough stock
+          (on a completed service the part is consumed straight away)
+    """
+    service = service_service.get_service_by_id(pk)
+    if service is None:
+        return error_response("Service record not found", status_code=404)
+    if request.method == 'GET':
+        parts = service.parts.select_related('part').order_by('id')
+        return success_response(ServicePartSerializer(parts, many=True).data)
+
+    serializer = ServicePartSerializer(data=request.data)
+    if not serializer.is_valid():
+        return error_response(serializer.errors)
+    data = serializer.validated_data
+    try:
+        service_part = inventory_service.reserve_part(service, data['part'].id, data['quantity'])
+    except inventory_service.OutOfStock as e:
+        return error_response({'available': e.part.available if e.part else 0}, str(e), status_code=409)
+    if service.status == 'Completed':
+        inventory_service.consume_for_services([service.id])
+        service_part.refresh_from_db()
+    return success_response(ServicePartSerializer(service_part).data, "Part reserved", status_code=201)
+
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
+def service_part_detail(request, pk, part_pk):
+    """
+    DELETE: Release a reserved part back to stock (consumed parts stay)
+    """
+    service_part = ServicePart.objects.filter(id=part_pk, service_id=pk).first()
+    if service_part is None:
+        return error_response("Part not found on this service", status_code=404)
+    if not inventory_service.release_part(service_part):
+        return error_response(f"Part is already {service_part.status}", status_code=409)
+    return success_response(ServicePartSerializer(service_part).data, "Part released")
+
+
+# ========== MAINTENANCE REMINDER API ENDPOINTS ==========
+# "Service due" reminders queued nightly by queue_maintenance_reminders
+
+# Upper bound on reminders returned per request
+REMINDER_PAGE_SIZE = 200
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def maintenance_reminder_list(request):
+    """
+    GET /api/reminders/?status=pending&dueBefore=YYYY-MM-DD
+    Queued reminders with the customer's contact details, soonest due first
+    """
+    reminders = MaintenanceReminder.objects.filter(
+        status=request.query_params.get('status', 'pending')
+    ).select_related('vehicle__customer')
+    due_before = parse_date(request.query_params.get('dueBefore') or '')
+    if due_before:
+        reminders = reminders.filter(due_date__lte=due_before)
+    return success_response(MaintenanceReminderSerializer(reminders[:REMINDER_PAGE_SIZE], many=True).data)
+
+
+@api_view(['PATCH'])
+@permission_classes([IsAuthenticated])
+def maintenance_reminder_detail(request, pk):
+    """
+    PATCH /api/reminders/{id}/ {"status": "sent" | "dismissed"}
+    Take a pending reminder off the queue
+    """
+    status = request.data.get('status')
+    if status not in ('sent', 'dismissed'):
+        return error_response("Status must be 'sent' or 'dismissed'")
+    updated = MaintenanceReminder.objects.filter(id=pk, status='pending').update(
+        status=status, sent_at=timezone.now() if status == 'sent' else None
+    )
+    if not updated:
+        return error_response("Pending reminder not found", status_code=404)
+    reminder = MaintenanceReminder.objects.select_related('vehicle__customer').get(id=pk)
+    return success_response(MaintenanceReminderSerializer(reminder).data, f"Reminder marked {status}")
+
+
 # ========== INVOICE API ENDPOINTS ==========
 # Invoice is the bill sent to customer
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@idempotent  # POST honours the Idempotency-Key header (safe retries)
 def invoice_list(request):
     """
     GET:  List all invoices
+          ?from=YYYY-MM-DD&to=YYYY-MM-DD limits by invoice date and, when the
+          range reaches back far enough, includes archived invoices
+          ?fields= / ?include=service,customer,vehicle as for services
     POST: Create new invoice (usually auto-generated, but can be manual)
     """
     if request.method == 'GET':
+        date_from, date_to, error = _date_range(request)
+        if error:
+            return error_response(error)
+        expansion, error = _expansion(request, InvoiceSerializer)
+        if error:
+            return error_response(error)
         # Get all invoices
-        invoices = Invoice.objects.all()
-        serializer = InvoiceSerializer(invoices, many=True)
-        return success_response(serializer.data)
+        invoices = archive_service.filter_date_range(
+            Invoice.objects.all(), 'date_created', date_from, date_to
+        )
+        invoices = InvoiceSerializer.load_includes(invoices, expansion['include'])
+        data = InvoiceSerializer(invoices, many=True, **expansion).data
+        if archive_service.archive_reaches(ArchivedInvoice, date_from, date_to):
+            archived = archive_service.archived_in_range(ArchivedInvoice, date_from, date_to)
+            archived = ArchivedInvoiceSerializer.load_includes(archived, expansion['include'])
+            data = ArchivedInvoiceSerializer(archived, many=True, **expansion).data + data
+        return success_response(data)
     elif request.method == 'POST':
         # Create new invoice manually
         data = request.data.copy()
@@ -341,7 +902,9 @@ def invoice_list(request):
             del data['id']
         serializer = InvoiceSerializer(data=data)
         if serializer.is_valid():
-            serializer.save()
+            with metrics.timer('invoice_generation_seconds', {'source': 'manual'}):
+                serializer.save()
+            metrics.inc('invoices_generated_total', {'source': 'manual'})
             return success_response(serializer.data, "Invoice created", status_code=201)
         return error_response(serializer.errors)
 
@@ -359,14 +922,29 @@ def invoice_detail(request, pk):
         return error_response("Invoice not found", status_code=404)
     
     if request.method == 'GET':
-        serializer = InvoiceSerializer(invoice)
-        return success_response(serializer.data)
+        expansion, error = _expansion(request, InvoiceSerializer)
+        if error:
+            return error_response(error)
+        serializer = InvoiceSerializer(invoice, **expansion)
+        return with_etag(success_response(serializer.data), invoice.version)
     
     elif request.method == 'PUT':
-        serializer = InvoiceSerializer(invoice, data=request.data, partial=True)
+        # If-Match (or body 'version') makes the save conditional: 412 if stale
+        try:
+            expected_version = get_expected_version(request)
+        except InvalidPrecondition as e:
+            return invalid_precondition_response(e)
+        serializer = InvoiceSerializer(
+            invoice, data=request.data, partial=True,
+            context={'expected_version': expected_version}
+        )
         if serializer.is_valid():
-            serializer.save()
-            return success_response(serializer.data, "Invoice updated")
+            try:
+                serializer.save()
+            except VersionConflict:
+                current = Invoice.objects.filter(id=invoice.id).values_list('version', flat=True).first()
+                return precondition_failed_response(current)
+            return with_etag(success_response(serializer.data, "Invoice updated"), invoice.version)
         return error_response(serializer.errors)
     
     elif request.method == 'DELETE':
@@ -374,11 +952,114 @@ def invoice_detail(request, pk):
         return success_response(None, "Invoice deleted")
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def invoice_pdf(request, pk):
+    """
+    GET /api/invoices/{id}/pdf/
+    Printable PDF of the invoice (cached on disk per invoice version)
+    Add ?download=1 to get it as an attachment instead of inline
+    """
+    try:
+        invoice = Invoice.objects.select_related('customer', 'vehicle').get(id=pk)
+    except Invoice.DoesNotExist:
+        return error_response("Invoice not found", status_code=404)
+
+    try:
+        pdf = pdf_service.get_invoice_pdf(invoice)
+    except pdf_service.PdfUnavailable as e:
+        return error_response(str(e), status_code=503)
+
+    disposition = 'attachment' if request.query_params.get('download') else 'inline'
+    response = HttpResponse(pdf, content_type='application/pdf')
+    response['Content-Disposition'] = f'{disposition}; filename="{invoice.invoice_number}.pdf"'
+    return with_etag(response, invoice.version)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def line_item_revenue_report(request):
+    """
+    GET /api/reports/line-items/?group_by=type|description|month
+        &from=YYYY-MM-DD&to=YYYY-MM-DD&type=part
+    Revenue per line item group, aggregated in the database
+    """
+    group_by = request.query_params.get('group_by', 'type')
+    if group_by not in report_service.REVENUE_GROUPINGS:
+        return error_response(
+            f"group_by must be one of: {', '.join(report_service.REVENUE_GROUPINGS)}",
+            status_code=400
+        )
+
+    date_from, date_to, error = _date_range(request)
+    if error:
+        return error_response(error, status_code=400)
+
+    rows = report_service.line_item_revenue(
+        group_by=group_by,
+        date_from=date_from,
+        date_to=date_to,
+        item_type=request.query_params.get('type'),
+    )
+    return success_response([
+        {
+            'key': row['key'].strftime('%Y-%m') if group_by == 'month' and row['key'] else row['key'],
+            'revenue': row['revenue'],
+            'quantity': row['quantity'],
+            'lines': row['lines'],
+            'invoices': row['invoices'],
+            'avgUnitPrice': round(row['avg_unit_price'] or 0, 2),
+        }
+        for row in rows
+    ])
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def cash_flow_forecast_report(request):
+    """
+    GET /api/reports/cash-flow/?weeks=8&refresh=1
+    Expected payments per week from open invoices and each customer's
+    payment history, with a 90% band (cached for the day; refresh=1
+    recomputes)
+    """
+    try:
+        weeks = int(request.query_params.get('weeks', forecast_service.WEEKS))
+    except ValueError:
+        return error_response("weeks must be a number")
+    if not 1 <= weeks <= 26:
+        return error_response("weeks must be between 1 and 26")
+    try:
+        forecast = forecast_service.cash_flow_forecast(weeks, refresh=request.query_params.get('refresh') == '1')
+    except forecast_service.ForecastUnavailable as e:
+        return error_response(str(e), status_code=503)
+    return success_response(forecast)
+
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def cycle_time_report(request):
+    """
+    GET /api/reports/cycle-times/?from=YYYY-MM-DD&to=YYYY-MM-DD
+    p50/p90 hours from creation to completion (and time spent Pending /
+    In Progress vs. the estimate) for jobs completed in the range,
+    overall, by service type and by technician
+    """
+    date_from, date_to, error = _date_range(request)
+    if error:
+        return error_response(error, status_code=400)
+    try:
+        report = status_history_service.cycle_time_report(date_from, date_to)
+    except status_history_service.AnalyticsUnavailable as e:
+        return error_response(str(e), status_code=503)
+    return success_response(report)
 # ========== PAYMENT API ENDPOINTS ==========
 # Payment is a transaction recorded against an invoice
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@idempotent  # POST honours the Idempotency-Key header (safe retries)
 def payment_list(request):
     """
     GET:  List payments (optionally filter by invoice_id)
@@ -387,6 +1068,9 @@ def payment_list(request):
     Important: When payment is recorded, invoice balance_due is recalculated
     """
     if request.method == 'GET':
+        date_from, date_to, error = _date_range(request)
+        if error:
+            return error_response(error)
         # Check if filtering by invoice_id
         invoice_id = request.query_params.get('invoice_id')
         if invoice_id:
@@ -395,8 +1079,17 @@ def payment_list(request):
         else:
             # Get all payments
             payments = Payment.objects.all()
-        serializer = PaymentSerializer(payments, many=True)
-        return success_response(serializer.data)
+        payments = archive_service.filter_date_range(payments, 'date', date_from, date_to)
+        expansion, error = _expansion(request, PaymentSerializer)
+        if error:
+            return error_response(error)
+        data = PaymentSerializer(payments, many=True, **expansion).data
+        if archive_service.archive_reaches(ArchivedPayment, date_from, date_to):
+            archived = archive_service.archived_in_range(ArchivedPayment, date_from, date_to)
+            if invoice_id:
+                archived = archived.filter(invoice_id=invoice_id)
+            data = ArchivedPaymentSerializer(archived, many=True, **expansion).data + data
+        return success_response(data)
     elif request.method == 'POST':
         # Record new payment
         data = request.data.copy()
@@ -405,29 +1098,12 @@ def payment_list(request):
             
         serializer = PaymentSerializer(data=data)
         if serializer.is_valid():
-            payment = serializer.save()
-            
-            # AUTOMATIC: Recalculate invoice paid_amount and balance_due
-            from django.db.models import Sum
-            invoice = payment.invoice
-            # Sum all payments for this invoice
-            total_paid = Payment.objects.filter(invoice=invoice).aggregate(Sum('amount'))['amount__sum'] or 0
-            
-            # Update invoice with new payment totals
-            invoice.paid_amount = total_paid
-            invoice.balance_due = invoice.total - invoice.paid_amount
-            
-            # If fully paid, mark invoice as 'paid'
-            if invoice.balance_due <= 0:
-                invoice.status = 'paid'
-            invoice.save()
-            
-            # Sync Service remaining_balance with Invoice balance_due
-            # This keeps Service and Invoice balances in sync
-            if invoice.service:
-                service = invoice.service
-                service.remaining_balance = invoice.balance_due
-                service.save()
+            with metrics.timer('payment_post_seconds'):
+                payment = serializer.save()
+                
+                # AUTOMATIC: Recalculate invoice paid_amount and balance_due
+                payment_service.sync_invoice_payments(payment.invoice)
+            metrics.inc('payments_posted_total', {'method': payment.method})
             
             return success_response(PaymentSerializer(payment).data, "Payment processed", status_code=201)
         return error_response(serializer.errors)
@@ -445,12 +1121,78 @@ def payment_detail(request, pk):
         return error_response("Payment not found", status_code=404)
     
     if request.method == 'GET':
-        serializer = PaymentSerializer(payment)
+        expansion, error = _expansion(request, PaymentSerializer)
+        if error:
+            return error_response(error)
+        serializer = PaymentSerializer(payment, **expansion)
         return success_response(serializer.data)
         
     elif request.method == 'DELETE':
-        # Delete payment
+        # Delete payment, then recalculate the invoice it belonged to
+        invoice = payment.invoice
         payment.delete()
+        payment_service.sync_invoice_payments(invoice)
         return success_response(None, "Payment deleted")
 
 
+# ========== LIVE CHANGE FEED ==========
+# Server-Sent Events stream of model changes (see events.py)
+
+async def change_feed(request):
+    """
+    GET /api/events/
+    Long-lived text/event-stream of {"model", "id", "action"} changes
+    Resume after a disconnect with the Last-Event-ID header (sent by
+    EventSource automatically) or ?last_event_id=
+    Serve under ASGI (e.g. uvicorn garage_backend.asgi:application) to keep
+    streams open; under WSGI each response sends pending events and closes,
+    and the browser reconnects after the retry interval
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse(
+            {"status": "error", "message": "Error", "errors": "Authentication credentials were not provided."},
+            status=403
+        )
+
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_id = int(last_id)
+    except (TypeError, ValueError):
+        # Fresh connection: only stream changes from now on
+        last_id = await sync_to_async(events.latest_event_id)()
+
+    single_batch = 'wsgi.version' in request.META
+    response = StreamingHttpResponse(
+        _change_stream(last_id, single_batch), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx buffering the stream
+    return response
+
+
+async def _change_stream(last_id, single_batch):
+    yield "retry: 3000\n\n"
+    waiter = events.broker.subscribe()
+    wakeup = waiter[1]
+    try:
+        while True:
+            wakeup.clear()
+            batch, waiting = await sync_to_async(events.events_after)(last_id)
+            for event in batch:
+                last_id = event.id
+                yield events.format_event(event)
+            if single_batch:
+                return
+            if len(batch) == events.BATCH_SIZE:
+                continue  # More backlog to send
+            try:
+                # An id gap may fill from another process (no wakeup): poll soon
+                await asyncio.wait_for(
+                    wakeup.wait(), events.GAP_POLL_SECONDS if waiting else events.HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                if not waiting:
+                    yield ": keep-alive\n\n"
+    finally:
+        events.broker.unsubscribe(waiter)
@@ -0,0 +1,134 @@
+"""
+==============================================================
+BATCH READ ENDPOINT
+==============================================================
+POST /api/batch/ runs several read-only API calls in one HTTP request,
+so a dashboard refresh pays session lookup, authentication and the
+middleware stack once instead of once per table:
+
+    POST /api/batch/
+    {"requests": [
+        {"id": "customers", "url": "/api/customers/"},
+        {"id": "services",  "url": "/api/services/?include=vehicle"}
+    ]}
+
+    -> data: [
+        {"id": "customers", "status": 200, "body": {...normal response...}},
+        {"id": "services",  "status": 200, "body": {...}}
+    ]
+
+How sub-requests run:
+- Resolved with the normal URL resolver and handed to the view directly
+  (no middleware), sharing the outer request's user, session and
+  database connection
+- GET only, /api/ paths only, no nested batches; every view still
+  checks its own permissions
+- At most BATCH_MAX_REQUESTS sub-requests; once BATCH_TIME_LIMIT_SECONDS
+  have passed, the remaining ones are answered with 503 instead of run
+- A failing sub-request only fails its own entry
+==============================================================
+"""
+
+import json
+import logging
+import time
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import Http404, HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from utils.http_responses import success_response, error_response
+
+logger = logging.getLogger(__name__)
+
+BATCH_PATH = '/api/batch/'
+# Outer-request headers that must not leak into the sub-requests
+_DROPPED_META = ('CONTENT_LENGTH', 'CONTENT_TYPE', 'HTTP_IF_MATCH', 'HTTP_IF_NONE_MATCH')
+
+
+def _error_body(message):
+    # Same shape as utils.http_responses.error_response
+    return {'status': 'error', 'message': message, 'errors': None}
+
+
+def _sub_request(outer, path, query_string):
+    # A GET HttpRequest that reuses the outer request's resolved state
+    sub = HttpRequest()
+    sub.method = 'GET'
+    sub.path = sub.path_info = path
+    sub.META = {key: value for key, value in outer.META.items() if key not in _DROPPED_META}
+    sub.META.update({'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query_string})
+    sub.GET = QueryDict(query_string)
+    sub.COOKIES = outer.COOKIES
+    sub.session = outer.session
+    sub.user = outer.user  # Already authenticated - not looked up again
+    return sub
+
+
+def _run(outer, url):
+    # Returns (status, body, headers) for one sub-request
+    path, _, query_string = url.partition('?')
+    if not path.startswith('/api/') or path == BATCH_PATH:
+        return 400, _error_body("Only /api/ paths (other than the batch endpoint) can be batched"), {}
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return 404, _error_body("Not found"), {}
+
+    if iscoroutinefunction(match.func):
+        # Async views (the SSE change feed) stream; they cannot be inlined
+        return 406, _error_body("Only JSON endpoints can be batched"), {}
+
+    sub = _sub_request(outer, path, query_string)
+    sub.resolver_match = match
+    try:
+        response = match.func(sub, *match.args, **match.kwargs)
+    except Http404:
+        return 404, _error_body("Not found"), {}
+    except Exception:
+        logger.exception("Batch sub-request failed: GET %s", url)
+        return 500, _error_body("Internal server error"), {}
+
+    headers = {'ETag': response['ETag']} if response.has_header('ETag') else {}
+    if isinstance(response, Response):
+        # Unrendered data: the outer response renders everything once
+        return response.status_code, response.data, headers
+    if not response.streaming and response.get('Content-Type', '').startswith('application/json'):
+        return response.status_code, json.loads(response.content), headers
+    return 406, _error_body("Only JSON endpoints can be batched"), {}
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def batch_view(request):
+    """
+    POST /api/batch/
+    Body: {"requests": [{"id": "...", "url": "/api/...", "method": "GET"}, ...]}
+    """
+    items = request.data.get('requests') if isinstance(request.data, dict) else None
+    if not isinstance(items, list) or not items:
+        return error_response("requests must be a non-empty list")
+    max_requests = getattr(settings, 'BATCH_MAX_REQUESTS', 10)
+    if len(items) > max_requests:
+        return error_response(f"At most {max_requests} requests per batch")
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get('url'), str):
+            return error_response("Each request needs a url")
+        if str(item.get('method', 'GET')).upper() != 'GET':
+            return error_response("Only GET requests can be batched")
+
+    outer = request._request
+    deadline = time.monotonic() + getattr(settings, 'BATCH_TIME_LIMIT_SECONDS', 5)
+    results = []
+    for index, item in enumerate(items):
+        if time.monotonic() > deadline:
+            status, body, headers = 503, _error_body("Batch time limit reached - request not run"), {}
+        else:
+            status, body, headers = _run(outer, item['url'])
+        result = {'id': item.get('id', index), 'status': status, 'body': body}
+        if headers:
+            result['headers'] = headers
+        results.append(result)
+    return success_response(results)
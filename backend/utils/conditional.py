@@ -0,0 +1,50 @@
+from rest_framework import status
+from .http_responses import error_response
+
+
+class InvalidPrecondition(ValueError):
+    """An If-Match header or 'version' field that is not a version number"""
+
+
+def get_expected_version(request):
+    """
+    Read the version the client last saw, for optimistic concurrency
+    Accepts an If-Match header ("3", W/"3" or 3) or a 'version' body field
+    Returns an int, or None when the client did not send one
+    Raises InvalidPrecondition when it is malformed - never ignore it,
+    that would turn a conditional write into an unconditional one
+    """
+    header = request.META.get('HTTP_IF_MATCH')
+    if header:
+        raw = header
+    elif isinstance(request.data, dict):
+        raw = request.data.get('version')
+    else:
+        raw = None  # List/scalar JSON bodies carry no version field
+    if raw in (None, '', '*'):
+        return None
+    raw = str(raw).strip()
+    if raw.startswith('W/'):
+        raw = raw[2:]
+    try:
+        return int(raw.strip('"'))
+    except ValueError:
+        raise InvalidPrecondition(f"Invalid version precondition: {raw!r}")
+
+
+def with_etag(response, version):
+    # Expose the row version so the client can send it back in If-Match
+    response['ETag'] = f'"{version}"'
+    return response
+
+
+def precondition_failed_response(current_version):
+    return with_etag(error_response(
+        {"version": current_version},
+        "This record was changed by someone else. Reload it and try again.",
+        status_code=status.HTTP_412_PRECONDITION_FAILED
+    ), current_version)
+
+
+def invalid_precondition_response(error):
+    return error_response({"version": str(error)}, "If-Match / version must be a version number")
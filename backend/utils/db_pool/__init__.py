@@ -0,0 +1,7 @@
+"""
+Pooled MySQL database backend
+
+Use as a drop-in ENGINE ('utils.db_pool') in place of
+'mysql.connector.django'. Pool sizing lives in the alias' 'POOL' dict;
+see pool.py for the options and base.py for how Django is wired to it.
+"""
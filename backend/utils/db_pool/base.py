@@ -0,0 +1,62 @@
+"""
+Django database backend: mysql.connector.django + connection pool
+
+settings.DATABASES example:
+    'default': {
+        'ENGINE': 'utils.db_pool',
+        ... usual NAME/USER/HOST/OPTIONS ...
+        'POOL': {'MIN_SIZE': 2, 'MAX_SIZE': 10},
+    }
+
+Keep CONN_MAX_AGE at 0: Django then "closes" the connection after each
+request, which hands it back to the pool instead of tearing it down.
+"""
+
+import logging
+from django.db import connections
+from mysql.connector.django.base import DatabaseWrapper as MySQLDatabaseWrapper
+from .pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+def _ping(connection):
+    connection.ping(reconnect=False)
+
+
+class DatabaseWrapper(MySQLDatabaseWrapper):
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict.get('POOL'))
+
+    def _connect_raw(self):
+        return super().get_new_connection(self.get_connection_params())
+
+    def get_new_connection(self, conn_params):
+        return self.pool.acquire(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params), _ping)
+
+    def _close(self):
+        if self.connection is None:
+            return
+        reusable = True
+        try:
+            # Never hand the next request an open transaction
+            if not self.get_autocommit() or self.in_atomic_block:
+                self.connection.rollback()
+        except Exception:
+            reusable = False
+        if self.errors_occurred and not self.is_usable():
+            reusable = False
+        self.pool.release(self.connection, reusable=reusable)
+
+
+def warm_up_pools():
+    # Open MIN_SIZE connections for every pooled alias (call at worker start)
+    for alias in connections:
+        wrapper = connections[alias]
+        if isinstance(wrapper, DatabaseWrapper):
+            try:
+                wrapper.pool.warm_up(wrapper._connect_raw)
+            except Exception as e:
+                # Database not reachable yet - connections open on demand instead
+                logger.warning("Could not warm up connection pool '%s': %s", alias, e)
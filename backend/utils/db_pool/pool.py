@@ -0,0 +1,202 @@
+"""
+==============================================================
+CONNECTION POOL
+==============================================================
+A thread-safe pool of raw DB-API connections, one pool per database
+alias per worker process. Django's request cycle "closes" its
+connection after every request; the pooled backend returns it here
+instead, so the TCP handshake, authentication and init_command
+(sql_mode) are paid once per connection rather than once per request.
+
+POOL options (settings.DATABASES[alias]['POOL']):
+- MIN_SIZE: connections opened by warm_up() and kept when idle
+- MAX_SIZE: hard cap; callers wait (up to TIMEOUT seconds) beyond it
+- TIMEOUT: max seconds to wait for a free connection
+- HEALTH_CHECK_AFTER: ping connections idle for longer than this
+- MAX_LIFETIME: recycle connections older than this (seconds)
+
+stats() reports in-use/idle counts, waits and wait time, and churn
+(connections opened/closed) for the metrics endpoint.
+==============================================================
+"""
+
+import os
+import threading
+import time
+
+DEFAULTS = {
+    'MIN_SIZE': 2,
+    'MAX_SIZE': 10,
+    'TIMEOUT': 5,
+    'HEALTH_CHECK_AFTER': 30,
+    'MAX_LIFETIME': 1800,
+}
+
+
+class PoolTimeout(Exception):
+    """No connection became free within TIMEOUT seconds"""
+
+
+class _Entry:
+    # A pooled connection plus the bookkeeping needed for health checks
+    __slots__ = ('connection', 'created_at', 'released_at')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = self.released_at = time.monotonic()
+
+
+class ConnectionPool:
+
+    def __init__(self, alias, options=None):
+        self.alias = alias
+        self.options = {**DEFAULTS, **(options or {})}
+        self.pid = os.getpid()
+        self._cond = threading.Condition()
+        self._idle = []  # LIFO: reuse the warmest connection first
+        self._in_use = {}  # id(connection) -> _Entry
+        self._opening = 0  # Connections being opened outside the lock
+        self.counters = {
+            'opened': 0, 'closed': 0, 'acquired': 0, 'health_check_failures': 0,
+            'waits': 0, 'wait_seconds_total': 0.0, 'wait_seconds_max': 0.0, 'timeouts': 0,
+        }
+
+    def _size(self):
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def _close(self, connection):
+        self.counters['closed'] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, entry, ping):
+        now = time.monotonic()
+        if now - entry.created_at > self.options['MAX_LIFETIME']:
+            return False
+        if now - entry.released_at > self.options['HEALTH_CHECK_AFTER']:
+            try:
+                ping(entry.connection)
+            except Exception:
+                self.counters['health_check_failures'] += 1
+                return False
+        return True
+
+    def acquire(self, connect, ping):
+        """
+        Hand out an idle connection (health-checked) or open a new one
+        connect(): opens a raw connection; ping(conn): raises if it is dead
+        """
+        start = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                while self._idle:
+                    entry = self._idle.pop()
+                    if self._is_healthy(entry, ping):
+                        return self._checkout(entry, start, waited)
+                    self._close(entry.connection)
+                if self._size() < self.options['MAX_SIZE']:
+                    self._opening += 1
+                    break
+                remaining = self.options['TIMEOUT'] - (time.monotonic() - start)
+                if remaining <= 0:
+                    self.counters['timeouts'] += 1
+                    raise PoolTimeout(
+                        f"No free connection in pool '{self.alias}' after {self.options['TIMEOUT']}s"
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+        # Open outside the lock so a slow handshake does not block releases
+        try:
+            entry = _Entry(connect())
+        except Exception:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._opening -= 1
+            self.counters['opened'] += 1
+            return self._checkout(entry, start, waited)
+
+    def _checkout(self, entry, start, waited):
+        # Caller holds the lock
+        self._in_use[id(entry.connection)] = entry
+        self.counters['acquired'] += 1
+        if waited:
+            wait = time.monotonic() - start
+            self.counters['waits'] += 1
+            self.counters['wait_seconds_total'] += wait
+            self.counters['wait_seconds_max'] = max(self.counters['wait_seconds_max'], wait)
+        return entry.connection
+
+    def release(self, connection, reusable=True):
+        # Return a connection; broken or surplus ones are closed
+        with self._cond:
+            entry = self._in_use.pop(id(connection), None)
+            if entry is None or not reusable:
+                self._close(connection)
+            else:
+                entry.released_at = time.monotonic()
+                self._idle.append(entry)
+            self._cond.notify()
+
+    def warm_up(self, connect):
+        # Open MIN_SIZE connections up front (called at worker start)
+        while True:
+            with self._cond:
+                if self._size() >= self.options['MIN_SIZE']:
+                    return
+                self._opening += 1
+            try:
+                entry = _Entry(connect())
+            finally:
+                with self._cond:
+                    self._opening -= 1
+            with self._cond:
+                self.counters['opened'] += 1
+                self._idle.append(entry)
+                self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            for entry in self._idle:
+                self._close(entry.connection)
+            self._idle = []
+
+    def stats(self):
+        with self._cond:
+            return {
+                'alias': self.alias,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'max_size': self.options['MAX_SIZE'],
+                **self.counters,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_inherited = []  # Pools a forked process got from its parent
+
+
+def get_pool(alias, options=None):
+    # One pool per alias per process; a forked worker never reuses the
+    # parent's sockets (e.g. gunicorn --preload)
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None or pool.pid != os.getpid():
+            if pool is not None:
+                # Never closed (or garbage-collected) here: its sockets are the parent's
+                _inherited.append(pool)
+            pool = _pools[alias] = ConnectionPool(alias, options)
+        return pool
+
+
+def all_pool_stats():
+    with _pools_lock:
+        pools = [pool for pool in _pools.values() if pool.pid == os.getpid()]
+    return [pool.stats() for pool in pools]
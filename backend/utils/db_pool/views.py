@@ -0,0 +1,15 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from utils.http_responses import success_response
+from utils.permissions import IsAdmin
+from .pool import all_pool_stats
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def pool_metrics(request):
+    """
+    GET /api/system/db-pool/
+    Connection pool counters for the worker process that served the request
+    """
+    return success_response(all_pool_stats())
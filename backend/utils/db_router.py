@@ -0,0 +1,162 @@
+"""
+==============================================================
+READ-REPLICA ROUTING
+==============================================================
+Sends ORM reads made while serving safe (GET/HEAD) requests to the
+'replica' database alias, so report-heavy pages do not compete with
+payment writes on the MySQL primary. Everything else uses 'default'.
+
+- PrimaryReplicaRouter: the DATABASE_ROUTERS entry
+- ReplicaRoutingMiddleware: decides per request whether reads may use
+  the replica, and pins a browser to the primary for
+  REPLICA_STICKY_SECONDS after it writes (read-your-writes)
+- ReplicaHealth: cached replication-lag check; when the replica is
+  behind by more than REPLICA_MAX_LAG_SECONDS (or unreachable), reads
+  fall back to the primary
+
+If no 'replica' alias is configured, all reads go to the primary.
+==============================================================
+"""
+
+import contextvars
+import threading
+import time
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = 'replica'
+# Cookie set after a write so the same browser reads its own changes
+PRIMARY_PIN_COOKIE = 'db_primary_pin'
+
+# Models whose reads may be served from the replica. Sessions, users,
+# idempotency keys and the change feed always need the freshest data.
+DEFAULT_REPLICA_MODELS = {
+    'service_history.customer',
+    'service_history.vehicle',
+    'service_history.technician',
+    'service_history.service',
+    'service_history.invoice',
+    'service_history.payment',
+    'service_history.billingsetting',
+    'service_history.invoicelineitem',
+    # Archive tables are read-only history - ideal replica traffic
+    'service_history.archivedservice',
+    'service_history.archivedinvoice',
+    'service_history.archivedpayment',
+}
+
+# True while the current request is allowed to read from the replica
+_replica_reads_allowed = contextvars.ContextVar('replica_reads_allowed', default=False)
+
+
+class ReplicaHealth:
+    # Measures replication lag at most once per REPLICA_HEALTH_CHECK_INTERVAL
+
+    def __init__(self, alias):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._checked_at = None
+        self._healthy = False
+
+    def measure_lag(self):
+        # Seconds the replica is behind the primary (inf if unknown/broken)
+        try:
+            connection = connections[self.alias]
+            if connection.vendor != 'mysql':
+                return 0  # Lag is only measurable on MySQL replicas
+            with connection.cursor() as cursor:
+                cursor.execute("SHOW REPLICA STATUS")
+                row = cursor.fetchone()
+                if row is None:
+                    return 0  # Not a replica (e.g. a dev copy) - nothing to wait for
+                columns = [col[0] for col in cursor.description]
+            status = dict(zip(columns, row))
+            lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+            return float('inf') if lag is None else float(lag)
+        except Exception:
+            return float('inf')
+
+    def is_healthy(self):
+        interval = getattr(settings, 'REPLICA_HEALTH_CHECK_INTERVAL', 5)
+        max_lag = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 2)
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is None or now - self._checked_at >= interval:
+                self._healthy = self.measure_lag() <= max_lag
+                self._checked_at = now
+            return self._healthy
+
+    def reset(self):
+        with self._lock:
+            self._checked_at = None
+
+
+class PrimaryReplicaRouter:
+    """
+    Database router: writes -> primary, eligible reads -> replica
+    Aliases can be overridden (the tests point them at two SQLite files)
+    """
+
+    def __init__(self, primary=DEFAULT_DB_ALIAS, replica=REPLICA_DB_ALIAS, models=None):
+        self.primary = primary
+        self.replica = replica
+        self.models = models or getattr(settings, 'REPLICA_MODELS', DEFAULT_REPLICA_MODELS)
+        self.health = ReplicaHealth(replica)
+
+    def replica_configured(self):
+        return self.replica in connections.settings
+
+    def db_for_read(self, model, **hints):
+        if (
+            _replica_reads_allowed.get()
+            and model._meta.label_lower in self.models
+            and self.replica_configured()
+            and self.health.is_healthy()
+        ):
+            return self.replica
+        return self.primary
+
+    def db_for_write(self, model, **hints):
+        return self.primary
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replica is a copy of the primary, so objects from either may relate
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Schema changes reach the replica through replication, not migrate
+        return db != self.replica
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Allows replica reads for GET/HEAD requests, unless this browser wrote
+    something within the last REPLICA_STICKY_SECONDS
+    """
+    SAFE_METHODS = ('GET', 'HEAD')
+    # POST endpoints that only read (POST /api/batch/ carries a list of GETs)
+    READ_ONLY_PATHS = ('/api/batch/',)
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def is_read_only(self, request):
+        return request.method in self.SAFE_METHODS or request.path in self.READ_ONLY_PATHS
+
+    def __call__(self, request):
+        read_only = self.is_read_only(request)
+        allowed = read_only and PRIMARY_PIN_COOKIE not in request.COOKIES
+        token = _replica_reads_allowed.set(allowed)
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica_reads_allowed.reset(token)
+
+        if not read_only and response.status_code < 400:
+            # Pin this browser to the primary until the replica has caught up
+            response.set_cookie(
+                PRIMARY_PIN_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_STICKY_SECONDS', 5),
+                httponly=True, samesite='Lax'
+            )
+        return response
@@ -0,0 +1,12 @@
+"""
+Prometheus-style metrics
+
+Record from anywhere with inc() / observe() / timer(); GET /metrics
+returns every worker's numbers summed, in the text exposition format.
+See registry.py for the metric definitions and store.py for how
+per-process values are shared between gunicorn workers.
+"""
+
+from .registry import METRICS, inc, observe, timer, register_collector
+
+__all__ = ['METRICS', 'inc', 'observe', 'timer', 'register_collector']
@@ -0,0 +1,46 @@
+"""
+Per-view request metrics: latency histogram, request counter and the
+number/time of database queries, labelled by URL route (bounded
+cardinality - 'api/services/<str:pk>/', never the concrete path).
+"""
+
+import time
+from contextlib import ExitStack
+from django.db import connections
+from . import registry, store
+
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        store.ensure_flusher()
+        queries = [0, 0.0]  # count, seconds
+
+        def track_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries[0] += 1
+                queries[1] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(track_query))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.route if match else 'unmatched'
+        registry.inc('http_requests_total', {
+            'view': view, 'method': request.method, 'status': f"{response.status_code // 100}xx",
+        })
+        registry.observe('http_request_duration_seconds', elapsed, {'view': view, 'method': request.method})
+        registry.inc('db_queries_total', {'view': view}, queries[0])
+        registry.inc('db_query_duration_seconds_total', {'view': view}, queries[1])
+        registry.observe('db_queries_per_request', queries[0], {'view': view})
+        return response
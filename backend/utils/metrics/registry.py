@@ -0,0 +1,99 @@
+"""
+Metric definitions and the in-process recording API.
+
+Recording only touches this process' dictionaries under one short lock
+(no I/O, no cross-process coordination); store.py periodically writes
+them to a per-process file that the /metrics view aggregates.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+COUNTER = 'counter'
+HISTOGRAM = 'histogram'
+GAUGE = 'gauge'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250, 500)
+
+# name -> (type, help text, buckets for histograms)
+METRICS = {
+    'http_requests_total': (COUNTER, 'HTTP requests by view route, method and status class', None),
+    'http_request_duration_seconds': (HISTOGRAM, 'HTTP request latency by view route and method', LATENCY_BUCKETS),
+    'db_queries_total': (COUNTER, 'Database queries executed while serving a view', None),
+    'db_query_duration_seconds_total': (COUNTER, 'Time spent in database queries while serving a view', None),
+    'db_queries_per_request': (HISTOGRAM, 'Database queries per request by view route', QUERY_COUNT_BUCKETS),
+    'invoices_generated_total': (COUNTER, 'Invoices created, by source (auto, bulk, manual)', None),
+    'invoice_generation_seconds': (HISTOGRAM, 'Time to generate invoices, by source', LATENCY_BUCKETS),
+    'payments_posted_total': (COUNTER, 'Payments recorded, by method', None),
+    'payment_post_seconds': (HISTOGRAM, 'Time to record a payment and resync its invoice', LATENCY_BUCKETS),
+    'otp_sends_total': (COUNTER, 'Password reset OTP emails, by result (sent, failed)', None),
+    'otp_send_seconds': (HISTOGRAM, 'Time to send a password reset OTP email', LATENCY_BUCKETS),
+    'otp_verifications_total': (COUNTER, 'OTP checks, by result (valid, invalid)', None),
+}
+
+_lock = threading.Lock()
+# (name, labels) -> float                      for counters
+# (name, labels) -> [bucket counts..., sum, count]  for histograms
+counters = {}
+histograms = {}
+# Functions returning [(name, type, help, [(labels, value), ...])] at scrape time
+collectors = []
+
+
+def _key(name, labels):
+    return (name, tuple(sorted((labels or {}).items())))
+
+
+def inc(name, labels=None, value=1):
+    key = _key(name, labels)
+    with _lock:
+        counters[key] = counters.get(key, 0) + value
+
+
+def observe(name, value, labels=None):
+    buckets = METRICS[name][2]
+    key = _key(name, labels)
+    with _lock:
+        series = histograms.get(key)
+        if series is None:
+            series = histograms[key] = [0] * len(buckets) + [0.0, 0]
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                series[index] += 1  # Stored per bucket; made cumulative on render
+                break
+        series[-2] += value
+        series[-1] += 1
+
+
+@contextmanager
+def timer(name, labels=None):
+    # with timer('payment_post_seconds'): ...
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, labels)
+
+
+def register_collector(collector):
+    # For values read at scrape time (e.g. open jobs from the database)
+    if collector not in collectors:
+        collectors.append(collector)
+
+
+def snapshot():
+    # Copy of this process' values, safe to serialize outside the lock
+    with _lock:
+        return (
+            [[name, list(labels), value] for (name, labels), value in counters.items()],
+            [[name, list(labels), list(series)] for (name, labels), series in histograms.items()],
+        )
+
+
+def reset():
+    # A forked worker must not re-report its parent's numbers
+    with _lock:
+        counters.clear()
+        histograms.clear()
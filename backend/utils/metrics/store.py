@@ -0,0 +1,203 @@
+"""
+Multi-process sharing of metric values (gunicorn workers, etc.)
+
+Every process writes its own values to METRICS_DIR/<pid>-<start>.json -
+from a background thread every METRICS_FLUSH_SECONDS, and at exit -
+using an atomic rename, so readers never see a partial file and writers
+never contend. The start time (ns) in the name keeps a recycled worker
+whose PID the OS reuses from replacing its predecessor's file.
+
+The /metrics view sums all files. Files of exited workers are folded
+into aggregate.json (see fold_dead()) rather than deleted, so counters
+never go backwards and the directory does not grow with every recycled
+worker (gunicorn max_requests). A worker is gone when its PID no longer
+exists, or when a newer file carries the same PID. Clear the directory
+when the whole server is restarted (e.g. gunicorn `on_starting`:
+clear_metrics_dir()).
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from django.conf import settings
+from . import registry
+
+try:
+    import fcntl
+except ImportError:  # Windows: no folding, files are only summed
+    fcntl = None
+
+AGGREGATE = 'aggregate.json'
+LOCK = 'fold.lock'
+
+_started_pid = None
+_start_lock = threading.Lock()
+_process_file = (None, None)  # (pid, file name) of this process
+
+
+def metrics_dir():
+    path = Path(getattr(settings, 'METRICS_DIR', Path(settings.BASE_DIR) / 'var' / 'metrics'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _file_name():
+    # New name per process (again after a fork)
+    global _process_file
+    pid = os.getpid()
+    if _process_file[0] != pid:
+        _process_file = (pid, f"{pid}-{time.time_ns()}.json")
+    return _process_file[1]
+
+
+def _write_atomic(path, data):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+def flush():
+    counters, histograms = registry.snapshot()
+    if not counters and not histograms:
+        return
+    _write_atomic(metrics_dir() / _file_name(), {'counters': counters, 'histograms': histograms})
+
+
+def _flush_loop(interval):
+    stop = threading.Event()
+    while not stop.wait(interval):
+        try:
+            flush()
+        except OSError:
+            pass  # Disk trouble must never break request handling
+
+
+def ensure_flusher():
+    # Start this process' flush thread once (again after a fork)
+    global _started_pid
+    pid = os.getpid()
+    if _started_pid == pid:
+        return
+    with _start_lock:
+        if _started_pid == pid:
+            return
+        if _started_pid is not None:
+            registry.reset()
+        _started_pid = pid
+        interval = getattr(settings, 'METRICS_FLUSH_SECONDS', 5)
+        threading.Thread(target=_flush_loop, args=(interval,), daemon=True, name='metrics-flush').start()
+        atexit.register(flush)
+
+
+def _process_files(directory):
+    # {path: (pid, start)} for every per-process file
+    files = {}
+    for path in directory.glob('*.json'):
+        if path.name == AGGREGATE:
+            continue
+        pid, _, start = path.stem.partition('-')
+        try:
+            files[path] = (int(pid), int(start or 0))
+        except ValueError:
+            continue
+    return files
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, owned by someone else
+    return True
+
+
+def _add(counters, histograms, data):
+    # Sum one file's values into the (counters, histograms) dicts
+    for name, labels, value in data.get('counters', []):
+        key = (name, tuple(tuple(pair) for pair in labels))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, series in data.get('histograms', []):
+        key = (name, tuple(tuple(pair) for pair in labels))
+        if key in histograms and len(histograms[key]) == len(series):
+            histograms[key] = [a + b for a, b in zip(histograms[key], series)]
+        else:
+            histograms[key] = list(series)
+
+
+def _read(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None  # Missing, or being replaced right now
+
+
+def fold_dead():
+    """
+    Fold the files of exited workers into aggregate.json, then delete
+    them. The aggregate lists the files it already contains ('folded'),
+    so a reader that still sees one does not count it twice
+    Returns the number of files folded
+    """
+    if fcntl is None:
+        return 0
+    directory = metrics_dir()
+    with open(directory / LOCK, 'w') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return 0  # Another scrape is folding
+        files = _process_files(directory)
+        newest = {}
+        for pid, start in files.values():
+            newest[pid] = max(newest.get(pid, start), start)
+        dead = [
+            path for path, (pid, start) in files.items()
+            if (pid, start) != (os.getpid(), newest[pid]) and (start < newest[pid] or not _pid_alive(pid))
+        ]
+        if not dead:
+            return 0
+
+        aggregate = _read(directory / AGGREGATE) or {}
+        folded = set(aggregate.get('folded', []))
+        counters, histograms = {}, {}
+        _add(counters, histograms, aggregate)
+        for path in dead:
+            data = _read(path)
+            if data is not None and path.name not in folded:
+                _add(counters, histograms, data)
+        # Names stay listed while their file may still be seen by a reader
+        folded = {name for name in folded if (directory / name).exists()} | {path.name for path in dead}
+        _write_atomic(directory / AGGREGATE, {
+            'counters': [[name, labels, value] for (name, labels), value in counters.items()],
+            'histograms': [[name, labels, series] for (name, labels), series in histograms.items()],
+            'folded': sorted(folded),
+        })
+        for path in dead:
+            path.unlink(missing_ok=True)
+        return len(dead)
+
+
+def read_all():
+    """Sum every process file and the aggregate: returns (counters, histograms) dicts"""
+    directory = metrics_dir()
+    process_data = {path.name: _read(path) for path in _process_files(directory)}
+    # Aggregate last: a file folded meanwhile is then listed as folded
+    aggregate = _read(directory / AGGREGATE) or {}
+    folded = set(aggregate.get('folded', []))
+    counters = {}
+    histograms = {}
+    _add(counters, histograms, aggregate)
+    for name, data in process_data.items():
+        if data is not None and name not in folded:
+            _add(counters, histograms, data)
+    return counters, histograms
+
+
+def clear_metrics_dir():
+    for path in metrics_dir().glob('*.json'):
+        path.unlink(missing_ok=True)
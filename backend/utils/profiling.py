@@ -0,0 +1,151 @@
+"""
+==============================================================
+OPT-IN REQUEST PROFILER
+==============================================================
+Lets an admin profile one specific slow request in production:
+
+    GET /api/services/?_profile=1        (or header  X-Profile: 1)
+
+The request runs normally while a background thread samples its Python
+stack every PROFILER_SAMPLE_INTERVAL_MS. The samples are stored as a
+RequestProfile row in "folded stacks" format (one "a;b;c N" line per
+distinct stack) - the input format of flamegraph.pl and speedscope -
+and can be viewed/downloaded from the Django admin. The response
+carries an X-Profile-Id header pointing at the stored profile.
+
+Overhead is capped:
+- Only authenticated admins can trigger it (others are ignored)
+- Sampling, not tracing: the profiled code runs at full speed; the
+  sampler stops after PROFILER_MAX_SAMPLES samples
+- One profiled request at a time per process; extra requests run
+  unprofiled (X-Profile-Skipped: busy)
+- Only the newest PROFILER_MAX_RETAINED profiles are kept
+==============================================================
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+
+PROFILE_QUERY_PARAM = '_profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+
+# Only one request per process is profiled at any moment
+_profile_slot = threading.Lock()
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's stack at a fixed interval into folded stacks"""
+
+    def __init__(self, thread_id, interval, max_samples):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_samples = max_samples
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while self.samples < self.max_samples and not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            # Folded format is root first: "outer;inner;leaf"
+            self.stacks[';'.join(reversed(labels))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def profiling_requested(request):
+    return (
+        request.GET.get(PROFILE_QUERY_PARAM) == '1'
+        or request.META.get(PROFILE_HEADER) == '1'
+    )
+
+
+def _is_admin(request):
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_authenticated and getattr(user, 'role', None) == 'admin')
+
+
+class RequestProfilerMiddleware:
+    """
+    Profiles the request when an admin asks for it (?_profile=1 or
+    X-Profile: 1). Must come after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profiling_requested(request) or not _is_admin(request):
+            return self.get_response(request)
+
+        if not _profile_slot.acquire(blocking=False):
+            response = self.get_response(request)
+            response['X-Profile-Skipped'] = 'busy'
+            return response
+
+        try:
+            return self._profile(request)
+        finally:
+            _profile_slot.release()
+
+    def _profile(self, request):
+        query_count = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal query_count
+            query_count += 1
+            return execute(sql, params, many, context)
+
+        sampler = StackSampler(
+            threading.get_ident(),
+            interval=getattr(settings, 'PROFILER_SAMPLE_INTERVAL_MS', 5) / 1000,
+            max_samples=getattr(settings, 'PROFILER_MAX_SAMPLES', 2000),
+        )
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            # Every alias, so reads routed to the replica are counted too
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(count_queries))
+                response = self.get_response(request)
+        finally:
+            sampler.stop()
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        from service_history.models import RequestProfile
+        profile = RequestProfile.objects.create(
+            method=request.method,
+            path=request.path[:255],
+            query_string=request.META.get('QUERY_STRING', '')[:500],
+            status_code=response.status_code,
+            duration_ms=round(duration_ms, 2),
+            query_count=query_count,
+            sample_count=sampler.samples,
+            sample_interval_ms=sampler.interval * 1000,
+            folded_stacks='\n'.join(f"{stack} {count}" for stack, count in sampler.stacks.most_common()),
+            user=request.user,
+        )
+        RequestProfile.prune(getattr(settings, 'PROFILER_MAX_RETAINED', 200))
+        response['X-Profile-Id'] = str(profile.id)
+        return response
@@ -14,7 +14,13 @@ const InvoiceDetailView = ({ invoice, vehicles, customers, payments, setShowPaym
             return;
         }
         try {
-            await updateInvoice(invoice.id, { status: newStatus });
+            const result = await updateInvoice(invoice.id, { status: newStatus }, invoice.version);
+            // A conflict was already reported (and the invoice reloaded) by the context
+            if (result.conflict) return;
+            if (!result.success) {
+                showNotification('error', 'Error', result.message || 'Failed to update invoice status.');
+                return;
+            }
             showNotification('success', 'Success', 'Invoice status updated successfully!');
         } catch (err) {
             showNotification('error', 'Error', 'Failed to update invoice status.');
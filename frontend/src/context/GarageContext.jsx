@@ -1,5 +1,5 @@
 import React, { createContext, useContext, useState, useEffect } from 'react';
-import apiService, { handleApiError } from '../services/api.jsx';
+import apiService, { handleApiError, EVENTS_URL } from '../services/api.jsx';
 
 // Create Context for global state management
 const GarageContext = createContext();
@@ -75,39 +75,32 @@ export const GarageProvider = ({ children }) => {
     setLoading(true);
     setNotification(null);  // Clear any existing notifications
     try {
-      // Fetch all data in parallel for better performance
-      const fetchPromises = [
-        apiService.customers.getAll(),
-        apiService.vehicles.getAll(),
-        apiService.services.getAll(),
-        apiService.invoices.getAll(),
-        apiService.payments.getAll(),
-        apiService.technicians.getAll(),
-        // Only admins can fetch user list
-        currentUser?.role === 'admin' ? apiService.users.getAll() : Promise.resolve({ data: [] }),
-        apiService.billingSettings.getCurrent()
+      // Fetch every table in one batched request (one auth/session check
+      // on the server instead of one per table)
+      const requests = [
+        { id: 'customers', url: '/customers/' },
+        { id: 'vehicles', url: '/vehicles/' },
+        { id: 'services', url: '/services/' },
+        { id: 'invoices', url: '/invoices/' },
+        { id: 'payments', url: '/payments/' },
+        { id: 'technicians', url: '/technicians/' },
+        { id: 'billingSettings', url: '/billing-settings/current/' },
       ];
-
-      const [
-        custRes,
-        vehRes,
-        servRes,
-        invRes,
-        payRes,
-        techRes,
-        staffRes,
-        billingRes
-      ] = await Promise.all(fetchPromises);
+      // Only admins can fetch user list
+      if (currentUser?.role === 'admin') {
+        requests.push({ id: 'users', url: '/accounts/users/' });
+      }
+      const results = await apiService.batch(requests);
 
       // Update all state with fetched data
-      setCustomers(custRes.data);
-      setVehicles(vehRes.data);
-      setServices((servRes.data || []).map(normalizeService));
-      setInvoices((invRes.data || []).map(normalizeInvoice));
-      setPayments((payRes.data || []).map(normalizePayment));
-      setTechnicians(techRes.data);
-      setStaffMembers(staffRes.data);
-      setBillingSettings(normalizeBillingSettings(billingRes.data));
+      setCustomers(results.customers);
+      setVehicles(results.vehicles);
+      setServices((results.services || []).map(normalizeService));
+      setInvoices((results.invoices || []).map(normalizeInvoice));
+      setPayments((results.payments || []).map(normalizePayment));
+      setTechnicians(results.technicians);
+      setStaffMembers(results.users || []);
+      setBillingSettings(normalizeBillingSettings(results.billingSettings));
       
       setLoading(false);
       setError(null);
@@ -123,6 +116,48 @@ export const GarageProvider = ({ children }) => {
     fetchData();
   }, []);
 
+  // Live Change Feed - the server pushes {model, id, action} for every change,
+  // so only the changed record is refetched instead of reloading every table
+  const feedTargets = {
+    customer: [apiService.customers, setCustomers, (c) => c],
+    vehicle: [apiService.vehicles, setVehicles, (v) => v],
+    technician: [apiService.technicians, setTechnicians, (t) => t],
+    service: [apiService.services, setServices, normalizeService],
+    invoice: [apiService.invoices, setInvoices, normalizeInvoice],
+    payment: [apiService.payments, setPayments, normalizePayment]
+  };
+
+  const removeRecord = (setter, id) => setter(prev => prev.filter(item => item.id !== id));
+
+  const applyChange = async ({ model, id, action }) => {
+    const target = feedTargets[model];
+    if (!target) return;
+    const [endpoint, setter, normalize] = target;
+    if (action === 'deleted') {
+      removeRecord(setter, id);
+      return;
+    }
+    try {
+      const response = await endpoint.getById(id);
+      const record = normalize(response.data);
+      // Insert or replace the record in local state
+      setter(prev => prev.some(item => item.id === id)
+        ? prev.map(item => item.id === id ? record : item)
+        : [...prev, record]);
+    } catch (err) {
+      // Record was deleted again before we could load it
+      if (err.response?.status === 404) removeRecord(setter, id);
+    }
+  };
+
+  // Keep one EventSource open while logged in (it reconnects with Last-Event-ID)
+  useEffect(() => {
+    if (!currentUser) return undefined;
+    const source = new EventSource(EVENTS_URL, { withCredentials: true });
+    source.addEventListener('change', (event) => applyChange(JSON.parse(event.data)));
+    return () => source.close();
+  }, [currentUser]);
+
   // Save currentUser to localStorage whenever it changes
   useEffect(() => { 
     if (currentUser) localStorage.setItem('currentUser', JSON.stringify(currentUser));
@@ -307,37 +342,48 @@ export const GarageProvider = ({ children }) => {
     return vehicles.filter(v => (v.customer || v.customer_id) === customerId);
   };
 
+  // 412 on a conditional update: someone else saved the record first.
+  // Reload it (same path as a change feed update) and tell the user
+  const handleConflict = async (err, model, id) => {
+    if (err.response?.status !== 412) return null;
+    await applyChange({ model, id, action: 'updated' });
+    const message = handleApiError(err).message;
+    setNotification({ type: 'error', title: 'Changed by someone else', message, isOpen: true });
+    return { success: false, conflict: true, message };
+  };
+
   // Service Operations
   const addService = async (serviceData) => {
     try {
       const response = await apiService.services.create(serviceData);
-      // Refresh all data to catch auto-generated invoices and paymants
-      fetchData();
+      // Auto-generated invoices and payments arrive through the change feed
+      setServices(prev => [...prev, normalizeService(response.data)]);
       return { success: true, data: response.data };
     } catch (err) {
       return handleApiError(err);
     }
   };
 
-  const updateServiceStatus = async (id, status) => {
+  const updateServiceStatus = async (id, status, version) => {
     try {
-      await apiService.services.updateStatus(id, status);
-      // Refresh all data to catch auto-generated invoice if marked as Completed
-      fetchData();
+      const response = await apiService.services.updateStatus(id, status, version);
+      // An auto-generated invoice (if Completed) arrives through the change feed
+      setServices(prev => prev.map(s => s.id === id ? normalizeService(response.data) : s));
       return { success: true };
     } catch (err) {
-      return handleApiError(err);
+      return (await handleConflict(err, 'service', id)) || handleApiError(err);
     }
   };
 
-  const updateService = async (id, serviceData) => {
+  // version: the record's version when the user loaded it (412 if stale)
+  const updateService = async (id, serviceData, version) => {
     try {
-      const response = await apiService.services.update(id, serviceData);
-      // Refresh all data to catch synced invoices and payments
-      fetchData();
+      const response = await apiService.services.update(id, serviceData, version);
+      // Synced invoices and payments arrive through the change feed
+      setServices(prev => prev.map(s => s.id === id ? normalizeService(response.data) : s));
       return { success: true, data: response.data };
     } catch (err) {
-      return handleApiError(err);
+      return (await handleConflict(err, 'service', id)) || handleApiError(err);
     }
   };
 
@@ -349,8 +395,7 @@ export const GarageProvider = ({ children }) => {
       const normalized = normalizeInvoice(response.data);
       console.log('Invoice created - normalized:', normalized);
       setInvoices(prev => [...prev, normalized]);
-      // Refresh all data to ensure we get the auto-generated advance payment record
-      fetchData();
+      // The auto-generated advance payment record arrives through the change feed
       return normalized;
     } catch (err) {
       console.error('Invoice creation error:', handleApiError(err));
@@ -358,18 +403,18 @@ export const GarageProvider = ({ children }) => {
     }
   };
 
-  const updateInvoice = async (invoiceId, updates) => {
+  const updateInvoice = async (invoiceId, updates, version) => {
     if (!invoiceId) {
       console.error('Cannot update invoice: missing invoiceId');
       return { success: false, message: 'Invoice ID is required' };
     }
     try {
-      const response = await apiService.invoices.update(invoiceId, updates);
+      const response = await apiService.invoices.update(invoiceId, updates, version);
       const normalized = normalizeInvoice(response.data);
       setInvoices(prev => prev.map(inv => inv.id === invoiceId ? normalized : inv));
       return { success: true, data: normalized };
     } catch (err) {
-      return handleApiError(err);
+      return (await handleConflict(err, 'invoice', invoiceId)) || handleApiError(err);
     }
   };
 
@@ -390,8 +435,7 @@ export const GarageProvider = ({ children }) => {
       const normalized = normalizePayment(response.data);
       setPayments(prev => [...prev, normalized]);
       
-      // Since payment updates invoice balance/status, refetch all data
-      fetchData();
+      // The updated invoice balance/status arrives through the change feed
       return normalized;
     } catch (err) {
       console.error('Payment recording error:', handleApiError(err));
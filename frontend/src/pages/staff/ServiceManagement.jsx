@@ -85,8 +85,17 @@ const ServiceManagement = () => {
             };
             
             if (editingService) {
-                // Update existing service
-                await updateService(editingService.id, serviceData);
+                // Update existing service (conditional on the version being edited)
+                const result = await updateService(editingService.id, serviceData, editingService.version);
+                if (result.conflict) {
+                    // The context reloaded the record and told the user
+                    handleCloseModal();
+                    return;
+                }
+                if (!result.success) {
+                    setError(result.message);
+                    return;
+                }
                 showNotification('success', 'Success', 'Service updated successfully!');
             } else {
                 // Create new service
@@ -200,7 +209,12 @@ const ServiceManagement = () => {
                                         {service.status === 'Pending' ? (
                                             <button onClick={async () => {
                                                 try {
-                                                    await updateServiceStatus(service.id, 'Completed');
+                                                    const result = await updateServiceStatus(service.id, 'Completed', service.version);
+                                                    if (result.conflict) return;  // Reported by the context
+                                                    if (!result.success) {
+                                                        showNotification('error', 'Error', result.message || 'Failed to update status.');
+                                                        return;
+                                                    }
                                                     showNotification('success', 'Success', 'Service marked as completed!');
                                                 } catch (err) {
                                                     showNotification('error', 'Error', 'Failed to update status.');
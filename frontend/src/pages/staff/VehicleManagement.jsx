@@ -15,7 +15,11 @@ const VehicleManagement = () => {
         customerId: '', number: '', brand: '', model: '', year: '', color: '', mileage: 0, fuelType: 'Petrol'
     });
 
+    // Same normalization as the backend: "abc 1234" matches "ABC-1234"
+    const normalizePlate = (value) => value.replace(/[^a-z0-9]/gi, '').toUpperCase();
+
     const filteredVehicles = vehicles.filter(v => 
+        (normalizePlate(searchTerm) && normalizePlate(v.number).includes(normalizePlate(searchTerm))) ||
         v.number.toLowerCase().includes(searchTerm.toLowerCase()) ||
         v.brand.toLowerCase().includes(searchTerm.toLowerCase()) ||
         v.model.toLowerCase().includes(searchTerm.toLowerCase())
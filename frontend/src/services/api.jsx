@@ -3,6 +3,13 @@ import axios from 'axios';
 // API Base URL - using environment variable or default to localhost
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
 
+// Server-Sent Events change feed (consumed with EventSource, not axios)
+export const EVENTS_URL = `${API_URL}/events/`;
+
+// Path part of the API URL ('/api'), which /batch/ sub-request URLs need
+// (relative VITE_API_URL values resolve against the page's origin)
+const API_PATH = new URL(API_URL, window.location.origin).pathname.replace(/\/+$/, '');
+
 // Create axios instance with default config
 const api = axios.create({
     baseURL: API_URL,
@@ -49,12 +56,19 @@ api.interceptors.response.use(
 );
 
 
+// Optimistic concurrency: send the version the record was loaded with,
+// the server answers 412 if someone else saved it since
+const ifMatch = (version) => (
+    version === undefined || version === null ? {} : { headers: { 'If-Match': `"${version}"` } }
+);
+
 // API Service Object
 const apiService = {
     // Customer endpoints
     customers: {
         getAll: () => api.get('/customers/'),
         getById: (id) => api.get(`/customers/${id}/`),
+        getOverview: (id) => api.get(`/customers/${id}/overview/`),
         create: (data) => api.post('/customers/', data),
         update: (id, data) => api.put(`/customers/${id}/`, data),
         delete: (id) => api.delete(`/customers/${id}/`),
@@ -62,9 +76,11 @@ const apiService = {
 
     // Vehicle endpoints
     vehicles: {
-        getAll: () => api.get('/vehicles/'),
+        getAll: (params) => api.get('/vehicles/', { params }),
         getById: (id) => api.get(`/vehicles/${id}/`),
         getByCustomer: (customerId) => api.get(`/vehicles/?customer_id=${customerId}`),
+        // Plate typeahead - case/space/dash-insensitive prefix match
+        lookup: (plate, limit = 10) => api.get('/vehicles/lookup/', { params: { plate, limit } }),
         create: (data) => api.post('/vehicles/', data),
         update: (id, data) => api.put(`/vehicles/${id}/`, data),
         delete: (id) => api.delete(`/vehicles/${id}/`),
@@ -82,21 +98,25 @@ const apiService = {
 
     // Service endpoints
     services: {
-        getAll: () => api.get('/services/'),
+        // Optional params: { include: 'vehicle,customer,technician', fields: 'id,status,vehicle.number' }
+        getAll: (params) => api.get('/services/', { params }),
         getById: (id) => api.get(`/services/${id}/`),
         create: (data) => api.post('/services/', data),
-        update: (id, data) => api.put(`/services/${id}/`, data),
-        updateStatus: (id, status) => api.patch(`/services/${id}/status/`, { status }),
+        update: (id, data, version) => api.put(`/services/${id}/`, data, ifMatch(version)),
+        updateStatus: (id, status, version) => api.patch(`/services/${id}/status/`, { status }, ifMatch(version)),
+        bulkUpdateStatus: (ids, status) => api.patch('/services/status/', { ids, status }),
         delete: (id) => api.delete(`/services/${id}/`),
     },
 
 
     // Invoice endpoints
     invoices: {
-        getAll: () => api.get('/invoices/'),
+        getAll: (params) => api.get('/invoices/', { params }),
         getById: (id) => api.get(`/invoices/${id}/`),
+        // Server-rendered PDF (open in a new tab or use as a download link)
+        pdfUrl: (id, download = false) => `${API_URL}/invoices/${id}/pdf/${download ? '?download=1' : ''}`,
         create: (data) => api.post('/invoices/', data),
-        update: (id, data) => api.put(`/invoices/${id}/`, data),
+        update: (id, data, version) => api.put(`/invoices/${id}/`, data, ifMatch(version)),
         delete: (id) => api.delete(`/invoices/${id}/`),
     },
 
@@ -141,6 +161,23 @@ const apiService = {
         getCurrent: () => api.get('/billing-settings/current/'),
         update: (id, data) => api.put(`/billing-settings/${id}/`, data),
     },
+
+    // Several read-only GETs in one round trip: [{ id, url: '/customers/' }, ...]
+    // Resolves to { [id]: data }, each unwrapped like a normal call's data.
+    // A failed sub-request rejects the whole call with its message.
+    batch: async (requests) => {
+        const res = await api.post('/batch/', {
+            requests: requests.map(({ id, url }) => ({ id, url: `${API_PATH}${url}` })),
+        });
+        const results = {};
+        for (const { id, status, body } of res.data) {
+            if (status >= 400) {
+                throw new Error(body?.errors || body?.message || `Batch request ${id} failed (${status})`);
+            }
+            results[id] = body?.data;
+        }
+        return results;
+    },
 };
 
 // Error handler helper